@@ -32,6 +32,47 @@ from bokeh.models import (
     Segment,
 )
 from bokeh.models.annotations import Label
+from benchmark_utilities.analysis.attribution import (
+    attribute,
+    callback_spans,
+    dominant,
+    infer_nodes,
+    segment_latencies,
+    tail_attribution,
+)
+from benchmark_utilities.analysis.cadence import deadline_misses, period_jitter
+from benchmark_utilities.analysis.chains import (
+    assemble_by_key,
+    assemble_dag,
+    drop_funnel,
+    match_by_thread,
+)
+from benchmark_utilities.analysis.clocks import estimate_alignment
+from benchmark_utilities.analysis.copies import hop_copies, hops, stage_bytes
+from benchmark_utilities.analysis.distribution import (
+    PERCENTILES,
+    log_histogram,
+    percentile_name,
+    percentiles,
+)
+from benchmark_utilities.analysis.energy import efficiency
+from benchmark_utilities.analysis.events import (
+    EVENT_DTYPE,
+    empty_events,
+    iter_events,
+)
+from benchmark_utilities.analysis.kernel import (
+    callback_times,
+    core_utilisation,
+    tail_scheduling,
+)
+from benchmark_utilities.analysis.parallel import merge_events
+from benchmark_utilities.analysis.runs import aggregate_runs, statistics_of_runs
+from benchmark_utilities.analysis.session import TraceSession
+from benchmark_utilities.analysis.sketch import StreamingStatistics
+from benchmark_utilities.analysis.streaming import StreamingChainAssembler
+from benchmark_utilities.analysis.sweep import knee, max_sustainable_rate
+from benchmark_utilities.analysis.throughput import steady_state, windowed_rate
 
 import sys
 import argparse
@@ -40,9 +81,22 @@ import argparse
 
 
 class BenchmarkAnalyzer:
-    def __init__(self, benchmark_name, hardware_device_type="cpu"):
+    def __init__(
+        self,
+        benchmark_name,
+        hardware_device_type="cpu",
+        use_cache=True,
+        workers=None,
+        multithreaded=False,
+        align_clocks=False,
+    ):
         self.benchmark_name = benchmark_name
         self.hardware_device_type = hardware_device_type
+        self.multithreaded = multithreaded  # pipelines in multi-threaded executors, see match_by_thread
+        self.align_clocks = align_clocks  # fit the VTF clock to the CTF one, see clocks.py
+        self.clock_alignment = None  # last ClockAlignment estimated
+        self.use_cache = use_cache  # reuse decoded traces across runs, see cache.py
+        self.workers = workers  # processes decoding trace streams, all CPUs if None
 
         # initialize arrays where tracing configuration will be stored
         self.target_chain = []
@@ -52,7 +106,16 @@ class BenchmarkAnalyzer:
         self.target_chain_layer = []
         self.target_chain_label_layer = []
         self.target_chain_marker = []
+        self.target_chain_after = []  # predecessors of each target (indices), see add_target
+        self.target_chain_node = []  # node running after each target, None to infer it
+        self.join_tolerance = 0.0  # seconds between stamps joined in a message set
+        self.window_indices = None  # targets within the measurement window, see set_window
+        self.window_slices = {}  # columns of the window, by chain and indices, see window_slice
         self.lost_msgs = 0  # lost messages counter, target_chain not fully met
+        self.funnel = None  # per-stage drops of the target chain, see drop_funnel
+        self.rate = None  # Hz images are published at, see set_rate
+        self.deadline = None  # seconds to process a message within, see set_rate
+        self.throughput_window = 1.0  # seconds, see throughput_timeline
 
         # initialize arrays where tracing configuration will be stored
         self.power_chain = []
@@ -64,6 +127,11 @@ class BenchmarkAnalyzer:
         self.power_chain_marker = []
         self.power_lost_msgs = 0  # lost messages counter, target_chain not fully met
 
+        # names of the tracepoints in the event tables, indexed by event_id
+        self.event_names = ()
+        self.sessions = {}  # decoded traces, by path, see get_session()
+        self.chain_msg_sets = {}  # message sets already formed, by trace and chain
+
     def add_target(self, target_dict):
         # targeted chain of messages for tracing
         # NOTE: there're not "publish" tracepoints because
@@ -76,6 +144,126 @@ class BenchmarkAnalyzer:
         self.target_chain_layer.append(target_dict["layer"])
         self.target_chain_label_layer.append(target_dict["label_layer"])
         self.target_chain_marker.append(target_dict["marker"])
+        # optional, see latency_attribution
+        self.target_chain_node.append(target_dict.get("node"))
+
+        # graph-shaped chains (fan-in/fan-out): "after" lists the
+        # name_disambiguous of the targets preceding this one, defaults
+        # to the previous target ([] for a new branch)
+        after = target_dict.get("after")
+        if after is None:
+            index = len(self.target_chain) - 1
+            self.target_chain_after.append([index - 1] if index else [])
+        else:
+            if isinstance(after, str):
+                after = [after]
+            for name in after:
+                if name not in self.target_chain_dissambiguous[:-1]:
+                    raise ValueError(
+                        "target '{}' must be added before '{}'".format(
+                            name, target_dict["name_disambiguous"]
+                        )
+                    )
+            self.target_chain_after.append(
+                [self.target_chain_dissambiguous.index(name) for name in after]
+            )
+        if "join_tolerance" in target_dict:
+            # nearest stamp join, e.g. RGB and depth images of different stamps
+            self.join_tolerance = max(self.join_tolerance, target_dict["join_tolerance"])
+
+    def set_window(self, first_target, last_target):
+        """
+        Sets the measurement window of the benchmark, reported as
+        "benchmark" statistics (e.g. mean_benchmark)
+
+        Args:
+            first_target (string): name_disambiguous of the first target of the window
+            last_target (string): name_disambiguous of the last target of the window
+        """
+        self.window_indices = list(range(
+            self.target_chain_dissambiguous.index(first_target),
+            1 + self.target_chain_dissambiguous.index(last_target),
+        ))
+
+    def set_rate(self, rate, deadline=None):
+        """
+        Sets the rate images are published at (e.g. publisher_upper_frequency)
+        and the deadline to process each one within, see cadence()
+
+        Args:
+            rate (float): Hz
+            deadline (float, optional): seconds. Defaults to one period.
+        """
+        self.rate = rate
+        self.deadline = deadline
+
+    def get_window_indices(self):
+        """
+        Returns the indices of the targets within the measurement
+        window, by default from the input to the output callback
+        """
+        if self.window_indices is None:
+            self.set_window(
+                "robotperf_benchmarks:robotperf_image_input_cb_init",
+                "robotperf_benchmarks:robotperf_image_output_cb_init",
+            )
+        return self.window_indices
+
+    def load_analysis(self, benchmark_yaml, variant=None, power=False):
+        """
+        Loads the chains of a benchmark from the "analysis" section of
+        its benchmark.yaml:
+
+            analysis:
+              window:  # measurement window, name_disambiguous of its first and last targets
+                first: robotperf_benchmarks:robotperf_image_input_cb_init
+                last: robotperf_benchmarks:robotperf_image_output_cb_init
+              targets:  # target chain of each variant, e.g. cpu or fpga
+                cpu:
+                - name: robotperf_benchmarks:robotperf_image_input_cb_init
+                  name_disambiguous: robotperf_benchmarks:robotperf_image_input_cb_init
+                  ...  # same keys as add_target
+              power:  # power chain, same keys as add_power
+              - name: robotcore_power:robotcore_power_output_cb_fini
+                ...
+              rate: 30.0  # Hz images are published at, optional, see set_rate
+              deadline: 0.05  # seconds, optional, defaults to one period
+              throughput_window: 1.0  # seconds, optional, see throughput_timeline
+
+        Chains are resolved once here into event ids (see get_event_names)
+        and the window into target indices.
+
+        Args:
+            benchmark_yaml (string): path of the benchmark.yaml file
+            variant (string, optional): target chain to load. Defaults to hardware_device_type.
+            power (bool, optional): load the power chain too. Defaults to False.
+
+        Returns:
+            bool: whether the benchmark has a target chain for variant
+        """
+        with open(benchmark_yaml, "r") as f:
+            analysis = yaml.safe_load(f).get("analysis") or {}
+        if variant is None:
+            variant = self.hardware_device_type
+
+        targets = analysis.get("targets", {}).get(variant)
+        if not targets:
+            print('The hardware device type ' + variant + ' is not yet implemented\n')
+            return False
+        for target in targets:
+            self.add_target(target)
+        if power:
+            for power_dict in analysis.get("power", []):
+                self.add_power(power_dict)
+
+        window = analysis.get("window")
+        if window:
+            self.set_window(window["first"], window["last"])
+        if analysis.get("rate"):
+            self.set_rate(analysis["rate"], analysis.get("deadline"))
+        self.throughput_window = analysis.get("throughput_window", self.throughput_window)
+        self.event_names = self.get_event_names()
+        return True
 
     def add_power(self, power_dict):
         # targeted chain of messages for tracing
@@ -160,51 +348,108 @@ class BenchmarkAnalyzer:
                 assert False, "invalid marker_type value"
 
 
-    def msgsets_from_ctf_vtf_traces(self, ctf_trace, vtf_trace, debug=False, target=True):
+    def get_event_names(self):
         """
-        Returns a list of message sets ready to be used
-        for plotting them in various forms. Takes two inputs,
-        corresponding with the absolute paths to a CTF and and 
-        VTF (CTF format).
+        Returns the names of the tracepoints of interest (target and power
+        chains) without repetitions. The position of each name is used as
+        its event_id in the event tables.
+        """
+        return tuple(dict.fromkeys(self.target_chain + self.power_chain))
+
+    def event_name(self, event):
+        """Returns the tracepoint name of a row of an event table"""
+        return self.event_names[event["event_id"]]
+
+    def event_ids(self):
+        """Returns a dict mapping the tracepoint names to their event_id"""
+        return {name: event_id for event_id, name in enumerate(self.event_names)}
+
+    def get_session(self, tracename):
+        """
+        Returns the TraceSession of a trace, creating it if needed.
+
+        Sessions live as long as the analyzer so that latency, throughput
+        and power all reuse a single decoding pass of the trace. A new
+        session is only created if the chains ask for tracepoints the
+        existing one didn't decode.
+
+        Args:
+            tracename (string): path for the trace file
+        """
+        event_names = self.get_event_names()
+        key = os.path.normpath(tracename)
+        session = self.sessions.get(key)
+        if session is None or not session.covers(tracename, event_names):
+            session = TraceSession(tracename, event_names, self.use_cache, self.workers)
+            self.sessions[key] = session
+        return session
+
+    def load_trace_events(self, tracename):
+        """
+        Decodes a trace into an event table (see events.EVENT_DTYPE)
+        restricted to the tracepoints of the target and power chains.
+
+        If use_cache is set, the table is stored next to the trace and
+        reused while neither the trace files nor the chains change.
+
+        Args:
+            tracename (string): path for the trace file
+        """
+        session = self.get_session(tracename)
+        self.event_names = session.event_names
+        return session.events
+
+    def load_chain_events(self, tracename, target=True):
+        """
+        Returns the rows of a trace that belong to the target (or power)
+        chain. Both chains are demultiplexed from the same session.
+
+        Args:
+            tracename (string): path for the trace file
+            target (bool, optional): to specify the traces to be selected (target or power)
+        """
+        session = self.get_session(tracename)
+        self.event_names = session.event_names
+        return session.select(self.target_chain if target else self.power_chain)
+
+    def chain_events(self, events, target=True):
+        """
+        Returns the rows of an event table that belong to the target
+        (or power) chain.
+        """
+        chain = self.target_chain if target else self.power_chain
+        ids = self.event_ids()
+        return events[np.isin(events["event_id"], [ids[name] for name in set(chain)])]
+
+    def msgsets_from_events(self, events, debug=False, target=True, match_vpid=True):
+        """
+        Returns a 2D array of message sets (one row per set, one column
+        per tracepoint in the chain) from an event table sorted by time.
 
         NOTE: NOT coded for multiple Nodes running concurrently or multithreaded executors
         Classification expects events in the corresponding order.
-        """
 
-        msg_it = bt2.TraceCollectionMessageIterator(ctf_trace)
-        # Iterate the trace messages and pick right ones
-        ctf_msgs = []
-        for msg in msg_it:
-            # `bt2._EventMessageConst` is the Python type of an event message.
-            if type(msg) is bt2._EventMessageConst:
-                # An event message holds a trace event.
-                event = msg.event
-                # Only check `sched_switch` events.
-                if target and event.name in self.target_chain:
-                    ctf_msgs.append(msg)
-                elif not target and event.name in self.power_chain:
-                    ctf_msgs.append(msg)
-
-        msg_it = bt2.TraceCollectionMessageIterator(vtf_trace)
-        # Iterate the trace messages and pick right ones
-        vtf_msgs = []
-        for msg in msg_it:# launch independently iff no other metric is requested
-            # `bt2._EventMessageConst` is the Python type of an event message.
-            if type(msg) is bt2._EventMessageConst:
-                # An event message holds a trace event.
-                event = msg.event
-                # Only check `sched_switch` events.
-                if target and event.name in self.target_chain:
-                    vtf_msgs.append(msg)
-                elif not target and event.name in self.power_chain:
-                    vtf_msgs.append(msg)
-
-        all_msgs = ctf_msgs + vtf_msgs
-        all_msgs_sorted = sorted(all_msgs, key= lambda x: x.default_clock_snapshot.ns_from_origin)
+        Args:
+            events (np.ndarray): event table, sorted by timestamp
+            debug (bool, optional): print the classification. Defaults to False.
+            target (bool, optional): to specify the traces to be selected (target or power)
+            match_vpid (bool, optional): require all events in a set to come from the same
+                process. Defaults to True.
+        """
+        chain = self.target_chain if target else self.power_chain
+        # compare integer event ids rather than names
+        ids = self.event_ids()
+        chain_ids = [ids[name] for name in chain]
+        chain_id_set = set(chain_ids)
+        callback_start_id = ids.get("ros2:callback_start")
+        callback_end_id = ids.get("ros2:callback_end")
+        event_ids = events["event_id"].tolist()
+        vpids = events["vpid"].tolist()
+        names = self.event_names  # debug only
 
         # Form sets with each pipeline
         image_pipeline_msg_sets = []
-        new_set = []  # used to track new complete sets
+        new_set = []  # used to track new complete sets (indices in events)
         chain_index = 0  # track where in the chain we are so far
         vpid_chain = -1  # used to track a set and differentiate from other callbacks
 
@@ -212,168 +457,146 @@ class BenchmarkAnalyzer:
         # this classification is going to miss the initial matches because
         # "ros2:callback_start" will not be associated with the target chain and it won't stop
         # being considered until a "ros2:callback_end" of that particular process is seen
-        for index in range(len(all_msgs_sorted)):
-            if target and all_msgs_sorted[index].event.name in self.target_chain:  # optimization
-
-                # print("new: " + all_msgs_sorted[index].event.name)
-                # print("expected: " + str(self.target_chain[chain_index]))
-                # print("chain_index: " + str(chain_index))
-                # print("---")
-
+        for index in range(len(event_ids)):
+            event_id = event_ids[index]
+            if event_id not in chain_id_set:
+                continue
+            same_vpid = (not match_vpid) or vpids[index] == vpid_chain
+
+            if debug:
+                print("---")
+                print("new: " + names[event_id])
+                print("expected: " + str(chain[chain_index]))
+                print("chain_index: " + str(chain_index))
+
+            # first one
+            if chain_index == 0 and event_id == chain_ids[chain_index]:
+                new_set.append(index)
+                vpid_chain = vpids[index]
+                chain_index += 1
                 if debug:
-                    print("---")
-                    print("new: " + all_msgs_sorted[index].event.name)
-                    print("expected: " + str(self.target_chain[chain_index]))
-                    print("chain_index: " + str(chain_index))
-
-                # first one
-                if (
-                    chain_index == 0
-                    and all_msgs_sorted[index].event.name == self.target_chain[chain_index]
-                ):
-                    new_set.append(all_msgs_sorted[index])
-                    # vpid_chain = all_msgs_sorted[index].event.common_context_field.get(
-                    #     "vpid"
-                    # )
-                    chain_index += 1
-                    if debug:
-                        print(color("Found first: " + str(all_msgs_sorted[index].event.name) + " - " + str([x.event.name for x in new_set]), fg="blue"))
-                # last one
-                elif (
-                    all_msgs_sorted[index].event.name == self.target_chain[chain_index]
-                    and self.target_chain[chain_index] == self.target_chain[-1]
-                    and new_set[-1].event.name == self.target_chain[-2]
-                    # and all_msgs_sorted[index].event.common_context_field.get("vpid")
-                    # == vpid_chain
-                ):
-                    new_set.append(all_msgs_sorted[index])
-                    image_pipeline_msg_sets.append(new_set)
+                    print(color("Found first: " + names[event_id] + " - " + str([names[event_ids[x]] for x in new_set]), fg="blue"))
+            # last one
+            elif (
+                event_id == chain_ids[chain_index]
+                and chain_ids[chain_index] == chain_ids[-1]
+                and event_ids[new_set[-1]] == chain_ids[-2]
+                and same_vpid
+            ):
+                new_set.append(index)
+                image_pipeline_msg_sets.append(new_set)
+                if debug:
+                    print(color("Found last: " + names[event_id] + " - " + str([names[event_ids[x]] for x in new_set]), fg="blue"))
+                chain_index = 0  # restart
+                new_set = []  # restart
+            # match
+            elif event_id == chain_ids[chain_index] and same_vpid:
+                new_set.append(index)
+                chain_index += 1
+                if debug:
+                    print(color("Found: " + names[event_id] + " - " + str([names[event_ids[x]] for x in new_set]), fg="green"))
+            # altered order
+            elif same_vpid:
+                # pop ros2:callback_start in new_set, if followed by "ros2:callback_end"
+                # NOTE: consider case of disconnected series of:
+                #       "ros2:callback_start"
+                #       "ros2:callback_end"
+                if (event_id == callback_end_id
+                    and chain_ids[chain_index - 1] == callback_start_id):
+                    new_set.pop()
+                    chain_index -= 1
+                else:
+                    new_set.append(index)
                     if debug:
-                        print(color("Found last: " + str(all_msgs_sorted[index].event.name) + " - " + str([x.event.name for x in new_set]), fg="blue"))
+                        print(color("Altered order: " + str([names[event_ids[x]] for x in new_set]) + ", restarting", fg="red"))
                     chain_index = 0  # restart
                     new_set = []  # restart
-                # match
-                elif (
-                    all_msgs_sorted[index].event.name == self.target_chain[chain_index]
-                    # and all_msgs_sorted[index].event.common_context_field.get("vpid")
-                    # == vpid_chain
-                ):
-                    new_set.append(all_msgs_sorted[index])
-                    chain_index += 1
-                    if debug:
-                        print(color("Found: " + str(all_msgs_sorted[index].event.name) + " - " + str([x.event.name for x in new_set]), fg="green"))
-                # altered order
-                elif (
-                    all_msgs_sorted[index].event.name in self.target_chain
-                    # and all_msgs_sorted[index].event.common_context_field.get("vpid")
-                    # == vpid_chain
-                ):
-                    # pop ros2:callback_start in new_set, if followed by "ros2:callback_end"
-                    # NOTE: consider case of disconnected series of:
-                    #       "ros2:callback_start"
-                    #       "ros2:callback_end"
-                    if (all_msgs_sorted[index].event.name == "ros2:callback_end"
-                        and self.target_chain[chain_index - 1] == "ros2:callback_start"):
-                        new_set.pop()
-                        chain_index -= 1
-                    else:
-                        new_set.append(all_msgs_sorted[index])
-                        if debug:
-                            print(color("Altered order: " + str([x.event.name for x in new_set]) + ", restarting", fg="red"))
-                        chain_index = 0  # restart
-                        new_set = []  # restart
 
-            elif not target and all_msgs_sorted[index].event.name in self.power_chain:  # optimization
+        if not image_pipeline_msg_sets:
+            return empty_events((0, len(chain)))
+        return events[np.array(image_pipeline_msg_sets)]
 
-                # print("new: " + all_msgs_sorted[index].event.name)
-                # print("expected: " + str(self.power_chain[chain_index]))
-                # print("chain_index: " + str(chain_index))
-                # print("---")
+    def msgsets_from_events_mt(self, events, debug=False, target=True, match_vpid=True):
+        """
+        Returns a 2D array of message sets from an event table sorted by
+        time, for pipelines in multi-threaded executors (e.g.
+        component_container_mt) with several frames in flight at once.
 
-                if debug:
-                    print("---")
-                    print("new: " + all_msgs_sorted[index].event.name)
-                    print("expected: " + str(self.power_chain[chain_index]))
-                    print("chain_index: " + str(chain_index))
-
-                # first one
-                if (
-                    chain_index == 0
-                    and all_msgs_sorted[index].event.name == self.power_chain[chain_index]
-                ):
-                    new_set.append(all_msgs_sorted[index])
-                    # vpid_chain = all_msgs_sorted[index].event.common_context_field.get(
-                    #     "vpid"
-                    # )
-                    chain_index += 1
-                    if debug:
-                        print(color("Found first: " + str(all_msgs_sorted[index].event.name) + " - " + str([x.event.name for x in new_set]), fg="blue"))
-                # last one
-                elif (
-                    all_msgs_sorted[index].event.name == self.power_chain[chain_index]
-                    and self.power_chain[chain_index] == self.power_chain[-1]
-                    and new_set[-1].event.name == self.power_chain[-2]
-                    # and all_msgs_sorted[index].event.common_context_field.get("vpid")
-                    # == vpid_chain
-                ):
-                    new_set.append(all_msgs_sorted[index])
-                    image_pipeline_msg_sets.append(new_set)
-                    if debug:
-                        print(color("Found last: " + str(all_msgs_sorted[index].event.name) + " - " + str([x.event.name for x in new_set]), fg="blue"))
-                    chain_index = 0  # restart
-                    new_set = []  # restart
-                # match
-                elif (
-                    all_msgs_sorted[index].event.name == self.power_chain[chain_index]
-                    # and all_msgs_sorted[index].event.common_context_field.get("vpid")
-                    # == vpid_chain
-                ):
-                    new_set.append(all_msgs_sorted[index])
-                    chain_index += 1
-                    if debug:
-                        print(color("Found: " + str(all_msgs_sorted[index].event.name) + " - " + str([x.event.name for x in new_set]), fg="green"))
-                # altered order
-                elif (
-                    all_msgs_sorted[index].event.name in self.power_chain
-                    # and all_msgs_sorted[index].event.common_context_field.get("vpid")
-                    # == vpid_chain
-                ):
-                    # pop ros2:callback_start in new_set, if followed by "ros2:callback_end"
-                    # NOTE: consider case of disconnected series of:
-                    #       "ros2:callback_start"
-                    #       "ros2:callback_end"
-                    if (all_msgs_sorted[index].event.name == "ros2:callback_end"
-                        and self.power_chain[chain_index - 1] == "ros2:callback_start"):
-                        new_set.pop()
-                        chain_index -= 1
-                    else:
-                        new_set.append(all_msgs_sorted[index])
-                        if debug:
-                            print(color("Altered order: " + str([x.event.name for x in new_set]) + ", restarting", fg="red"))
-                        chain_index = 0  # restart
-                        new_set = []  # restart
+        Each in-flight set is tracked independently by the thread (vpid,
+        vtid) running its callbacks, so interleaved events of other
+        frames don't restart it (see chains.match_by_thread). Sets started
+        but not completed are counted in lost_msgs.
 
-        return image_pipeline_msg_sets
+        Args:
+            events (np.ndarray): event table, sorted by timestamp
+            debug (bool, optional): print the number of sets lost. Defaults to False.
+            target (bool, optional): to specify the traces to be selected (target or power)
+            match_vpid (bool, optional): require all events in a set to come from the same
+                process. Defaults to True.
+        """
+        chain = self.target_chain if target else self.power_chain
+        ids = self.event_ids()
+        opens = set(
+            ids[name] for name in chain
+            if name == "ros2:callback_start" or name.endswith("_cb_init")
+        )
+        closes = set(
+            ids[name] for name in chain
+            if name == "ros2:callback_end" or name.endswith("_cb_fini")
+        )
+        index_sets, lost = match_by_thread(
+            events,
+            [ids[name] for name in chain],
+            opens,
+            closes,
+            ids.get("ros2:callback_start"),
+            ids.get("ros2:callback_end"),
+            match_vpid=match_vpid,
+        )
+        self.lost_msgs += lost
+        if debug:
+            print(color("Message sets: " + str(len(index_sets)) + ", lost: " + str(lost), fg="yellow"))
 
+        if not len(index_sets):
+            return empty_events((0, len(chain)))
+        return events[index_sets]
 
-    def timestamp_identifier(self, msg):
+    def msgsets_from_ctf_vtf_traces(self, ctf_trace, vtf_trace, debug=False, target=True):
         """
-        Returns ROS message header timestamp as unique identifier
-        from a CTF msg
-        """    
-        payload_fields = msg.event.payload_field
-        for field_name, field_value in payload_fields.items():
-            if "header_nsec" in field_name:
-                id_nanosecs = msg.event.payload_field[field_name]
-            elif "header_sec" in field_name:    
-                id_sec = msg.event.payload_field[field_name]
-            
-                                
-        # id_nanosecs = msg.event.payload_field["image_input_header_nsec"]
-        # id_sec = msg.event.payload_field["image_input_header_sec"]
+        Returns a list of message sets ready to be used
+        for plotting them in various forms. Takes two inputs,
+        corresponding with the absolute paths to a CTF and and 
+        VTF (CTF format).
 
-        id = id_sec + id_nanosecs/1e9
-        return id
+        NOTE: NOT coded for multiple Nodes running concurrently or multithreaded executors
+        unless multithreaded is set, see msgsets_from_events_mt.
+        Classification expects events in the corresponding order.
+        """
+        ctf_events = self.load_chain_events(ctf_trace, target)
+        vtf_events = self.load_chain_events(vtf_trace, target)
+        if self.align_clocks and len(vtf_events):
+            # VTF timestamps come from the accelerator clock, map them into the CTF one
+            chain = self.target_chain if target else self.power_chain
+            ids = self.event_ids()
+            alignment = estimate_alignment(ctf_events, vtf_events, [ids[name] for name in chain])
+            if alignment is not None:
+                self.clock_alignment = alignment
+                vtf_events = alignment.apply(vtf_events)
+                print(color("VTF clock alignment: " + str(alignment), fg="yellow"))
+        # both tables are already ordered by timestamp
+        all_events = merge_events([ctf_events, vtf_events])
+
+        # NOTE: vpid is not checked, VTF events come from the accelerator
+        if self.multithreaded:
+            return self.msgsets_from_events_mt(all_events, debug=debug, target=target, match_vpid=False)
+        return self.msgsets_from_events(all_events, debug=debug, target=target, match_vpid=False)
+
+    def timestamp_identifier(self, event):
+        """
+        Returns ROS message header timestamp as unique identifier
+        from a row of an event table
+        """
+        return event["frame_id"]
 
     def msgsets_from_trace_identifier(
         self, 
@@ -392,92 +615,130 @@ class BenchmarkAnalyzer:
 
         Args:
             tracename (string): path for the trace file
+            unique_funq (function, optional): returns the identifier of a row
+                of the event table. Defaults to timestamp_identifier.
             debug (bool, optional): [description]. Defaults to False.
             target (bool, optional): to specify the traces to be selected (target or power)
 
         """
+        chain = self.target_chain if target else self.power_chain
+        events = self.load_chain_events(tracename, target)
         if unique_funq is None:
-            unique_funq = self.timestamp_identifier
-
-        msg_it = bt2.TraceCollectionMessageIterator(tracename)
-
-        # Iterate the trace messages and pick ros2 ones
-        image_pipeline_msgs = []
-        for msg in msg_it:
-            # `bt2._EventMessageConst` is the Python type of an event message.
-            if type(msg) is bt2._EventMessageConst:
-                # An event message holds a trace event.
-                event = msg.event
-                # Only check `sched_switch` events.
-                # if "ros2" in event.name or "robotperf" in event.name:
-                if (target) and (event.name in self.target_chain):
-                    image_pipeline_msgs.append(msg)
-                elif (not target) and (event.name in self.power_chain):
-                    image_pipeline_msgs.append(msg)
+            keys = events["frame_id"]
+        else:
+            keys = np.array([unique_funq(event) for event in events])
 
-        # Form sets with each pipeline
-        image_pipeline_msg_dict = {}
-        new_set = []  # used to track new complete sets
-        chain_index = 0  # track where in the chain we are so far
+        ids = self.event_ids()
+        index_sets, lost_keys, duplicates, (stages, first_timestamps) = assemble_by_key(
+            events, [ids[name] for name in chain], keys
+        )
+        self.lost_msgs += len(lost_keys)
+        if target:
+            self.funnel = drop_funnel(stages, first_timestamps, len(chain))
+        if debug:
+            if duplicates:
+                print(color(str(duplicates) + " events of messages already fully propagated, discarded", fg="yellow"))
+            for key_id in lost_keys.tolist():
+                names_value_list = [self.event_name(event) for event in events[keys == key_id]]
+                print(color("Message with id: " + str(key_id) + " not fully propagated, discarding chain - " + str(names_value_list), fg="orange"))
 
-        for msg in image_pipeline_msgs:
-            id = unique_funq(msg)
-            if id in image_pipeline_msg_dict.keys():
-                if target:
-                    if (len(image_pipeline_msg_dict[id]) < len(self.target_chain)):
-                        image_pipeline_msg_dict[id].append(msg)
-                    else:
-                        pass
-                        if debug:
-                            print(color("Message with id: " + str(id) + " already fully propagated, discarding - " + str(msg.event.name), fg="yellow"))
-                elif not target:
-                    if (len(image_pipeline_msg_dict[id]) < len(self.power_chain)):
-                        image_pipeline_msg_dict[id].append(msg)
-                    else:
-                        pass
-                        if debug:
-                            print(color("Message with id: " + str(id) + " already fully propagated, discarding - " + str(msg.event.name), fg="yellow"))
+        # survivors
+        if not len(index_sets):
+            return empty_events((0, len(chain)))
+        return events[index_sets]
 
-            else:
-                image_pipeline_msg_dict[id] = [msg]
+    def msgsets_from_trace_stream(self, tracename, window=1.0, debug=False, target=True, statistics=None):
+        """
+        Streaming version of msgsets_from_trace_identifier: yields each
+        message set (an array of len(chain) rows) as soon as its last
+        tracepoint is decoded, keeping memory constant for long traces.
 
-        del_list = []
-        for key_id, value_list in image_pipeline_msg_dict.items():
-            names_value_list = [msg.event.name for msg in value_list]
-            if target:
-                if len(value_list) != (len(self.target_chain)):
-                    if debug:
-                        print(color("Message with id: " + str(key_id) + " not fully propagated (missing number), discarding chain - " + str([x.event.name for x in value_list]), fg="orange"))
-                    # del image_pipeline_msg_dict[key_id]  # this leads to error:
-                    #                                      # dictionary changed size during iteration
-                    del_list.append(key_id)
-                    continue
-            elif not target:
-                if len(value_list) != (len(self.power_chain)):
-                    if debug:
-                        print(color("Message with id: " + str(key_id) + " not fully propagated (missing number), discarding chain - " + str([x.event.name for x in value_list]), fg="orange"))
-                    # del image_pipeline_msg_dict[key_id]  # this leads to error:
-                    #                                      # dictionary changed size during iteration
-                    del_list.append(key_id)
-                    continue
+        Partial message sets are evicted after window seconds (trace
+        time) without completing and counted in lost_msgs. The trace is
+        decoded incrementally, bypassing sessions and the cache.
 
-            if target:
-                if not all(item in names_value_list for item in self.target_chain):
-                    if debug:
-                        print(color("Message with id: " + str(key_id) + " does not have all tracepoints, discarding chain - " + str([x.event.name for x in value_list]), fg="red"))
-                    del_list.append(key_id)
-            elif not target:
-                if not all(item in names_value_list for item in self.power_chain):
-                    if debug:
-                        print(color("Message with id: " + str(key_id) + " does not have all tracepoints, discarding chain - " + str([x.event.name for x in value_list]), fg="red"))
-                    del_list.append(key_id)
+        Args:
+            tracename (string): path for the trace file
+            window (float, optional): seconds a partial message set waits for
+                the rest of its tracepoints. Defaults to 1.0.
+            debug (bool, optional): print lost and discarded counts. Defaults to False.
+            target (bool, optional): to specify the traces to be selected (target or power)
+            statistics (StreamingStatistics, optional): fed with the latency
+                (ms) of each target message set over the measurement window
+        """
+        chain = self.target_chain if target else self.power_chain
+        self.event_names = self.get_event_names()
+        ids = self.event_ids()
+        span = None
+        if target:
+            # same as the sum of the window columns of barchart_data_latency
+            indices = self.get_window_indices()
+            span = (max(indices[0] - 1, 0), indices[-1])
+        assembler = StreamingChainAssembler(
+            [ids[name] for name in chain], int(window * 1e9),
+            statistics=statistics, span=span,
+        )
+        for events in iter_events(tracename, self.event_names):
+            yield from assembler.push(events)
+        assembler.finish()
+        self.lost_msgs += assembler.lost_msgs
+        if debug:
+            print(color("Lost: " + str(assembler.lost_msgs) + ", discarded (already fully propagated): " + str(assembler.discarded), fg="yellow"))
+
+    def streaming_statistics(self, tracename, window=1.0, statistics=None, debug=False):
+        """
+        Latency statistics of the target chain in constant memory, for
+        long (soak) runs: message sets are assembled while the trace is
+        decoded and only folded into a sketch, never kept.
 
-        for key in del_list:
-            del image_pipeline_msg_dict[key]
-            self.lost_msgs += 1
+        Args:
+            tracename (string): path for the trace file
+            window (float, optional): see msgsets_from_trace_stream. Defaults to 1.0.
+            statistics (StreamingStatistics, optional): to merge into, e.g.
+                the ones of previous trace chunks or runs. Defaults to new ones.
+            debug (bool, optional): print lost and discarded counts. Defaults to False.
 
-        # survivors
-        return list(image_pipeline_msg_dict.values())
+        Returns:
+            StreamingStatistics
+        """
+        if statistics is None:
+            statistics = StreamingStatistics()
+        for _ in self.msgsets_from_trace_stream(tracename, window, debug, statistics=statistics):
+            pass
+        return statistics
+
+    def is_dag(self):
+        """Whether the target chain is graph-shaped (has branches or joins)"""
+        return any(
+            after != ([index - 1] if index else [])
+            for index, after in enumerate(self.target_chain_after)
+        )
+
+    def msgsets_from_trace_dag(self, tracename, debug=False):
+        """
+        Returns the message sets of a graph-shaped target chain (see
+        add_target "after"), one column per target. Events are joined by
+        ROS header stamp, exactly or within join_tolerance.
+
+        Args:
+            tracename (string): path for the trace file
+            debug (bool, optional): print the number of sets lost. Defaults to False.
+        """
+        events = self.load_chain_events(tracename, True)
+        ids = self.event_ids()
+        index_sets, lost = assemble_dag(
+            events,
+            [ids[name] for name in self.target_chain],
+            self.target_chain_after,
+            tolerance=int(self.join_tolerance * 1e9),
+        )
+        self.lost_msgs += lost
+        if debug:
+            print(color("Message sets: " + str(len(index_sets)) + ", lost: " + str(lost), fg="yellow"))
+
+        if not len(index_sets):
+            return empty_events((0, len(self.target_chain)))
+        return events[index_sets]
 
     def msgsets_from_trace(self, tracename, debug=False, target=True):
         """
@@ -488,186 +749,13 @@ class BenchmarkAnalyzer:
         facing concurrent setups and/or machines with less capabilities.
 
         NOTE: NOT coded for multiple Nodes running concurrently or multithreaded executors
+        unless multithreaded is set, see msgsets_from_events_mt.
         Classification expects events in the corresponding order.
         """
-        # Create a trace collection message iterator from the first command-line
-        # argument.
-        msg_it = bt2.TraceCollectionMessageIterator(tracename)
-
-        # Iterate the trace messages and pick ros2 ones
-        image_pipeline_msgs = []
-        for msg in msg_it:
-            # `bt2._EventMessageConst` is the Python type of an event message.
-            if type(msg) is bt2._EventMessageConst:
-                # An event message holds a trace event.
-                event = msg.event
-                # Only check `sched_switch` events.
-                # if "ros2" in event.name or "robotperf" in event.name:
-                if target and event.name in self.target_chain:
-                    image_pipeline_msgs.append(msg)
-                elif not target and event.name in self.power_chain:
-                    image_pipeline_msgs.append(msg)
-
-        # Form sets with each pipeline
-        image_pipeline_msg_sets = []
-        new_set = []  # used to track new complete sets
-        chain_index = 0  # track where in the chain we are so far
-        vpid_chain = -1  # used to track a set and differentiate from other callbacks
-
-        # NOTE: NOT CODED FOR MULTIPLE NODES RUNNING CONCURRENTLY
-        # this classification is going to miss the initial matches because
-        # "ros2:callback_start" will not be associated with the target chain and it won't stop
-        # being considered until a "ros2:callback_end" of that particular process is seen
-        for index in range(len(image_pipeline_msgs)):
-            if target and image_pipeline_msgs[index].event.name in self.target_chain:  # optimization
-
-                if debug:
-                    print("---")
-                    print("new: " + image_pipeline_msgs[index].event.name)
-                    print("expected: " + str(self.target_chain[chain_index]))
-                    print("chain_index: " + str(chain_index))
-
-                # first one            
-                if (
-                    chain_index == 0
-                    and image_pipeline_msgs[index].event.name == self.target_chain[chain_index]
-                ):
-                    new_set.append(image_pipeline_msgs[index])
-                    vpid_chain = image_pipeline_msgs[index].event.common_context_field.get(
-                        "vpid"
-                    )
-                    chain_index += 1
-                    if debug:
-                        print(color("Found: " + str(image_pipeline_msgs[index].event.name) + " - " + str([x.event.name for x in new_set]), fg="blue"))
-                # last one
-                elif (
-                    image_pipeline_msgs[index].event.name == self.target_chain[chain_index]
-                    and self.target_chain[chain_index] == self.target_chain[-1]
-                    and new_set[-1].event.name == self.target_chain[-2]
-                    and image_pipeline_msgs[index].event.common_context_field.get("vpid")
-                    == vpid_chain
-                ):
-                    new_set.append(image_pipeline_msgs[index])
-                    image_pipeline_msg_sets.append(new_set)
-                    if debug:
-                        print(color("Found: " + str(image_pipeline_msgs[index].event.name) + " - " + str([x.event.name for x in new_set]), fg="blue"))
-                    chain_index = 0  # restart
-                    new_set = []  # restart
-                # match
-                elif (
-                    image_pipeline_msgs[index].event.name == self.target_chain[chain_index]
-                    and image_pipeline_msgs[index].event.common_context_field.get("vpid")
-                    == vpid_chain
-                ):
-                    new_set.append(image_pipeline_msgs[index])
-                    chain_index += 1
-                    if debug:
-                        print(color("Found: " + str(image_pipeline_msgs[index].event.name) + " - " + str([x.event.name for x in new_set]), fg="green"))
-                # altered order
-                elif (
-                    image_pipeline_msgs[index].event.name in self.target_chain
-                    and image_pipeline_msgs[index].event.common_context_field.get("vpid")
-                    == vpid_chain
-                ):
-                    # pop ros2:callback_start in new_set, if followed by "ros2:callback_end"
-                    # NOTE: consider case of disconnected series of:
-                    #       "ros2:callback_start"
-                    #       "ros2:callback_end"
-                    if (image_pipeline_msgs[index].event.name == "ros2:callback_end"
-                        and self.target_chain[chain_index - 1] == "ros2:callback_start"):
-                        new_set.pop()
-                        chain_index -= 1
-                    # # it's been observed that "robotperf_benchmarks:robotperf_image_input_cb_init" triggers
-                    # # before "ros2_image_pipeline:image_proc_rectify_cb_fini" which leads to trouble
-                    # # Skip this as well as the next event
-                    # elif (image_pipeline_msgs[index].event.name == "robotperf_benchmarks:robotperf_image_input_cb_init"
-                    #     and self.target_chain[chain_index - 3] == "ros2_image_pipeline:image_proc_rectify_cb_fini"):
-                    #     print(color("Skipping: " + str(image_pipeline_msgs[index].event.name), fg="yellow"))
-                    # elif (image_pipeline_msgs[index].event.name == "robotperf_benchmarks:robotperf_image_input_cb_fini"
-                    #     and self.target_chain[chain_index - 3] == "ros2_image_pipeline:image_proc_rectify_cb_fini"):
-                    #     print(color("Skipping: " + str(image_pipeline_msgs[index].event.name), fg="yellow"))
-                    else:
-                        new_set.append(image_pipeline_msgs[index])
-                        if debug:
-                            print(color("Altered order: " + str([x.event.name for x in new_set]) + ", restarting", fg="red"))
-                        chain_index = 0  # restart
-                        new_set = []  # restart
-
-            elif not target and image_pipeline_msgs[index].event.name in self.power_chain:  # optimization
-
-                if debug:
-                    print("---")
-                    print("new: " + image_pipeline_msgs[index].event.name)
-                    print("expected: " + str(self.power_chain[chain_index]))
-                    print("chain_index: " + str(chain_index))
-
-                # first one            
-                if (
-                    chain_index == 0
-                    and image_pipeline_msgs[index].event.name == self.power_chain[chain_index]
-                ):
-                    new_set.append(image_pipeline_msgs[index])
-                    vpid_chain = image_pipeline_msgs[index].event.common_context_field.get(
-                        "vpid"
-                    )
-                    chain_index += 1
-                    if debug:
-                        print(color("Found: " + str(image_pipeline_msgs[index].event.name) + " - " + str([x.event.name for x in new_set]), fg="blue"))
-                # last one
-                elif (
-                    image_pipeline_msgs[index].event.name == self.power_chain[chain_index]
-                    and self.power_chain[chain_index] == self.power_chain[-1]
-                    and new_set[-1].event.name == self.power_chain[-2]
-                    and image_pipeline_msgs[index].event.common_context_field.get("vpid")
-                    == vpid_chain
-                ):
-                    new_set.append(image_pipeline_msgs[index])
-                    image_pipeline_msg_sets.append(new_set)
-                    if debug:
-                        print(color("Found: " + str(image_pipeline_msgs[index].event.name) + " - " + str([x.event.name for x in new_set]), fg="blue"))
-                    chain_index = 0  # restart
-                    new_set = []  # restart
-                # match
-                elif (
-                    image_pipeline_msgs[index].event.name == self.power_chain[chain_index]
-                    and image_pipeline_msgs[index].event.common_context_field.get("vpid")
-                    == vpid_chain
-                ):
-                    new_set.append(image_pipeline_msgs[index])
-                    chain_index += 1
-                    if debug:
-                        print(color("Found: " + str(image_pipeline_msgs[index].event.name) + " - " + str([x.event.name for x in new_set]), fg="green"))
-                # altered order
-                elif (
-                    image_pipeline_msgs[index].event.name in self.power_chain
-                    and image_pipeline_msgs[index].event.common_context_field.get("vpid")
-                    == vpid_chain
-                ):
-                    # pop ros2:callback_start in new_set, if followed by "ros2:callback_end"
-                    # NOTE: consider case of disconnected series of:
-                    #       "ros2:callback_start"
-                    #       "ros2:callback_end"
-                    if (image_pipeline_msgs[index].event.name == "ros2:callback_end"
-                        and self.power_chain[chain_index - 1] == "ros2:callback_start"):
-                        new_set.pop()
-                        chain_index -= 1
-                    # # it's been observed that "robotperf_benchmarks:robotperf_image_input_cb_init" triggers
-                    # # before "ros2_image_pipeline:image_proc_rectify_cb_fini" which leads to trouble
-                    # # Skip this as well as the next event
-                    # elif (image_pipeline_msgs[index].event.name == "robotperf_benchmarks:robotperf_image_input_cb_init"
-                    #     and self.power_chain[chain_index - 3] == "ros2_image_pipeline:image_proc_rectify_cb_fini"):
-                    #     print(color("Skipping: " + str(image_pipeline_msgs[index].event.name), fg="yellow"))
-                    # elif (image_pipeline_msgs[index].event.name == "robotperf_benchmarks:robotperf_image_input_cb_fini"
-                    #     and self.power_chain[chain_index - 3] == "ros2_image_pipeline:image_proc_rectify_cb_fini"):
-                    #     print(color("Skipping: " + str(image_pipeline_msgs[index].event.name), fg="yellow"))
-                    else:
-                        new_set.append(image_pipeline_msgs[index])
-                        if debug:
-                            print(color("Altered order: " + str([x.event.name for x in new_set]) + ", restarting", fg="red"))
-                        chain_index = 0  # restart
-                        new_set = []  # restart
-
-        return image_pipeline_msg_sets
+        events = self.load_chain_events(tracename, target)
+        if self.multithreaded:
+            return self.msgsets_from_events_mt(events, debug=debug, target=target, match_vpid=True)
+        return self.msgsets_from_events(events, debug=debug, target=target, match_vpid=True)
 
     def barplot_all(self, image_pipeline_msg_sets, title="Barplot"):
 
@@ -676,11 +764,7 @@ class BenchmarkAnalyzer:
             aux_set = []
             target_chain_ns = []
             for msg_index in range(len(image_pipeline_msg_sets[set_index])):
-                target_chain_ns.append(
-                    image_pipeline_msg_sets[set_index][
-                        msg_index
-                    ].default_clock_snapshot.ns_from_origin
-                )
+                target_chain_ns.append(image_pipeline_msg_sets[set_index][msg_index]["timestamp"])
             init_ns = target_chain_ns[0]
             for msg_index in range(len(image_pipeline_msg_sets[set_index])):
                 aux_set.append((target_chain_ns[msg_index] - init_ns) / 1e6)
@@ -731,7 +815,7 @@ class BenchmarkAnalyzer:
 
         target_chain_ns = []
         for msg_index in range(len(msg_set)):
-            target_chain_ns.append(msg_set[msg_index].default_clock_snapshot.ns_from_origin)
+            target_chain_ns.append(msg_set[msg_index]["timestamp"])
         init_ns = target_chain_ns[0]
 
         # print("1")
@@ -841,7 +925,7 @@ class BenchmarkAnalyzer:
                 legend_label=self.target_chain_dissambiguous[msg_index],
                 size=10,
             )        
-            if "robotperf_image_input_cb_fini" in msg_set[msg_index].event.name:
+            if "robotperf_image_input_cb_fini" in self.event_name(msg_set[msg_index]):
                 label = Label(
                     x=(target_chain_ns[msg_index] - init_ns) / 1e6,
                     y=self.target_chain_label_layer[msg_index],
@@ -850,7 +934,7 @@ class BenchmarkAnalyzer:
                     text=self.target_chain_dissambiguous[msg_index].split(":")[-1],
                 )
 
-            elif "robotperf_image_output_cb_init" in msg_set[msg_index].event.name:
+            elif "robotperf_image_output_cb_init" in self.event_name(msg_set[msg_index]):
                 label = Label(
                     x=(target_chain_ns[msg_index] - init_ns) / 1e6,
                     y=self.target_chain_label_layer[msg_index],
@@ -906,7 +990,7 @@ class BenchmarkAnalyzer:
 
         target_chain_ns = []
         for msg_index in range(len(msg_set)):
-            target_chain_ns.append(msg_set[msg_index].default_clock_snapshot.ns_from_origin)
+            target_chain_ns.append(msg_set[msg_index]["timestamp"])
         init_ns = target_chain_ns[0]
 
         # print("1")
@@ -1067,7 +1151,7 @@ class BenchmarkAnalyzer:
                 legend_label=self.target_chain_dissambiguous[msg_index],
                 size=10,
             )        
-            if "robotperf_image_input_cb_fini" in msg_set[msg_index].event.name:
+            if "robotperf_image_input_cb_fini" in self.event_name(msg_set[msg_index]):
                 label = Label(
                     x=(target_chain_ns[msg_index] - init_ns) / 1e6,
                     y=self.target_chain_label_layer[msg_index],
@@ -1076,7 +1160,7 @@ class BenchmarkAnalyzer:
                     text=self.target_chain_dissambiguous[msg_index].split(":")[-1],
                 )
 
-            elif "robotperf_image_output_cb_init" in msg_set[msg_index].event.name:
+            elif "robotperf_image_output_cb_init" in self.event_name(msg_set[msg_index]):
                 label = Label(
                     x=(target_chain_ns[msg_index] - init_ns) / 1e6,
                     y=self.target_chain_label_layer[msg_index],
@@ -1133,7 +1217,7 @@ class BenchmarkAnalyzer:
 
         target_chain_ns = []
         for msg_index in range(len(msg_set)):
-            target_chain_ns.append(msg_set[msg_index].default_clock_snapshot.ns_from_origin)
+            target_chain_ns.append(msg_set[msg_index]["timestamp"])
         init_ns = target_chain_ns[0]
 
         # draw durations
@@ -1319,7 +1403,7 @@ class BenchmarkAnalyzer:
                 legend_label=self.target_chain_dissambiguous[msg_index],
                 size=10,
             )        
-            if "robotperf_image_input_cb_fini" in msg_set[msg_index].event.name:
+            if "robotperf_image_input_cb_fini" in self.event_name(msg_set[msg_index]):
                 label = Label(
                     x=(target_chain_ns[msg_index] - init_ns) / 1e6,
                     y=self.target_chain_label_layer[msg_index],
@@ -1328,7 +1412,7 @@ class BenchmarkAnalyzer:
                     text=self.target_chain_dissambiguous[msg_index].split(":")[-1],
                 )
 
-            elif "robotperf_image_output_cb_init" in msg_set[msg_index].event.name:
+            elif "robotperf_image_output_cb_init" in self.event_name(msg_set[msg_index]):
                 label = Label(
                     x=(target_chain_ns[msg_index] - init_ns) / 1e6,
                     y=self.target_chain_label_layer[msg_index],
@@ -1359,244 +1443,310 @@ class BenchmarkAnalyzer:
 
     def barchart_data_power(self, image_pipeline_msg_sets):
         """
-        Converts a tracing message list into its corresponding 
+        Converts a message set array into its corresponding 
         power list in watss.
 
         Args:
-            image_pipeline_msg_sets ([type]): [description]
+            image_pipeline_msg_sets (np.ndarray): message sets, 2D (one
+                row per set) or 1D (a single set)
 
         Returns:
-            list: list of throughput in bytes/s
+            float: power of the last set, in watts (list of the
+            powers in the set if not multidimensional)
         """
-        image_pipeline_msg_sets_ns = []
-        image_pipeline_msg_sets_watts = []
-        image_pipeline_msg_sets_joules = []
-        image_pipeline_msg_sets_seconds = []
-        total_watts = 0
-        total_joules = 0
-        total_seconds = 0
-        
-        # if multidimensional:
-        if type(image_pipeline_msg_sets[0]) == list:
-            for set_index in range(len(image_pipeline_msg_sets)):
-                power_chain_watts = []
-                # power_chain_joules = []
-                # power_chain_seconds = []
-                
-                for msg_index in range(len(image_pipeline_msg_sets[set_index])):
-                    payload_fields = image_pipeline_msg_sets[set_index][msg_index].event.payload_field
-                    for field_name, field_value in payload_fields.items():
-                        if "msg_power" in field_name:
-                            watts = image_pipeline_msg_sets[set_index][msg_index].event.payload_field[field_name]
-                        # elif "msg_energy" in field_name:    
-                        #     joules = image_pipeline_msg_sets[set_index][msg_index].event.payload_field[field_name]
-                        # elif "msg_time" in field_name:  
-                        #     seconds = image_pipeline_msg_sets[set_index][msg_index].event.payload_field[field_name]
-                    power_chain_watts.append(watts)
-                    # power_chain_joules.append(joules)
-                    # power_chain_seconds.append(seconds)
-                
-                image_pipeline_msg_sets_watts.append(power_chain_watts)
-                # image_pipeline_msg_sets_joules.append(power_chain_joules)
-                # image_pipeline_msg_sets_seconds.append(power_chain_seconds)
-                total_watts = image_pipeline_msg_sets_watts[-1][0]
-                # total_joules = image_pipeline_msg_sets_joules[-1][0]
-                # total_seconds = image_pipeline_msg_sets_seconds[-1][0]
+        image_pipeline_msg_sets_watts = image_pipeline_msg_sets["power"]
 
+        # if multidimensional:
+        if image_pipeline_msg_sets_watts.ndim == 2:
+            total_watts = image_pipeline_msg_sets_watts[-1][0]
         else:  # not multidimensional
-            power_chain_watts = []
-            # power_chain_joules = []
-            # power_chain_seconds = []
-            
-            for msg_index in range(len(image_pipeline_msg_sets)):
-                payload_fields = image_pipeline_msg_sets[msg_index].event.payload_field
-                for field_name, field_value in payload_fields.items():
-                    if "msg_power" in field_name:
-                        watts = image_pipeline_msg_sets[msg_index].event.payload_field[field_name]
-                    # elif "msg_energy" in field_name:    
-                    #     joules = image_pipeline_msg_sets[msg_index].event.payload_field[field_name]
-                    # elif "msg_time" in field_name:  
-                    #     seconds = image_pipeline_msg_sets[msg_index].event.payload_field[field_name]
-                power_chain_watts.append(watts)
-                # power_chain_joules.append(joules)
-                # power_chain_seconds.append(seconds)
-            
-            image_pipeline_msg_sets_watts.append(power_chain_watts)
-            # image_pipeline_msg_sets_joules.append(power_chain_joules)
-            # image_pipeline_msg_sets_seconds.append(power_chain_seconds) 
-            total_watts = image_pipeline_msg_sets_watts[-1]
-            # total_joules = image_pipeline_msg_sets_joules[-1]
-            # total_seconds = image_pipeline_msg_sets_seconds[-1]      
-
-        # print(image_pipeline_msg_sets_watts)   
-        # print(image_pipeline_msg_sets_joules)  
-        # print(image_pipeline_msg_sets_seconds)  
-        # print(total_watts)
-        # print(total_joules)
-        # print(total_seconds)
+            total_watts = image_pipeline_msg_sets_watts.tolist()
         return total_watts
     
     def barchart_data_throughput(self, image_pipeline_msg_sets, option):
         """
-        Converts a tracing message list into its corresponding 
+        Converts a message set array into its corresponding 
         throughput list in bytes per second unit.
-        - latency is measured relative (to the previous tracepoint) in
+        - latency is measured relative (to the first tracepoint) in
         millisecond units.
         - size is measured in bytes
         - count is measured in number messages
 
         Args:
-            image_pipeline_msg_sets ([type]): [description]
+            image_pipeline_msg_sets (np.ndarray): message sets, 2D (one
+                row per set) or 1D (a single set)
+            option (string): 'potential', 'real' or 'steady' (real, only
+                within the steady state, see steady_state_region)
 
         Returns:
-            list: list of throughput in bytes/s
+            list: list of throughput in MB/s
+            list: list of throughput in fps
         """
-        image_pipeline_msg_sets_ns = []
-        image_pipeline_msg_sets_bytes = []
-        image_pipeline_msg_sets_frames = []
-        image_pipeline_msg_sets_msgs = []
-        
-        # if multidimensional:
-        if type(image_pipeline_msg_sets[0]) == list:
-            for set_index in range(len(image_pipeline_msg_sets)):
-                aux_set = []
-                target_chain_ns = []
-                target_chain_bytes = []
-                target_chain_msgs = []
-                target_chain_frames = []
-                
-                for msg_index in range(len(image_pipeline_msg_sets[set_index])):
-                    target_chain_ns.append(
-                        image_pipeline_msg_sets[set_index][
-                            msg_index
-                        ].default_clock_snapshot.ns_from_origin
-                    )
-                    # search for message sizes
-                    msg_size = 0
-                    msg_count = 0
-                    payload_fields = image_pipeline_msg_sets[set_index][msg_index].event.payload_field
-                    for field_name, field_value in payload_fields.items():
-                        if "msg_size" in field_name:
-                            msg_size += image_pipeline_msg_sets[set_index][msg_index].event.payload_field[field_name]
-                            msg_count += 1
-                    target_chain_bytes.append(msg_size)
-                    target_chain_msgs.append(msg_count)
-                    if msg_count > 0:
-                        target_chain_frames.append(1)
-                    else:
-                        target_chain_frames.append(0)
-                for msg_index in range(len(image_pipeline_msg_sets[set_index])):                  
-                    if msg_index == 0 and set_index == 0:
-                        previous = target_chain_ns[0]
-                    aux_set.append((target_chain_ns[msg_index] - previous) / 1e6)
-                image_pipeline_msg_sets_ns.append(aux_set)
-                image_pipeline_msg_sets_bytes.append(target_chain_bytes)
-                image_pipeline_msg_sets_msgs.append(target_chain_msgs)
-                image_pipeline_msg_sets_frames.append(target_chain_frames)
+        # if not multidimensional, consider a single set
+        image_pipeline_msg_sets = np.atleast_2d(image_pipeline_msg_sets)
+
+        # relative to the first tracepoint of the first set, in ms
+        image_pipeline_msg_sets_ns = image_pipeline_msg_sets["timestamp"]
+        if image_pipeline_msg_sets_ns.size:
+            image_pipeline_msg_sets_ns = (image_pipeline_msg_sets_ns - image_pipeline_msg_sets_ns[0][0]) / 1e6
+        image_pipeline_msg_sets_bytes = image_pipeline_msg_sets["msg_size"]
+        image_pipeline_msg_sets_msgs = image_pipeline_msg_sets["msg_count"]
+        image_pipeline_msg_sets_frames = (image_pipeline_msg_sets_msgs > 0).astype(np.int64)
+
+        # Compute throughput from the output [-2]
+        image_pipeline_msg_sets_megabyps = np.array([])
+        image_pipeline_msg_sets_fps = np.array([])
 
-        else:  # not multidimensional
-            aux_set = []
-            target_chain_ns = []
-            target_chain_bytes = []
-            target_chain_msgs = []
-            target_chain_frames = []
-            for msg_index in range(len(image_pipeline_msg_sets)):
-                target_chain_ns.append(
-                    image_pipeline_msg_sets[msg_index].default_clock_snapshot.ns_from_origin
-                )
-                # search for message sizes
-                msg_size = 0
-                msg_count = 0
-                payload_fields = image_pipeline_msg_sets[msg_index].event.payload_field
-                for field_name, field_value in payload_fields.items():
-                    if "msg_size" in field_name:
-                        msg_size += image_pipeline_msg_sets[msg_index].event.payload_field[field_name]
-                        msg_count += 1
-                target_chain_bytes.append(msg_size)
-                target_chain_msgs.append(msg_count)
-                if msg_count > 0:
-                    target_chain_frames.append(1)
-                else:
-                    target_chain_frames.append(0)
-            for msg_index in range(len(image_pipeline_msg_sets)):
-                if msg_index == 0:
-                    previous = target_chain_ns[0]
-                aux_set.append((target_chain_ns[msg_index] - previous) / 1e6)
-            image_pipeline_msg_sets_ns.append(aux_set)
-            image_pipeline_msg_sets_bytes.append(target_chain_bytes)
-            image_pipeline_msg_sets_msgs.append(target_chain_msgs)
-            image_pipeline_msg_sets_frames.append(target_chain_frames)
-        
-        # Compute throughput from the output [-1]
-        image_pipeline_msg_sets_megabyps = []
-        image_pipeline_msg_sets_msgspers = []
-        image_pipeline_msg_sets_fps = []
-        
         if option == 'potential':
-            for set_idx in range(len(image_pipeline_msg_sets_ns)):
-                tot_lat = image_pipeline_msg_sets_ns[set_idx][-1] - image_pipeline_msg_sets_ns[set_idx][0]
-                image_pipeline_msg_sets_megabyps.append(image_pipeline_msg_sets_bytes[set_idx][-2]/tot_lat/1e6*1e3)
-                image_pipeline_msg_sets_msgspers.append(image_pipeline_msg_sets_msgs[set_idx][-2]/tot_lat*1e3)
-                image_pipeline_msg_sets_fps.append(image_pipeline_msg_sets_frames[set_idx][-2]/tot_lat*1e3)
-
-        elif option == 'real':
-            for set_idx in range(len(image_pipeline_msg_sets_ns)-1):
-                tot_lat = image_pipeline_msg_sets_ns[set_idx+1][1] - image_pipeline_msg_sets_ns[set_idx][1]
-                image_pipeline_msg_sets_megabyps.append(image_pipeline_msg_sets_bytes[set_idx][-2]/tot_lat/1e6*1e3)
-                image_pipeline_msg_sets_msgspers.append(image_pipeline_msg_sets_msgs[set_idx][-2]/tot_lat*1e3)
-                image_pipeline_msg_sets_fps.append(image_pipeline_msg_sets_frames[set_idx][-2]/tot_lat*1e3)
-                
-                
-        return image_pipeline_msg_sets_megabyps, image_pipeline_msg_sets_fps
+            tot_lat = image_pipeline_msg_sets_ns[:, -1] - image_pipeline_msg_sets_ns[:, 0]
+            image_pipeline_msg_sets_megabyps = image_pipeline_msg_sets_bytes[:, -2]/tot_lat/1e6*1e3
+            image_pipeline_msg_sets_fps = image_pipeline_msg_sets_frames[:, -2]/tot_lat*1e3
+
+        elif option in ('real', 'steady'):
+            tot_lat = image_pipeline_msg_sets_ns[1:, 1] - image_pipeline_msg_sets_ns[:-1, 1]
+            image_pipeline_msg_sets_megabyps = image_pipeline_msg_sets_bytes[:-1, -2]/tot_lat/1e6*1e3
+            image_pipeline_msg_sets_fps = image_pipeline_msg_sets_frames[:-1, -2]/tot_lat*1e3
+
+            if option == 'steady' and len(image_pipeline_msg_sets) > 1:
+                first, last = self.steady_state_region(image_pipeline_msg_sets)
+                # the output of each set counted, as in steady_state_region
+                timestamps = image_pipeline_msg_sets["timestamp"][:-1, -2]
+                steady = (timestamps >= first) & (timestamps < last)
+                image_pipeline_msg_sets_megabyps = image_pipeline_msg_sets_megabyps[steady]
+                image_pipeline_msg_sets_fps = image_pipeline_msg_sets_fps[steady]
+
+        return image_pipeline_msg_sets_megabyps.tolist(), image_pipeline_msg_sets_fps.tolist()
+
+
+    def throughput_timeline(self, image_pipeline_msg_sets, window=None, step=None):
+        """
+        Throughput of the output (the tracepoint whose size is reported,
+        see barchart_data_throughput) over sliding windows
+
+        Args:
+            image_pipeline_msg_sets (np.ndarray): 2D message sets
+            window (float, optional): seconds. Defaults to throughput_window.
+            step (float, optional): seconds between windows. Defaults to window.
+
+        Returns:
+            tuple: (start of each window in s, fps, MB/s)
+        """
+        if window is None:
+            window = self.throughput_window
+        image_pipeline_msg_sets = np.atleast_2d(image_pipeline_msg_sets)
+        timestamps = image_pipeline_msg_sets["timestamp"][:, -2]
+        frames = image_pipeline_msg_sets["msg_count"][:, -2] > 0
+        starts, fps = windowed_rate(timestamps, frames, window, step)
+        _, bytes_per_second = windowed_rate(timestamps, image_pipeline_msg_sets["msg_size"][:, -2], window, step)
+        return starts, fps, bytes_per_second / 1e6
+
+    def steady_state_region(self, image_pipeline_msg_sets):
+        """
+        Returns the steady state of a run as (first, last) timestamps in
+        ns, trimming the warm-up and cool-down of its fps timeline (see
+        throughput.steady_state). The whole run if it is too short.
+        """
+        image_pipeline_msg_sets = np.atleast_2d(image_pipeline_msg_sets)
+        timestamps = image_pipeline_msg_sets["timestamp"][:, -2]
+        starts, fps, _ = self.throughput_timeline(image_pipeline_msg_sets)
+        first, last = steady_state(fps)
+        if last <= first:
+            return int(timestamps[0]), int(timestamps[-1]) + 1
+        origin = int(timestamps[0])
+        window = int(self.throughput_window * 1e9)
+        return origin + int(starts[first] * 1e9), origin + int(starts[last - 1] * 1e9) + window
+
+    def steady_state_throughput(self, image_pipeline_msg_sets):
+        """
+        Returns the mean fps and MB/s of the output over the windows of
+        the steady state (see steady_state_region), and the number of
+        windows. NaN if the run is too short.
+        """
+        image_pipeline_msg_sets = np.atleast_2d(image_pipeline_msg_sets)
+        if len(image_pipeline_msg_sets) < 2:
+            return float("nan"), float("nan"), 0
+        starts, fps, megabyps = self.throughput_timeline(image_pipeline_msg_sets)
+        first, last = self.steady_state_region(image_pipeline_msg_sets)
+        origin = image_pipeline_msg_sets["timestamp"][0, -2]
+        steady = (starts * 1e9 + origin >= first) & (starts * 1e9 + origin < last)
+        if not steady.any():
+            return float("nan"), float("nan"), 0
+        return float(fps[steady].mean()), float(megabyps[steady].mean()), int(np.count_nonzero(steady))
+
+    def print_throughput_timeline(self, image_pipeline_msg_sets):
+        """Prints the steady state of the throughput timeline"""
+        image_pipeline_msg_sets = np.atleast_2d(image_pipeline_msg_sets)
+        fps, megabyps, windows = self.steady_state_throughput(image_pipeline_msg_sets)
+        if not windows:
+            return
+        first, last = self.steady_state_region(image_pipeline_msg_sets)
+        origin = image_pipeline_msg_sets["timestamp"][0, -2]
+        print("")
+        print("Steady state from {:.2f} s to {:.2f} s of {:.2f} s ({} windows of {} s): {:.2f} fps, {:.2f} MB/s".format(
+            (first - origin) / 1e9,
+            (last - origin) / 1e9,
+            (image_pipeline_msg_sets["timestamp"][-1, -2] - origin) / 1e9,
+            windows,
+            self.throughput_window,
+            fps,
+            megabyps,
+        ))
+
+    def bytes_moved(self, image_pipeline_msg_sets):
+        """
+        Bytes in and out of each stage (callback) of the chain and copies
+        of the messages between stages, see copies.py. Stages are named
+        as in latency_attribution.
+
+        Args:
+            image_pipeline_msg_sets (np.ndarray): 2D message sets
 
+        Returns:
+            dict: "stages", node -> stage_bytes, and "hops",
+            "publisher → subscriber" -> hop_copies (None without addresses)
+        """
+        sets = np.atleast_2d(image_pipeline_msg_sets)
+        spans = [
+            (self.target_chain_node[opening] or node, opening, closing)
+            for node, opening, closing in callback_spans(self.target_chain)
+        ]
+        moved = {"stages": {}, "hops": {}}
+        if not len(sets):
+            return moved
+        for node, opening, closing in spans:
+            moved["stages"][node] = stage_bytes(sets["msg_size"], sets["timestamp"], opening, closing)
+        for publisher, subscriber, published, received in hops(spans):
+            moved["hops"][publisher + " → " + subscriber] = hop_copies(
+                sets["msg_addr"], sets["msg_size"], sets["timestamp"], published, received)
+        return moved
+
+    def print_bytes_moved(self, image_pipeline_msg_sets):
+        """Prints the bytes moved per stage and the copies between them, see bytes_moved()"""
+        moved = self.bytes_moved(image_pipeline_msg_sets)
+        if not moved["stages"]:
+            return moved
+        print("")
+        print("| Stage | Bytes in | Bytes out | In | Out |")
+        print("| --- | --- | --- | --- | --- |")
+        for node, stage in moved["stages"].items():
+            print("| {} | {:.0f} B | {:.0f} B | {:.2f} MB/s | {:.2f} MB/s |".format(
+                node, stage["in"], stage["out"], stage["in_rate"], stage["out_rate"]))
+        if moved["hops"]:
+            print("")
+            print("| Hop | Copied | Resized | Copied bytes | Copy bandwidth |")
+            print("| --- | --- | --- | --- | --- |")
+            for hop, copies in moved["hops"].items():
+                if copies is None:
+                    print("| {} | - | - | - | - |".format(hop))
+                    continue
+                print("| {} | {:.2f} % | {:.2f} % | {:.0f} B | {:.2f} MB/s |".format(
+                    hop, copies["copied"] * 100, copies["resized"] * 100,
+                    copies["copied_bytes"], copies["copy_rate"]))
+            copying = [hop for hop, copies in moved["hops"].items() if copies is not None and copies["copied"] > 0]
+            if copying:
+                print("")
+                print("Not zero-copy: " + ", ".join(copying))
+        return moved
 
     def barchart_data_latency(self, image_pipeline_msg_sets):
         """
-        Converts a tracing message list into its corresponding
+        Converts a message set array into its corresponding
         relative (to the previous tracepoint) latency list in
         millisecond units.
 
+        In graph-shaped chains (see is_dag) each tracepoint is relative
+        to its latest predecessor instead, and roots to the earliest
+        root, so that branches never subtract from each other. The
+        latency over several tracepoints is then given by set_totals.
+
         Args:
-            image_pipeline_msg_sets ([type]): [description]
+            image_pipeline_msg_sets (np.ndarray): message sets, 2D (one
+                row per set) or 1D (a single set)
 
         Returns:
-            list: list of relative latencies, in ms
+            np.ndarray: relative latencies, in ms, one row per set
         """
-        image_pipeline_msg_sets_ns = []
-        # if multidimensional:list
-        if type(image_pipeline_msg_sets[0]) == list:
-            for set_index in range(len(image_pipeline_msg_sets)):
-                aux_set = []
-                target_chain_ns = []
-                for msg_index in range(len(image_pipeline_msg_sets[set_index])):
-                    target_chain_ns.append(
-                        image_pipeline_msg_sets[set_index][
-                            msg_index
-                        ].default_clock_snapshot.ns_from_origin
-                    )
-                for msg_index in range(len(image_pipeline_msg_sets[set_index])):
-                    if msg_index == 0:
-                        previous = target_chain_ns[0]
-                    else:
-                        previous = target_chain_ns[msg_index - 1]
-                    aux_set.append((target_chain_ns[msg_index] - previous) / 1e6)
-                image_pipeline_msg_sets_ns.append(aux_set)
-        else:  # not multidimensional
-            aux_set = []
-            target_chain_ns = []
-            for msg_index in range(len(image_pipeline_msg_sets)):
-                target_chain_ns.append(
-                    image_pipeline_msg_sets[msg_index].default_clock_snapshot.ns_from_origin
-                )
-            for msg_index in range(len(image_pipeline_msg_sets)):
-                if msg_index == 0:
-                    previous = target_chain_ns[0]
-                else:
-                    previous = target_chain_ns[msg_index - 1]
-                aux_set.append((target_chain_ns[msg_index] - previous) / 1e6)
-            image_pipeline_msg_sets_ns.append(aux_set)
+        # if not multidimensional, consider a single set
+        image_pipeline_msg_sets_ns = np.atleast_2d(image_pipeline_msg_sets["timestamp"])
+        if self.is_dag() and image_pipeline_msg_sets_ns.shape[1] == len(self.target_chain):
+            latencies, _ = segment_latencies(image_pipeline_msg_sets_ns, self.target_chain_after)
+            roots = [index for index, after in enumerate(self.target_chain_after) if not after]
+            roots_ns = image_pipeline_msg_sets_ns[:, roots]
+            latencies[:, roots] = (roots_ns - roots_ns.min(axis=1, keepdims=True)) / 1e6
+            return latencies
+        return np.diff(
+            image_pipeline_msg_sets_ns,
+            axis=1,
+            prepend=image_pipeline_msg_sets_ns[:, :1]
+        ) / 1e6
+
+    def dag_latency(self, image_pipeline_msg_sets):
+        """
+        Latency breakdown of a graph-shaped target chain, in ms, one
+        value per message set:
 
-        return image_pipeline_msg_sets_ns
+        - "end_to_end": from the earliest root to the latest sink
+        - "edges": for each "a → b", time from a to b
+        - "branches": for each input "root → a" of a join, time from the
+          root of the branch to a
+        - "sync_wait": for each join, time its earliest input waited for
+          the latest one
+
+        Args:
+            image_pipeline_msg_sets (np.ndarray): 2D message sets, one
+                column per target (see msgsets_from_trace_dag)
+
+        Returns:
+            dict: name (or dict of names) to np.ndarray
+        """
+        timestamps = np.atleast_2d(image_pipeline_msg_sets["timestamp"])
+        names = self.target_chain_dissambiguous
+        after = self.target_chain_after
+        roots = [index for index in range(len(names)) if not after[index]]
+        sinks = [
+            index for index in range(len(names))
+            if not any(index in preds for preds in after)
+        ]
+
+        def root_of(index):
+            while after[index]:
+                index = after[index][0]
+            return index
+
+        latency = {
+            "end_to_end": (timestamps[:, sinks].max(axis=1) - timestamps[:, roots].min(axis=1)) / 1e6,
+            "edges": {},
+            "branches": {},
+            "sync_wait": {},
+        }
+        for index, preds in enumerate(after):
+            for pred in preds:
+                latency["edges"][names[pred] + " → " + names[index]] \
+                    = (timestamps[:, index] - timestamps[:, pred]) / 1e6
+            if len(preds) > 1:
+                for pred in preds:
+                    latency["branches"][names[root_of(pred)] + " → " + names[pred]] \
+                        = (timestamps[:, pred] - timestamps[:, root_of(pred)]) / 1e6
+                latency["sync_wait"][names[index]] \
+                    = (timestamps[:, preds].max(axis=1) - timestamps[:, preds].min(axis=1)) / 1e6
+        return latency
+
+    def print_dag_latency(self, image_pipeline_msg_sets):
+        """Prints the latency breakdown of a graph-shaped target chain (see dag_latency)"""
+        if not len(image_pipeline_msg_sets):
+            return
+        latency = self.dag_latency(image_pipeline_msg_sets)
+        rows = [("end-to-end", latency["end_to_end"])]
+        rows += [("branch " + name, value) for name, value in latency["branches"].items()]
+        rows += [("sync wait at " + name, value) for name, value in latency["sync_wait"].items()]
+        rows += [(name, value) for name, value in latency["edges"].items()]
+
+        print("")
+        print("| Segment | Mean (ms) | Max (ms) | Min (ms) |")
+        print("| --- | --- | --- | --- |")
+        for name, value in rows:
+            print("| {} | {:.4f} | {:.4f} | {:.4f} |".format(
+                name, np.mean(value), np.max(value), np.min(value)))
 
     def print_timeline(self, image_pipeline_msg_sets):
 
@@ -1604,41 +1754,27 @@ class BenchmarkAnalyzer:
             if len(msg_set) != len(self.target_chain):
                 print(
                     color(
-                        "Not a complete set: " + str([x.event.name for x in msg_set]),
+                        "Not a complete set: " + str([self.event_name(x) for x in msg_set]),
                         fg="red",
                     )
                 )
                 pass
             else:
-                target_chain_ns = []
-                for msg_index in range(len(msg_set)):
-                    target_chain_ns.append(
-                        msg_set[msg_index].default_clock_snapshot.ns_from_origin
-                    )
-
-                init_ns = target_chain_ns[0]
-                fixed_target_chain_ns = [init_ns] + target_chain_ns
+                # relative to the previous (or, in graphs, latest preceding) tracepoint
+                latencies_ms = self.barchart_data_latency(msg_set)
                 # stringout = color("raw image → " + msg_set[0].event.name + " → ")
                 stringout = color("raw image ")
                 for msg_index in range(len(msg_set)):
                     stringout += " → " + color(
-                        msg_set[msg_index].event.name
-                        + " ({} ms) ".format(
-                            (
-                                fixed_target_chain_ns[msg_index + 1]
-                                - fixed_target_chain_ns[msg_index]
-                            )
-                            / 1e6
-                        ),
+                        self.event_name(msg_set[msg_index])
+                        + " ({} ms) ".format(latencies_ms[0][msg_index]),
                         fg=self.target_chain_colors_fg[msg_index],
                         bg="black",
                     )
-                    # stringout += " → " + msg_set[msg_index].event.name + \
-                    #     " ({} ms) ".format((fixed_target_chain_ns[msg_index + 1] - fixed_target_chain_ns[msg_index])/1e6)
 
                 stringout += color(
                     "total "
-                    + " ({} ms) ".format((target_chain_ns[-1] - target_chain_ns[0]) / 1e6),
+                    + " ({} ms) ".format(self.set_totals(latencies_ms)[0]),
                     fg="black",
                     bg="white",
                 )
@@ -1664,6 +1800,65 @@ class BenchmarkAnalyzer:
         return np.median(np.array(list))
 
 
+    def window_slice(self, indices):
+        """
+        Returns the columns of the given indices as a slice when they are
+        contiguous (a view, no copy), cached per chain and indices
+        """
+        key = (tuple(self.target_chain_dissambiguous), tuple(indices))
+        if key not in self.window_slices:
+            indices = list(indices)
+            if indices == list(range(indices[0], indices[-1] + 1)):
+                self.window_slices[key] = slice(indices[0], indices[-1] + 1)
+            else:
+                self.window_slices[key] = np.array(indices)
+        return self.window_slices[key]
+
+    def set_totals(self, image_pipeline_msg_sets, indices=None):
+        """
+        Returns the sum of each set, as an array
+
+        :param: image_pipeline_msg_sets, 2D array (or list of lists), one row per set
+        :param: indices, list of indices to consider on each set which will be summed.
+        By default, sum of all values on each set.
+        """
+        sets = np.asarray(image_pipeline_msg_sets, dtype=np.float64)
+        if not len(sets):
+            return np.empty(0)
+        if self.is_dag() and sets.shape[1] == len(self.target_chain):
+            return self.dag_totals(sets, indices)
+        if indices:
+            sets = sets[:, self.window_slice(indices)]
+        return sets.sum(axis=1)
+
+    def dag_totals(self, image_pipeline_msg_sets, indices=None):
+        """
+        Returns the latency of each set of a graph-shaped chain (see
+        barchart_data_latency) along its critical path: from the earliest
+        root to the latest sink, or to the last of indices from the
+        latest predecessor of the first one
+        """
+        sets = np.asarray(image_pipeline_msg_sets, dtype=np.float64)
+        # time elapsed since the earliest root at each tracepoint
+        elapsed = np.zeros_like(sets)
+        for index, after in enumerate(self.target_chain_after):
+            elapsed[:, index] = sets[:, index] + (elapsed[:, after].max(axis=1) if after else 0)
+        if not indices:
+            sinks = [
+                index for index in range(len(self.target_chain))
+                if not any(index in after for after in self.target_chain_after)
+            ]
+            return elapsed[:, sinks].max(axis=1)
+        first, last = indices[0], indices[-1]
+        return elapsed[:, last] - (elapsed[:, first] - sets[:, first])
+
+    def window_totals(self, image_pipeline_msg_sets):
+        """
+        Returns the latency of each message set over the measurement
+        window (see get_window_indices()), as an array
+        """
+        return self.set_totals(image_pipeline_msg_sets, self.get_window_indices())
+
     def rms_sets(self, image_pipeline_msg_sets, indices=None):
         """
         Root-Mean-Square (RMS) (in the units provided) for a
@@ -1675,79 +1870,31 @@ class BenchmarkAnalyzer:
         :param: indices, list of indices to consider on each set which will be summed
         for rms. By default, sum of all values on each set.
         """
-
-        if indices:
-            with_indices_sets = []
-            for set in image_pipeline_msg_sets:
-                indices_sum = 0
-                for i in indices:
-                    indices_sum += set[i]
-                with_indices_sets.append(indices_sum)
-            return self.rms(with_indices_sets)
-        else:
-            total_in_sets = [sum(set) for set in image_pipeline_msg_sets]
-            return self.rms(total_in_sets)
-
+        return self.rms(self.set_totals(image_pipeline_msg_sets, indices))
 
     def mean_sets(self, image_pipeline_msg_sets, indices=None):
-        """
-
-        """
-        if indices:
-            with_indices_sets = []
-            for set in image_pipeline_msg_sets:
-                indices_sum = 0
-                for i in indices:
-                    indices_sum += set[i]
-                with_indices_sets.append(indices_sum)
-            return self.mean(with_indices_sets)
-        else:
-            total_in_sets = [sum(set) for set in image_pipeline_msg_sets]
-            return self.mean(total_in_sets)
-
+        return self.mean(self.set_totals(image_pipeline_msg_sets, indices))
 
     def max_sets(self, image_pipeline_msg_sets, indices=None):
-        if indices:
-            with_indices_sets = []
-            for set in image_pipeline_msg_sets:
-                indices_sum = 0
-                for i in indices:
-                    indices_sum += set[i]
-                with_indices_sets.append(indices_sum)
-            return self.max(with_indices_sets)
-        else:
-            total_in_sets = [sum(set) for set in image_pipeline_msg_sets]
-            return self.max(total_in_sets)
-
+        return self.max(self.set_totals(image_pipeline_msg_sets, indices))
 
     def min_sets(self, image_pipeline_msg_sets, indices=None):
-        if indices:
-            with_indices_sets = []
-            for set in image_pipeline_msg_sets:
-                indices_sum = 0
-                for i in indices:
-                    indices_sum += set[i]
-                with_indices_sets.append(indices_sum)
-            return self.min(with_indices_sets)
-        else:
-            total_in_sets = [sum(set) for set in image_pipeline_msg_sets]
-            return self.min(total_in_sets)
-        
+        return self.min(self.set_totals(image_pipeline_msg_sets, indices))
+
     def median_sets(self, image_pipeline_msg_sets, indices=None):
-        """
+        return self.median(self.set_totals(image_pipeline_msg_sets, indices))
 
+    def summary_statistics(self, values):
         """
-        if indices:
-            with_indices_sets = []
-            for set in image_pipeline_msg_sets:
-                indices_sum = 0
-                for i in indices:
-                    indices_sum += set[i]
-                with_indices_sets.append(indices_sum)
-            return self.median(with_indices_sets)
-        else:
-            total_in_sets = [sum(set) for set in image_pipeline_msg_sets]
-            return self.median(total_in_sets)
+        Returns [mean, rms, max, min] of a 1D array, squaring it only once
+        """
+        values = np.asarray(values, dtype=np.float64)
+        return [
+            values.mean(),
+            np.sqrt(np.dot(values, values) / len(values)),
+            values.max(),
+            values.min(),
+        ]
 
 
     def print_timeline_average(self, image_pipeline_msg_sets):
@@ -1761,7 +1908,7 @@ class BenchmarkAnalyzer:
             if len(msg_set) != len(self.target_chain):
                 print(
                     color(
-                        "Not a complete set: " + str([x.event.name for x in msg_set]),
+                        "Not a complete set: " + str([self.event_name(x) for x in msg_set]),
                         fg="red",
                     )
                 )
@@ -1771,7 +1918,7 @@ class BenchmarkAnalyzer:
                 final_target_chain_ns = []
                 for msg_index in range(len(msg_set)):
                     target_chain_ns.append(
-                        msg_set[msg_index].default_clock_snapshot.ns_from_origin
+                        msg_set[msg_index]["timestamp"]
                     )
                 init_ns = target_chain_ns[0]
                 fixed_target_chain_ns = [init_ns] + target_chain_ns
@@ -1795,7 +1942,7 @@ class BenchmarkAnalyzer:
         stringout = color("raw image ")
         for msg_index in range(len(image_pipeline_msg_ns_average[:-1])):
             stringout += " → " + color(
-                image_pipeline_msg_sets[0][msg_index].event.name
+                self.event_name(image_pipeline_msg_sets[0][msg_index])
                 + " ({} ms) ".format(
                     (
                         image_pipeline_msg_ns_average[msg_index + 1]
@@ -1820,34 +1967,14 @@ class BenchmarkAnalyzer:
 
     def statistics(self, image_pipeline_msg_sets_ms, verbose=False):
 
-        mean_ = self.mean_sets(image_pipeline_msg_sets_ms)
-        rms_ = self.rms_sets(image_pipeline_msg_sets_ms)
-        min_ = self.min_sets(image_pipeline_msg_sets_ms)
-        max_ = self.max_sets(image_pipeline_msg_sets_ms)
-        #median_ = self.median_sets(image_pipeline_msg_sets_ms)
-
-        # first_target = "ros2:callback_end"
-        first_target = "robotperf_benchmarks:robotperf_image_input_cb_init"
-        last_target = "robotperf_benchmarks:robotperf_image_output_cb_init"
-        
-        # # NOTE: we can particularizations for first_target and last_target
-        # #       as needed, e.g.
-        if "a4" in self.benchmark_name:
-            last_target = "robotperf_benchmarks:robotperf_pointcloud_output_cb_init"
-        #
-        # NOTE 2: find a way to parametrize this into the class
-
-        indices = [i for i in range(
-                    self.target_chain_dissambiguous.index(first_target),
-                    1 + self.target_chain_dissambiguous.index(last_target),
-                    )
-                ]
-
-        mean_benchmark = self.mean_sets(image_pipeline_msg_sets_ms,indices)
-        rms_benchmark = self.rms_sets(image_pipeline_msg_sets_ms, indices)
-        max_benchmark = self.max_sets(image_pipeline_msg_sets_ms, indices)
-        min_benchmark = self.min_sets(image_pipeline_msg_sets_ms, indices)
-        #median_benchmark = self.median_sets(image_pipeline_msg_sets_ms, indices)
+        # one (sets, stages) array, reduced once for the whole chain and
+        # once for the measurement window (see set_window() and load_analysis())
+        sets = np.asarray(image_pipeline_msg_sets_ms, dtype=np.float64)
+        window = self.window_totals(sets)
+        mean_, rms_, max_, min_ = self.summary_statistics(self.set_totals(sets))
+        mean_benchmark, rms_benchmark, max_benchmark, min_benchmark = self.summary_statistics(window)
+        #median_benchmark = self.median(window)
+        percentiles_benchmark = percentiles(window)
         
         if verbose:
             print(color("mean: " + str(mean_), fg="yellow"))
@@ -1861,6 +1988,7 @@ class BenchmarkAnalyzer:
             print("min benchmark: " + str(min_benchmark))
             print(color("max benchmark: " + str(max_benchmark), fg="red"))
             #print(color("median benchmark: " + str(max_benchmark), fg="yellow"))
+            print("percentiles benchmark: " + str(percentiles_benchmark))
 
         return [
             mean_benchmark,
@@ -1873,7 +2001,7 @@ class BenchmarkAnalyzer:
             max_,
             min_,
             #median_,
-        ]
+        ] + list(percentiles_benchmark.values())
     
     def statistics_1d(self, image_pipeline_msg_sets_ms, verbose=False):
 
@@ -1882,6 +2010,7 @@ class BenchmarkAnalyzer:
         max_benchmark = self.max(image_pipeline_msg_sets_ms)
         min_benchmark = self.min(image_pipeline_msg_sets_ms)
         #median_benchmark = self.median(image_pipeline_msg_sets_ms)
+        percentiles_benchmark = percentiles(image_pipeline_msg_sets_ms)
 
         if verbose:
             print(color("mean benchmark: " + str(mean_benchmark), fg="yellow"))
@@ -1889,6 +2018,7 @@ class BenchmarkAnalyzer:
             print("min benchmark: " + str(min_benchmark))
             print(color("max benchmark: " + str(max_benchmark), fg="red"))
             #print(color("median benchmark: " + str(median_benchmark), fg="yellow"))
+            print("percentiles benchmark: " + str(percentiles_benchmark))
 
         return [
             mean_benchmark,
@@ -1901,7 +2031,7 @@ class BenchmarkAnalyzer:
             '-',
             #'-',
             '-'
-        ]
+        ] + list(percentiles_benchmark.values())
 
 
     def print_markdown_table(self, list_sets, list_sets_names, from_baseline=True, units='ms', add_power=False, power_consumption=0.0):
@@ -1941,7 +2071,7 @@ class BenchmarkAnalyzer:
                     #"---",
                     #"---",
                     "---",
-                ],
+                ] + ["---"] * len(PERCENTILES),
             )
             list_statistics.insert(
                 0,
@@ -1957,7 +2087,7 @@ class BenchmarkAnalyzer:
                     "Max",
                     "Min",
                     #"Median",
-                ],
+                ] + ["Benchmark " + percentile_name(q).upper() for q in PERCENTILES],
             )
         else:
             # Add name to each statistics list
@@ -1979,7 +2109,7 @@ class BenchmarkAnalyzer:
                     #"---",
                     #"---",
                     "---",
-                ],
+                ] + ["---"] * len(PERCENTILES),
             )
             list_statistics.insert(
                 0,
@@ -1995,7 +2125,7 @@ class BenchmarkAnalyzer:
                     "Max",
                     "Min",
                     #"Median",
-                ],
+                ] + ["Benchmark " + percentile_name(q).upper() for q in PERCENTILES],
             )
         baseline = list_statistics[2]  # baseline for %
 
@@ -2089,6 +2219,284 @@ class BenchmarkAnalyzer:
             # count += 1
             # print(row)
 
+        if len(list_statistics) == 3:
+            self.print_funnel()
+
+    def latency_attribution(self, image_pipeline_msg_sets, q=99):
+        """
+        Attributes the latency over the measurement window to the layers
+        ("layer" of each target), nodes and segments of the chain, see
+        attribution.py. Nodes are inferred from callback boundaries unless
+        given with the "node" key of the targets.
+
+        Args:
+            image_pipeline_msg_sets (np.ndarray): 2D message sets
+            q (float, optional): percentile the tail starts at. Defaults to 99.
+
+        Returns:
+            dict: "layer", "node" and "segment", each a dict of key ->
+            statistics (see attribution.tail_attribution)
+        """
+        timestamps = np.atleast_2d(image_pipeline_msg_sets["timestamp"])
+        latencies, starts = segment_latencies(timestamps, self.target_chain_after)
+        nodes = [
+            given or inferred
+            for given, inferred in zip(self.target_chain_node, infer_nodes(self.target_chain))
+        ]
+        window = set(self.get_window_indices())
+        included = [index in window and start >= 0 for index, start in enumerate(starts)]
+        totals = latencies[:, included].sum(axis=1)
+
+        keys = {
+            "layer": [self.target_chain_layer[start] for start in starts],
+            "node": [nodes[start] for start in starts],
+            "segment": [
+                self.target_chain_dissambiguous[start] + " → " + self.target_chain_dissambiguous[index]
+                for index, start in enumerate(starts)
+            ],
+        }
+        return {
+            kind: tail_attribution(
+                attribute(latencies, [key if use else None for key, use in zip(kind_keys, included)]),
+                totals,
+                q,
+            )
+            for kind, kind_keys in keys.items()
+        }
+
+    def print_attribution(self, image_pipeline_msg_sets):
+        """Prints the latency per layer and node and what dominates the tail"""
+        if not len(np.atleast_2d(image_pipeline_msg_sets)):
+            return
+        attribution = self.latency_attribution(image_pipeline_msg_sets)
+        for kind in ("layer", "node"):
+            print("")
+            print("| {} | Mean | P50 | P99 | Share | Tail (p99) excess explained |".format(kind.capitalize()))
+            print("| --- | --- | --- | --- | --- | --- |")
+            for key, summary in attribution[kind].items():
+                print("| {} | {:.2f} ms | {:.2f} ms | {:.2f} ms | {:.2f} % | {:.2f} % |".format(
+                    key,
+                    summary["mean"],
+                    summary["p50"],
+                    summary["p99"],
+                    summary["share"] * 100,
+                    summary["tail_excess"] * 100,
+                ))
+        print("")
+        print("Tail (p99) dominated by layer {}, node {}, segment {}".format(
+            dominant(attribution["layer"]),
+            dominant(attribution["node"]),
+            dominant(attribution["segment"]),
+        ))
+        return attribution
+
+    def kernel_tail(self, trace_path, q=99):
+        """
+        Kernel scheduling of the message sets in the latency tail (see
+        kernel.py): on-CPU, runnable and blocked time of the callbacks
+        within the measurement window (from *_cb_init to *_cb_fini, each
+        on the thread that ran it), preempting tasks, IRQ time and
+        migrations. Compared against the sets at or below the median.
+
+        Args:
+            trace_path (string): path of the CTF tracefiles, recorded
+                with kernel tracing (TRACE_KERNEL=1)
+            q (float, optional): percentile the tail starts at. Defaults to 99.
+
+        Returns:
+            dict: "tail" and "body" aggregates (see kernel.tail_scheduling),
+            None if the trace has no kernel events or the window no callbacks
+        """
+        if not trace_path:
+            trace_path = "/tmp/analysis/trace"
+        events = self.get_session(trace_path).kernel_events
+        if not len(events):
+            return None
+        self.get_target_chain_traces(trace_path)
+        sets = np.atleast_2d(self.image_pipeline_msg_sets)
+        indices = self.get_window_indices()
+        # the window latency starts at the tracepoint before its first one
+        first, last = max(indices[0] - 1, 0), indices[-1]
+        spans = [
+            (opening, closing)
+            for _, opening, closing in callback_spans(self.target_chain)
+            if opening >= first and closing <= last
+        ]
+        if not len(sets) or not spans:
+            return None
+        totals = self.window_totals(self.barchart_data_latency(sets))
+        openings = [opening for opening, _ in spans]
+        closings = [closing for _, closing in spans]
+        callbacks = [
+            list(zip(starts, ends, tids))
+            for starts, ends, tids in zip(
+                sets["timestamp"][:, openings],
+                sets["timestamp"][:, closings],
+                sets["vtid"][:, openings],
+            )
+        ]
+
+        summary = {}
+        for part, selected in (
+            ("tail", totals >= np.percentile(totals, q)),
+            ("body", totals <= np.percentile(totals, 50)),
+        ):
+            _, summary[part] = tail_scheduling(
+                events, [callbacks[index] for index in np.flatnonzero(selected)])
+            summary[part]["latency"] = float(totals[selected].mean())
+        return summary
+
+    def print_kernel_tail(self, trace_path):
+        """Prints the kernel scheduling of the tail against the body, see kernel_tail()"""
+        summary = self.kernel_tail(trace_path)
+        if summary is None:
+            print("No kernel events or callbacks in the trace, record it with TRACE_KERNEL=1")
+            return None
+        print("")
+        print("| Message sets | Count | Latency | Callbacks | On-CPU | Runnable | Blocked | IRQ | Migrations |")
+        print("| --- | --- | --- | --- | --- | --- | --- | --- | --- |")
+        for part, name in (("tail", "Tail (p99)"), ("body", "Median and below")):
+            aggregate = summary[part]
+            print("| {} | {} | {:.2f} ms | {:.2f} ms | {} | {} | {} | {} | {:.2f} |".format(
+                name,
+                aggregate["sets"],
+                aggregate["latency"],
+                aggregate["wall"] / 1e6,
+                *[
+                    "{:.2f} ms ({:.1f} %)".format(aggregate[key] / 1e6, aggregate["share"][key] * 100)
+                    for key in ("on_cpu", "runnable", "blocked", "irq")
+                ],
+                aggregate["migrations"],
+            ))
+        preemptors = sorted(summary["tail"]["preemptors"].items(), key=lambda item: -item[1])
+        if preemptors:
+            print("")
+            print("| Preempting task (tail) | Time per set |")
+            print("| --- | --- |")
+            for comm, time in preemptors[:10]:
+                print("| {} | {:.2f} ms |".format(comm, time / 1e6))
+        return summary
+
+    def callback_cpu(self, trace_path):
+        """
+        On-CPU against wall time of the callbacks of each node (from
+        *_cb_init to *_cb_fini, or ros2:callback_start to callback_end)
+        on the thread (vtid) that ran them, and the utilisation of each
+        core by each node over the run, see kernel.py. Nodes are named as
+        in latency_attribution.
+
+        Args:
+            trace_path (string): path of the CTF tracefiles, recorded
+                with kernel tracing (TRACE_KERNEL=1)
+
+        Returns:
+            dict: "nodes", node -> mean "wall", "on_cpu", "runnable" and
+            "blocked" (ms) and "cpu_bound" (on-CPU over wall time), and
+            "cores", see kernel.core_utilisation. None if the trace has no
+            kernel events or the chain no callbacks
+        """
+        if not trace_path:
+            trace_path = "/tmp/analysis/trace"
+        events = self.get_session(trace_path).kernel_events
+        if not len(events):
+            return None
+        self.get_target_chain_traces(trace_path)
+        sets = np.atleast_2d(self.image_pipeline_msg_sets)
+        spans = callback_spans(self.target_chain)
+        if not len(sets) or not spans:
+            return None
+
+        callbacks = {}
+        for node, opening, closing in spans:
+            node = self.target_chain_node[opening] or node
+            callbacks.setdefault(node, []).append((opening, closing))
+        nodes = {}
+        threads = {}
+        for node, node_spans in callbacks.items():
+            openings = [opening for opening, _ in node_spans]
+            closings = [closing for _, closing in node_spans]
+            times = callback_times(
+                events,
+                sets["timestamp"][:, openings].ravel(),
+                sets["timestamp"][:, closings].ravel(),
+                sets["vtid"][:, openings].ravel(),
+            )
+            threads[node] = np.unique(sets["vtid"][:, openings])
+            if not len(times["wall"]):
+                continue
+            # per message set, a node may run several callbacks
+            count = len(times["wall"]) / len(node_spans)
+            nodes[node] = {key: values.sum() / count / 1e6 for key, values in times.items()}
+            nodes[node]["callbacks"] = len(times["wall"])
+            nodes[node]["cpu_bound"] = times["on_cpu"].sum() / times["wall"].sum() if times["wall"].sum() else float("nan")
+        return {
+            "nodes": nodes,
+            "cores": core_utilisation(events, threads, sets["timestamp"].min(), sets["timestamp"].max()),
+        }
+
+    def print_callback_cpu(self, trace_path):
+        """Prints on-CPU against wall time per node and core utilisation, see callback_cpu()"""
+        summary = self.callback_cpu(trace_path)
+        if summary is None:
+            print("No kernel events or callbacks in the trace, record it with TRACE_KERNEL=1")
+            return None
+        print("")
+        print("| Node | Callbacks | Wall | On-CPU | On-CPU / wall | Runnable | Blocked |")
+        print("| --- | --- | --- | --- | --- | --- | --- |")
+        for node, times in summary["nodes"].items():
+            print("| {} | {} | {:.2f} ms | {:.2f} ms | {:.2f} % | {:.2f} ms | {:.2f} ms |".format(
+                node,
+                times["callbacks"],
+                times["wall"],
+                times["on_cpu"],
+                times["cpu_bound"] * 100,
+                times["runnable"],
+                times["blocked"],
+            ))
+        nodes = list(summary["nodes"])
+        print("")
+        print("| Core | Busy | " + " | ".join(nodes) + " |")
+        print("| --- | --- | " + " | ".join(["---"] * len(nodes)) + " |")
+        for cpu, utilisation in sorted(summary["cores"].items()):
+            print("| {} | {:.2f} % | ".format(cpu, utilisation["busy"] * 100) + " | ".join(
+                "{:.2f} %".format(utilisation.get(node, 0.0) * 100) for node in nodes) + " |")
+        return summary
+
+    def print_funnel(self):
+        """
+        Prints the per-stage drop funnel of the target chain (see
+        drop_funnel): messages reaching each tracepoint, those lost right
+        before it, and the worst drop rate over 1 second windows.
+        """
+        if self.funnel is None:
+            return
+        print("")
+        print("| Stage | Reached | Dropped | Drop rate | Worst drop rate (1 s) |")
+        print("| --- | --- | --- | --- | --- |")
+        over_time = self.funnel["drop_rate_over_time"]
+        for stage, name in enumerate(self.target_chain_dissambiguous):
+            worst = over_time[:, stage].max() if len(over_time) else 0.0
+            print("| {} | {} | {} | {:.2f} % | {:.2f} % |".format(
+                name,
+                self.funnel["reached"][stage],
+                self.funnel["dropped"][stage],
+                self.funnel["drop_rate"][stage] * 100,
+                worst * 100,
+            ))
+
+    def funnel_note(self):
+        """Returns the drops per stage, for the note of the results"""
+        if self.funnel is None:
+            return ""
+        drops = [
+            "{} {:.2f} %".format(name, rate * 100)
+            for name, rate in zip(self.target_chain_dissambiguous, self.funnel["drop_rate"])
+            if rate > 0
+        ]
+        if not drops:
+            return ""
+        return ", drops per stage " + ", ".join(drops)
+
     def print_markdown_table_1d(self, list_sets, list_sets_names, from_baseline=True, units='ms', add_power=False, power_consumption=None):
         """
         Creates a markdown table from a list of sets
@@ -2126,7 +2534,7 @@ class BenchmarkAnalyzer:
                     "---",
                     "---",
                     "---",
-                ],
+                ] + ["---"] * len(PERCENTILES),
             )
             list_statistics.insert(
                 0,
@@ -2142,7 +2550,7 @@ class BenchmarkAnalyzer:
                     " ",
                     " ",
                     " ",
-                ],
+                ] + ["Benchmark " + percentile_name(q).upper() for q in PERCENTILES],
             )
         else:
             # Add name to each statistics list
@@ -2164,7 +2572,7 @@ class BenchmarkAnalyzer:
                     "---",
                     "---",
                     "---",
-                ],
+                ] + ["---"] * len(PERCENTILES),
             )
             list_statistics.insert(
                 0,
@@ -2180,7 +2588,7 @@ class BenchmarkAnalyzer:
                     " ",
                     " ",
                     " ",
-                ],
+                ] + ["Benchmark " + percentile_name(q).upper() for q in PERCENTILES],
             )
 
         baseline = list_statistics[2]  # baseline for %
@@ -2297,9 +2705,10 @@ class BenchmarkAnalyzer:
             }    
         """
 
-        # mean_benchmark, rms_benchmark, max_benchmark, min_benchmark, mean_, rms_, max_, min_
-        # 0,                1,                  2,          3,          4,      5,   6,    7
+        # mean_benchmark, rms_benchmark, max_benchmark, min_benchmark, mean_, rms_, max_, min_, p50, p90, p99, p99.9
+        # 0,                1,                  2,          3,          4,      5,   6,    7,   8,   9,   10,  11
         statistics_data = self.statistics(sets)
+        totals = self.window_totals(sets)
 
         # print(statistics_data[2])
         return {
@@ -2309,9 +2718,11 @@ class BenchmarkAnalyzer:
                 "metric_unit": os.environ.get('METRIC_UNIT'),
                 "timestampt": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(time.time())),
                 "value": float(statistics_data[2]),
-                "note": "mean_benchmark {}, rms_benchmark {}, max_benchmark {}, min_benchmark {}, lost messages {:.2f} %".format(statistics_data[0], statistics_data[1], statistics_data[2], statistics_data[3], (self.lost_msgs/len(self.image_pipeline_msg_sets))*100),
+                "note": "mean_benchmark {}, rms_benchmark {}, max_benchmark {}, min_benchmark {}, lost messages {:.2f} %".format(statistics_data[0], statistics_data[1], statistics_data[2], statistics_data[3], (self.lost_msgs/len(self.image_pipeline_msg_sets))*100) + self.funnel_note(),
                 "datasource": os.environ.get('ROSBAG'),
-                "type": os.environ.get('TYPE')
+                "type": os.environ.get('TYPE'),
+                "percentiles": percentiles(totals),
+                "histogram": log_histogram(totals),
             }
     
     def results_1d(self, sets, metric="throughput"):
@@ -2333,9 +2744,10 @@ class BenchmarkAnalyzer:
             }    
         """
 
-        # mean_benchmark, rms_benchmark, max_benchmark, min_benchmark, mean_, rms_, max_, min_
-        # 0,                1,                  2,          3,          4,      5,   6,    7
+        # mean_benchmark, rms_benchmark, max_benchmark, min_benchmark, -, -, -, -, p50, p90, p99, p99.9
+        # 0,                1,                  2,          3,          4, 5, 6, 7, 8,   9,   10,  11
         statistics_data = self.statistics_1d(sets)
+        totals = sets
 
         # print(statistics_data[2])
         return {
@@ -2345,11 +2757,68 @@ class BenchmarkAnalyzer:
                 "metric_unit": os.environ.get('METRIC_UNIT'),
                 "timestampt": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(time.time())),
                 "value": float(statistics_data[2]),
-                "note": "mean_benchmark {}, rms_benchmark {}, max_benchmark {}, min_benchmark {}, lost messages {:.2f} %".format(statistics_data[0], statistics_data[1], statistics_data[2], statistics_data[3], (self.lost_msgs/len(self.image_pipeline_msg_sets))*100),
+                "note": "mean_benchmark {}, rms_benchmark {}, max_benchmark {}, min_benchmark {}, lost messages {:.2f} %".format(statistics_data[0], statistics_data[1], statistics_data[2], statistics_data[3], (self.lost_msgs/len(self.image_pipeline_msg_sets))*100) + self.funnel_note(),
+                "datasource": os.environ.get('ROSBAG'),
+                "type": os.environ.get('TYPE'),
+                "percentiles": percentiles(totals),
+                "histogram": log_histogram(totals),
+            }
+
+
+    def results_streaming(self, statistics):
+        """
+        Builds a dictionary of results from StreamingStatistics (see
+        streaming_statistics), same format as results(). Percentiles come
+        with their relative error bound.
+        """
+        summary = statistics.summary()
+        lost = self.lost_msgs / (statistics.count + self.lost_msgs) if statistics.count + self.lost_msgs else 0.0
+        return {
+                "hardware": os.environ.get('HARDWARE'),
+                "category": os.environ.get('CATEGORY'),
+                "metric": os.environ.get('METRIC'),
+                "metric_unit": os.environ.get('METRIC_UNIT'),
+                "timestampt": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(time.time())),
+                "value": float(summary["max"]),
+                "note": "mean_benchmark {}, rms_benchmark {}, max_benchmark {}, min_benchmark {}, lost messages {:.2f} %, percentiles within {:.2f} %".format(summary["mean"], summary["rms"], summary["max"], summary["min"], lost * 100, summary["percentiles_relative_error"] * 100),
                 "datasource": os.environ.get('ROSBAG'),
-                "type": os.environ.get('TYPE')
+                "type": os.environ.get('TYPE'),
+                "percentiles": summary["percentiles"],
+                "percentiles_relative_error": summary["percentiles_relative_error"],
             }
 
+    def results_runs(self, aggregated, headline):
+        """
+        Builds a dictionary of results from the aggregation of several
+        runs (see analyze_runs), same format as results(). Values are
+        means across runs, with their confidence intervals.
+
+        :param: aggregated: statistic name -> {"mean", "ci_low", "ci_high", "runs"}
+        :param: headline: statistic reported as value, e.g. max_benchmark
+        """
+        means = {name: summary["mean"] for name, summary in aggregated.items()}
+        return {
+                "hardware": os.environ.get('HARDWARE'),
+                "category": os.environ.get('CATEGORY'),
+                "metric": os.environ.get('METRIC'),
+                "metric_unit": os.environ.get('METRIC_UNIT'),
+                "timestampt": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(time.time())),
+                "value": means[headline],
+                "note": "mean_benchmark {}, rms_benchmark {}, max_benchmark {}, min_benchmark {} (mean of {} runs, 95 % CI of {} [{:.2f}, {:.2f}])".format(
+                    means["mean_benchmark"], means["rms_benchmark"], means["max_benchmark"], means["min_benchmark"],
+                    len(aggregated[headline]["runs"]), headline, aggregated[headline]["ci_low"], aggregated[headline]["ci_high"]),
+                "datasource": os.environ.get('ROSBAG'),
+                "type": os.environ.get('TYPE'),
+                "percentiles": {
+                    percentile_name(q): means[percentile_name(q)]
+                    for q in PERCENTILES if percentile_name(q) in means
+                },
+                "confidence_intervals": {
+                    name: [summary["ci_low"], summary["ci_high"]]
+                    for name, summary in aggregated.items()
+                },
+                "runs": len(aggregated[headline]["runs"]),
+            }
 
     def run(self, cmd, shell=False, timeout=1):
         """
@@ -2376,11 +2845,105 @@ class BenchmarkAnalyzer:
             errs = None
         return outs, errs
 
+    def tracepoint_timestamps(self, trace_path, index):
+        """
+        Returns the timestamps (ms) of every event of a target, whether
+        its message set was completed or not. Targets whose name appears
+        more than once in the chain (or in fpga traces) are only taken
+        from the complete message sets.
+
+        Args:
+            trace_path (string): path of the CTF tracefiles
+            index (int): of the target in the chain
+        """
+        name = self.target_chain[index]
+        if self.hardware_device_type == "cpu" and self.target_chain.count(name) == 1:
+            events = self.load_chain_events(trace_path, True)
+            events = events[events["event_id"] == self.event_ids()[name]]
+            return events["timestamp"] / 1e6
+        self.get_target_chain_traces(trace_path)
+        return np.atleast_2d(self.image_pipeline_msg_sets["timestamp"])[:, index] / 1e6
+
+    def cadence(self, trace_path):
+        """
+        Period jitter at the input and output of the measurement window
+        (see set_window) and deadline misses of the latency over it.
+
+        Periods are compared against the configured rate (see set_rate),
+        or against the median period if none. The deadline defaults to
+        one period and lost messages count as misses.
+
+        Args:
+            trace_path (string): path of the CTF tracefiles
+
+        Returns:
+            dict: "input" and "output" (see period_jitter) and "deadline"
+            (see deadline_misses)
+        """
+        if not trace_path:
+            trace_path = "/tmp/analysis/trace"
+        indices = self.get_window_indices()
+        period = 1e3 / self.rate if self.rate else None
+        jitter = {
+            "input": period_jitter(self.tracepoint_timestamps(trace_path, indices[0]), period),
+            "output": period_jitter(self.tracepoint_timestamps(trace_path, indices[-1]), period),
+        }
+        if period is None and jitter["input"] is not None:
+            period = jitter["input"]["expected_period"]
+        deadline = self.deadline * 1e3 if self.deadline else period
+
+        self.get_target_chain_traces(trace_path)
+        latencies = self.window_totals(self.barchart_data_latency(self.image_pipeline_msg_sets))
+        jitter["deadline"] = deadline_misses(latencies, deadline, self.lost_msgs) if deadline else None
+        return jitter
+
+    def print_cadence(self, trace_path):
+        """Prints the period jitter and deadline misses, see cadence()"""
+        cadence = self.cadence(trace_path)
+        print("")
+        print("| Tracepoint | Period | Expected period | Jitter (std) | Jitter (p99) | Jitter (max) | Skipped |")
+        print("| --- | --- | --- | --- | --- | --- | --- |")
+        indices = self.get_window_indices()
+        for position, index in (("input", indices[0]), ("output", indices[-1])):
+            jitter = cadence[position]
+            if jitter is None:
+                continue
+            print("| {} | {:.2f} ms | {:.2f} ms | {:.2f} ms | {:.2f} ms | {:.2f} ms | {} |".format(
+                self.target_chain_dissambiguous[index],
+                jitter["period"],
+                jitter["expected_period"],
+                jitter["jitter_std"],
+                jitter["jitter_p99"],
+                jitter["jitter_max"],
+                jitter["skipped"],
+            ))
+        misses = cadence["deadline"]
+        if misses is not None:
+            print("")
+            print("Deadline misses ({:.2f} ms): {:.2f} % ({} late, {} lost)".format(
+                misses["deadline"], misses["miss_ratio"] * 100, misses["late"], misses["lost"]))
+        return cadence
+
     def get_target_chain_traces(self, trace_path):
         if not trace_path:
             trace_path = "/tmp/analysis/trace"
 
-        if self.hardware_device_type == "cpu":
+        # sets are formed once per trace and chain, other metrics reuse them
+        key = (os.path.normpath(trace_path), "target", tuple(self.target_chain))
+        if key in self.chain_msg_sets:
+            self.image_pipeline_msg_sets = self.chain_msg_sets[key]
+            return
+
+        if self.is_dag():
+            # joins match events by ROS header stamp, which VTF (accelerator)
+            # events don't carry
+            if self.hardware_device_type != "cpu":
+                raise ValueError(
+                    "graph-shaped target chains (see add_target \"after\") are only "
+                    "supported on cpu traces, not on " + self.hardware_device_type
+                )
+            self.image_pipeline_msg_sets = self.msgsets_from_trace_dag(trace_path, debug=True)
+        elif self.hardware_device_type == "cpu":
             # self.image_pipeline_msg_sets \
             #     = self.msgsets_from_trace(trace_path, True)
             self.image_pipeline_msg_sets \
@@ -2392,11 +2955,18 @@ class BenchmarkAnalyzer:
                 trace_path + "/trace_cpu_ctf",
                 trace_path + "/trace_fpga_vtf_ctf_fix",
                 True)
+        self.chain_msg_sets[key] = self.image_pipeline_msg_sets
             
     def get_power_chain_traces(self, trace_path):
         if not trace_path:
             trace_path = "/tmp/analysis/trace"
 
+        # sets are formed once per trace and chain, other metrics reuse them
+        key = (os.path.normpath(trace_path), "power", tuple(self.power_chain))
+        if key in self.chain_msg_sets:
+            self.image_pipeline_msg_sets = self.chain_msg_sets[key]
+            return
+
         if self.hardware_device_type == "cpu":
             # self.image_pipeline_msg_sets \
             #     = self.msgsets_from_trace(trace_path, True)
@@ -2410,6 +2980,7 @@ class BenchmarkAnalyzer:
                 trace_path + "/trace_fpga_vtf_ctf_fix",
                 True,
                 target=False)
+        self.chain_msg_sets[key] = self.image_pipeline_msg_sets
 
 
     def get_index_to_plot_latency(self):
@@ -2426,13 +2997,7 @@ class BenchmarkAnalyzer:
 
         # Implementation 1
         # figure out the index of the set with the max value (longest, latency-wise)
-        max_sum = sum(self.image_pipeline_msg_sets_barchart[0])
-        max_index = 0
-        for i, lst in enumerate(self.image_pipeline_msg_sets_barchart):
-            current_sum = sum(lst)            
-            if current_sum > max_sum:
-                max_sum = current_sum
-                max_index = i       
+        max_index = int(np.argmax(self.set_totals(self.image_pipeline_msg_sets_barchart)))
 
         index_to_plot =  max_index
         # # debug
@@ -2448,7 +3013,7 @@ class BenchmarkAnalyzer:
         return index_to_plot
 
     def print_timing_pipeline(self):
-        if self.image_pipeline_msg_sets: 
+        if len(self.image_pipeline_msg_sets): 
             self.print_timeline([self.image_pipeline_msg_sets[self.index_to_plot]])     # timeline of max
             # self.print_timeline(self.image_pipeline_msg_sets)                         # all timelines
             # self.print_timeline_average(self.image_pipeline_msg_sets)                 # timeline of averages, NOTE only totals are of interest
@@ -2525,22 +3090,203 @@ class BenchmarkAnalyzer:
         outs, err = run('cd /tmp/benchmarks && git log -1', shell=True)
         print(outs)
 
-    def analyze_latency(self, tracepath=None, add_power=False):
-        """Analyze latency of the image pipeline
+    def analyze(self, metrics, tracepath=None):
+        """Analyze several metrics of the image pipeline at once
+
+        The trace is decoded a single time (see get_session) and
+        power, if requested, is computed once and reported along
+        every other metric.
 
         Args:
+            metrics (list):
+                Metrics to analyze, among latency, throughput, power,
+                kernel (scheduling of the latency tail, see kernel_tail)
+                and cpu (on-CPU time per node and core, see callback_cpu).
             tracepath (string, optional):
                 Path of the CTF tracefiles. Defaults to None.
         """
+        add_power = 'power' in metrics
         if add_power:
             power_consumption = self.analyze_power(tracepath)
         else:
             power_consumption = None
+
+        for metric in metrics:
+            if metric == 'latency':
+                self.analyze_latency(tracepath, add_power, power_consumption)
+            elif metric == 'throughput':
+                self.analyze_throughput(tracepath, add_power, power_consumption)
+            elif metric == 'kernel':
+                self.print_kernel_tail(tracepath)
+            elif metric == 'cpu':
+                self.print_callback_cpu(tracepath)
+            elif metric == 'power':
+                if len(set(metrics)) == 1:  # report independently iff no other metric is requested
+                    print("The average consumption is {} W".format(power_consumption))
+            else:
+                print('The metric ' + metric + ' is not yet implemented\n')
+
+    def run_statistics(self, tracepath, metrics):
+        """
+        Statistics of a single trace, without printing nor plotting, for
+        the aggregation of several runs (see analyze_runs)
+
+        Args:
+            tracepath (string): path of the CTF tracefiles
+            metrics (list): among latency and throughput
+
+        Returns:
+            dict: metric -> statistic name (e.g. max_benchmark, p99) -> value
+        """
+        names = ["mean_benchmark", "rms_benchmark", "max_benchmark", "min_benchmark",
+                 "mean", "rms", "max", "min"] + [percentile_name(q) for q in PERCENTILES]
+        statistics = {}
+        self.get_target_chain_traces(tracepath)
+        sets = len(self.image_pipeline_msg_sets)
+        lost = self.lost_msgs / sets * 100 if sets else float("nan")
+        if 'latency' in metrics:
+            values = self.statistics(self.barchart_data_latency(self.image_pipeline_msg_sets))
+            statistics['latency'] = dict(zip(names, values))
+            statistics['latency']['lost_messages'] = lost
+        if 'throughput' in metrics:
+            megabytes, fps = self.barchart_data_throughput(self.image_pipeline_msg_sets, 'steady')
+            for metric, values in (('throughput_fps', fps), ('throughput_mbs', megabytes)):
+                statistics[metric] = {
+                    name: value
+                    for name, value in zip(names, self.statistics_1d(values))
+                    if not isinstance(value, str)
+                }
+            # output rate over the steady-state windows, see throughput_timeline
+            steady_fps, steady_megabyps, _ = self.steady_state_throughput(self.image_pipeline_msg_sets)
+            statistics['throughput_fps']['steady_state'] = steady_fps
+            statistics['throughput_mbs']['steady_state'] = steady_megabyps
+        for metric in statistics.values():
+            for name in metric:
+                metric[name] = float(metric[name])
+        return statistics
+
+    def analyze_runs(self, metrics, tracepaths, workers=None):
+        """Analyze several runs (traces) of the same benchmark at once
+
+        Each trace is analyzed in a worker process and every statistic
+        is reported as the mean across runs with its 95 % bootstrap
+        confidence interval.
+
+        Args:
+            metrics (list):
+                Metrics to analyze, among latency and throughput.
+            tracepaths (list):
+                Path of the CTF tracefiles of each run.
+            workers (int, optional):
+                Size of the process pool. Defaults to the number of CPUs.
+        """
+        runs = statistics_of_runs(self, tracepaths, metrics, workers)
+        units = {'latency': 'ms', 'throughput_fps': 'fps', 'throughput_mbs': 'MB/s'}
+        aggregated = {}
+        for metric in units:
+            if metric not in runs[0]:
+                continue
+            aggregated[metric] = aggregate_runs([run[metric] for run in runs])
+            print("")
+            print("| {} ({} runs) | Mean | 95 % CI |".format(metric, len(runs)))
+            print("| --- | --- | --- |")
+            for name, summary in aggregated[metric].items():
+                unit = '%' if name == 'lost_messages' else units[metric]
+                print("| {} | {:.2f} {} | [{:.2f}, {:.2f}] |".format(
+                    name, summary["mean"], unit, summary["ci_low"], summary["ci_high"]))
+
+        if 'latency' in aggregated:
+            self.add_result(self.results_runs(aggregated['latency'], "max_benchmark"))
+        metric_unit = os.environ.get('METRIC_UNIT')
+        if metric_unit == "fps" and 'throughput_fps' in aggregated:
+            self.add_result(self.results_runs(aggregated['throughput_fps'], "max_benchmark"))
+        elif metric_unit == "MB/s" and 'throughput_mbs' in aggregated:
+            self.add_result(self.results_runs(aggregated['throughput_mbs'], "max_benchmark"))
+        return aggregated
+
+    def analyze_sweep(self, rates, tracepaths, latency_bound=None, workers=None):
+        """Analyze latency against offered load
+
+        Each trace, recorded at the corresponding input rate, is analyzed
+        in a worker process (see run_statistics). Reports the knee of the
+        p99 latency and the highest rate sustained, i.e. with throughput
+        following the offered rate and p99 within latency_bound.
+
+        Args:
+            rates (list):
+                Offered input rate (Hz) of each trace, e.g. publisher_upper_frequency.
+            tracepaths (list):
+                Path of the CTF tracefiles of each rate.
+            latency_bound (float, optional):
+                ms. Defaults to the deadline (see set_rate), none if not set.
+            workers (int, optional):
+                Size of the process pool. Defaults to the number of CPUs.
+
+        Returns:
+            dict: rates, throughput, p50, p99 and lost messages per rate, knee
+            and max_sustainable_rate
+        """
+        if len(rates) != len(tracepaths):
+            raise ValueError("one rate per trace is needed")
+        if latency_bound is None and self.deadline:
+            latency_bound = self.deadline * 1e3
+        order = np.argsort(rates, kind="stable")
+        rates = [float(rates[index]) for index in order]
+        runs = statistics_of_runs(self, [tracepaths[index] for index in order], ['latency', 'throughput'], workers)
+
+        sweep = {
+            "rates": rates,
+            "throughput": [run['throughput_fps']['steady_state'] for run in runs],
+            "p50": [run['latency']['p50'] for run in runs],
+            "p99": [run['latency']['p99'] for run in runs],
+            "lost_messages": [run['latency']['lost_messages'] for run in runs],
+        }
+        sweep["knee"] = knee(rates, sweep["p99"])
+        sweep["max_sustainable_rate"] = max_sustainable_rate(
+            rates, sweep["throughput"], sweep["p99"], latency_bound)
+
+        print("")
+        print("| Offered rate | Throughput | P50 | P99 | Lost Messages |")
+        print("| --- | --- | --- | --- | --- |")
+        for index, rate in enumerate(rates):
+            print("| {:.2f} Hz | {:.2f} fps | {:.2f} ms | {:.2f} ms | {:.2f} % |".format(
+                rate,
+                sweep["throughput"][index],
+                sweep["p50"][index],
+                sweep["p99"][index],
+                sweep["lost_messages"][index],
+            ))
+        print("")
+        print("Knee of the p99 latency: {}".format(
+            "{:.2f} Hz".format(sweep["knee"]) if sweep["knee"] is not None else "not found"))
+        print("Max sustainable rate{}: {}".format(
+            " (p99 within {:.2f} ms)".format(latency_bound) if latency_bound is not None else "",
+            "{:.2f} Hz".format(sweep["max_sustainable_rate"]) if sweep["max_sustainable_rate"] is not None else "none"))
+        return sweep
+
+    def analyze_latency(self, tracepath=None, add_power=False, power_consumption=None):
+        """Analyze latency of the image pipeline
+
+        Args:
+            tracepath (string, optional):
+                Path of the CTF tracefiles. Defaults to None.
+            add_power (bool, optional):
+                Report power consumption along latency. Defaults to False.
+            power_consumption (float, optional):
+                Power already computed (see analyze), avoids computing it again.
+        """
+        if add_power:
+            if power_consumption is None:
+                power_consumption = self.analyze_power(tracepath)
+        else:
+            power_consumption = None
         
         self.get_target_chain_traces(tracepath)        
         self.bar_charts_latency()
         self.index_to_plot = self.get_index_to_plot_latency()
         self.print_timing_pipeline()
+        if self.is_dag():
+            self.print_dag_latency(self.image_pipeline_msg_sets)
         # self.draw_tracepoints()
         
             
@@ -2552,19 +3298,29 @@ class BenchmarkAnalyzer:
             add_power=add_power,
             power_consumption=power_consumption
         )
+        self.print_attribution(self.image_pipeline_msg_sets)
+        # the rate images were published at varies across runs (e.g. linear
+        # scans), so only compare against one configured for this trace
+        if self.rate:
+            self.print_cadence(tracepath)
         self.plot_latency_results()
         # self.upload_results()  # performed in CI/CD pipelines instead
 
 
-    def analyze_throughput(self, tracepath=None, add_power=False):
+    def analyze_throughput(self, tracepath=None, add_power=False, power_consumption=None):
         """Analyze throughput of the image pipeline
 
         Args:
             tracepath (string, optional):
                 Path of the CTF tracefiles. Defaults to None.
+            add_power (bool, optional):
+                Report power consumption along throughput. Defaults to False.
+            power_consumption (float, optional):
+                Power already computed (see analyze), avoids computing it again.
         """
         if add_power:
-            power_consumption = self.analyze_power(tracepath)
+            if power_consumption is None:
+                power_consumption = self.analyze_power(tracepath)
         else:
             power_consumption = None
 
@@ -2591,11 +3347,11 @@ class BenchmarkAnalyzer:
             power_consumption=power_consumption
         )
         
-        barcharts_through_megabys_real, barcharts_through_fps_real = self.barchart_data_throughput(self.image_pipeline_msg_sets, 'real')
+        barcharts_through_megabys_real, barcharts_through_fps_real = self.barchart_data_throughput(self.image_pipeline_msg_sets, 'steady')
         
         self.print_markdown_table_1d(
             [barcharts_through_megabys_real],
-            ["RobotPerf real throughput"],
+            ["RobotPerf real throughput (steady state)"],
             from_baseline=False,
             units='MB/s',
             add_power=add_power,
@@ -2605,13 +3361,16 @@ class BenchmarkAnalyzer:
 
         self.print_markdown_table_1d(
             [barcharts_through_fps_real],
-            ["RobotPerf real throughput"],
+            ["RobotPerf real throughput (steady state)"],
             from_baseline=False,
             units='fps',
             add_power=add_power,
             power_consumption=power_consumption
         )
 
+        self.print_throughput_timeline(self.image_pipeline_msg_sets)
+        self.print_bytes_moved(self.image_pipeline_msg_sets)
+
         metric_unit = os.environ.get('METRIC_UNIT')
         if metric_unit == "fps":
             result = self.results_1d(barcharts_through_fps_real)
@@ -2621,15 +3380,62 @@ class BenchmarkAnalyzer:
             self.add_result(result)
         
 
+    def power_efficiency(self, tracepath=None):
+        """
+        Energy efficiency of the pipeline over its steady state (see
+        steady_state_region): the power samples are integrated over it
+        and related to the frames output within it.
+
+        Args:
+            tracepath (string, optional):
+                Path of the CTF tracefiles. Defaults to None.
+
+        Returns:
+            dict: see energy.efficiency
+        """
+        self.get_power_chain_traces(tracepath)
+        samples = np.atleast_2d(self.image_pipeline_msg_sets)[:, 0]
+        samples = samples[np.argsort(samples["timestamp"], kind="stable")]
+
+        self.get_target_chain_traces(tracepath)
+        sets = np.atleast_2d(self.image_pipeline_msg_sets)
+        if len(sets) > 1:
+            first, last = self.steady_state_region(sets)
+        elif len(samples):
+            first, last = int(samples["timestamp"][0]), int(samples["timestamp"][-1])
+        else:
+            first, last = 0, 0
+        output = sets["timestamp"][:, -2] if sets.size else np.empty(0)
+        frames = int(np.count_nonzero(
+            (output >= first) & (output < last) & (sets["msg_count"][:, -2] > 0)
+        )) if sets.size else 0
+        return efficiency(samples["timestamp"], samples["power"], frames, first, last)
+
     def analyze_power(self, tracepath=None):
         """Analyze power of the image pipeline
 
+        Power is averaged over the steady state of the pipeline, and
+        reported with the energy per frame and the fps per watt.
+
         Args:
             tracepath (string, optional):
                 Path of the CTF tracefiles. Defaults to None.
         """
-        self.get_power_chain_traces(tracepath)        
-        total_watts = self.barchart_data_power(self.image_pipeline_msg_sets)
+        power = self.power_efficiency(tracepath)
+        total_watts = power["average_power"]
+        source = "steady state"
+        if np.isnan(total_watts):  # too few samples or frames, last sample
+            self.get_power_chain_traces(tracepath)
+            total_watts = self.barchart_data_power(self.image_pipeline_msg_sets)
+            source = "last sample, no steady state"
+            self.get_target_chain_traces(tracepath)  # restore the target sets
+
+        print("")
+        print("| Average Power (W) | Energy (J) | Energy per frame (J) | Throughput (fps) | Performance per watt (fps/W) |")
+        print("| --- | --- | --- | --- | --- |")
+        print("| {:.2f} | {:.2f} | {:.4f} | {:.2f} | {:.2f} |".format(
+            total_watts, power["energy"], power["energy_per_frame"], power["fps"], power["fps_per_watt"]))
+        print("Average power: {}".format(source))
         
         # add results to yaml
         result = {
@@ -2641,7 +3447,8 @@ class BenchmarkAnalyzer:
                 "value": float(total_watts),
                 "datasource": os.environ.get('ROSBAG'),
                 "type": os.environ.get('TYPE'),
-                "note": ''
+                "note": "energy per frame {} J, {} fps/W (steady state), power ({})".format(
+                    power["energy_per_frame"], power["fps_per_watt"], source)
         }
 
         self.add_result(result)
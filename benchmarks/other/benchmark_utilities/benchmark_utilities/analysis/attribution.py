@@ -0,0 +1,184 @@
+# Copyright (C) Acceleration Robotics S.L.U. - All Rights Reserved
+#
+# Written by Víctor Mayoral Vilches <victor@accelerationrobotics.com>
+# Written by Martiño Crespo <martinho@accelerationrobotics.com>
+# Written by Alejandra Martínez Fariña <alex@accelerationrobotics.com>
+# Licensed under the Apache License, Version 2.0
+
+"""
+Attribution of the latency of a chain to its layers and nodes.
+
+Each segment of a chain, from a tracepoint to the next one (or, in
+graph-shaped chains, from its latest predecessor), is attributed to the
+layer of the tracepoint it starts at (the code running until the next
+tracepoint fires) and to the node whose callback is open at that point,
+"transport" if none. Segment latencies are summed per layer and node
+with a single matrix product over all message sets.
+"""
+
+import numpy as np
+
+TRANSPORT = "transport"
+
+
+def _callback(name):
+    """Returns (opens, node) for callback boundaries, None otherwise"""
+    base = name.split(":")[-1].split(" (")[0]
+    if base == "callback_start":
+        return True, None
+    if base.endswith("_cb_init"):
+        return True, base[:-len("_cb_init")]
+    if base == "callback_end" or base.endswith("_cb_fini"):
+        return False, None
+    return None
+
+
+def infer_nodes(names):
+    """
+    Node running after each tracepoint of a chain, from its callback
+    boundaries (X_cb_init/X_cb_fini, ros2:callback_start/callback_end).
+    rclcpp callbacks are named after the user callback they contain.
+
+    Args:
+        names (list): tracepoint names of the chain, in order
+
+    Returns:
+        list: node name (or TRANSPORT) per tracepoint
+    """
+    stack = []  # open callbacks, each a one-element list so it can be named later
+    frames = []
+    for name in names:
+        boundary = _callback(name)
+        if boundary is not None and boundary[0]:
+            node = boundary[1]
+            if node is not None:
+                for frame in stack:
+                    if frame[0] is None:
+                        frame[0] = node
+            stack.append([node])
+        elif boundary is not None and stack:
+            stack.pop()
+        frames.append(stack[-1] if stack else None)
+    return [
+        TRANSPORT if frame is None else (frame[0] or "callback")
+        for frame in frames
+    ]
+
+
+def callback_spans(names):
+    """
+    Callbacks of a chain, from each callback boundary opening
+    (X_cb_init, ros2:callback_start) to the one closing it
+
+    Args:
+        names (list): tracepoint names of the chain, in order
+
+    Returns:
+        list: (node, opening index, closing index) per callback, see infer_nodes
+    """
+    nodes = infer_nodes(names)
+    stack = []
+    spans = []
+    for index, name in enumerate(names):
+        boundary = _callback(name)
+        if boundary is None:
+            continue
+        if boundary[0]:
+            stack.append(index)
+        elif stack:
+            opening = stack.pop()
+            spans.append((nodes[opening], opening, index))
+    return sorted(spans, key=lambda span: span[1])
+
+
+def segment_latencies(timestamps, predecessors):
+    """
+    Latency of each segment, ending at every tracepoint
+
+    Args:
+        timestamps (np.ndarray): (sets, tracepoints), in ns
+        predecessors (list): indices preceding each tracepoint, see
+            BenchmarkAnalyzer.add_target
+
+    Returns:
+        tuple: (latencies (sets, tracepoints) in ms, 0 for roots, and the
+        index each segment starts at, -1 for roots)
+    """
+    timestamps = np.atleast_2d(timestamps)
+    latencies = np.zeros(timestamps.shape, dtype=np.float64)
+    starts = []
+    for index, after in enumerate(predecessors):
+        if not after:
+            starts.append(-1)
+            continue
+        latest = timestamps[:, after].max(axis=1)
+        latencies[:, index] = (timestamps[:, index] - latest) / 1e6
+        starts.append(after[0])
+    return latencies, starts
+
+
+def attribute(latencies, keys):
+    """
+    Sums segment latencies per key
+
+    Args:
+        latencies (np.ndarray): (sets, segments)
+        keys (list): key of each segment, None to leave it out
+
+    Returns:
+        dict: key -> latency of each set, in order of first appearance
+    """
+    names = list(dict.fromkeys(key for key in keys if key is not None))
+    if not names:
+        return {}
+    membership = np.zeros((len(keys), len(names)))
+    for segment, key in enumerate(keys):
+        if key is not None:
+            membership[segment, names.index(key)] = 1.0
+    totals = np.atleast_2d(latencies) @ membership
+    return {name: totals[:, column] for column, name in enumerate(names)}
+
+
+def tail_attribution(attributed, totals, q=99):
+    """
+    Contribution of each key to the tail of the total latency
+
+    Args:
+        attributed (dict): key -> latency of each set (see attribute)
+        totals (np.ndarray): total latency of each set
+        q (float, optional): percentile the tail starts at. Defaults to 99.
+
+    Returns:
+        dict: key -> {"mean", "p50", "p99", "share", "tail_mean", "tail_excess"}
+        where share is the fraction of the mean total, and tail_excess the
+        fraction of the excess of the tail (over the median set) it explains
+    """
+    totals = np.asarray(totals, dtype=np.float64)
+    if not len(totals):
+        return {}
+    tail = totals >= np.percentile(totals, q)
+    body = totals <= np.percentile(totals, 50)
+    excess = totals[tail].mean() - totals[body].mean()
+    summary = {}
+    for key, values in attributed.items():
+        tail_mean = values[tail].mean()
+        summary[key] = {
+            "mean": float(values.mean()),
+            "p50": float(np.percentile(values, 50)),
+            "p99": float(np.percentile(values, 99)),
+            "share": float(values.mean() / totals.mean()) if totals.mean() else float("nan"),
+            "tail_mean": float(tail_mean),
+            "tail_excess": (
+                float((tail_mean - values[body].mean()) / excess) if excess > 0 else float("nan")),
+        }
+    return summary
+
+
+def dominant(summary):
+    """Key explaining most of the excess of the tail, None if there's no tail"""
+    candidates = [
+        (value["tail_excess"], key)
+        for key, value in summary.items()
+        if not np.isnan(value["tail_excess"])
+    ]
+    return max(candidates)[1] if candidates else None
@@ -0,0 +1,124 @@
+# Copyright (C) Acceleration Robotics S.L.U. - All Rights Reserved
+#
+# Written by Víctor Mayoral Vilches <victor@accelerationrobotics.com>
+# Written by Martiño Crespo <martinho@accelerationrobotics.com>
+# Written by Alejandra Martínez Fariña <alex@accelerationrobotics.com>
+# Licensed under the Apache License, Version 2.0
+
+"""
+On-disk cache of decoded event tables.
+
+Decoded tables are stored as .npy files in a hidden directory next to
+the trace, keyed by a fingerprint of the trace files (relative path,
+size and mtime) and of the tracepoints selected. Re-analyzing an
+unchanged trace loads the table directly and skips babeltrace. Only the
+latest table of each trace and set of tracepoints is kept.
+"""
+
+import hashlib
+import os
+import re
+import numpy as np
+
+from benchmark_utilities.analysis.events import load_events
+
+CACHE_DIRNAME = ".analysis_cache"
+CACHE_VERSION = 3  # bump whenever EVENT_DTYPE or its semantics change
+
+
+def trace_fingerprint(tracename, event_names):
+    """
+    Returns a hash identifying a trace directory and the selected tracepoints
+
+    Args:
+        tracename (string): path for the trace file(s)
+        event_names (tuple): names of the events of interest
+    """
+    fingerprint = hashlib.sha1()
+    fingerprint.update(str(CACHE_VERSION).encode())
+    fingerprint.update(repr(tuple(event_names)).encode())
+    for root, dirs, files in os.walk(tracename):
+        dirs[:] = sorted(d for d in dirs if d != CACHE_DIRNAME)
+        for file in sorted(files):
+            path = os.path.join(root, file)
+            stat = os.stat(path)
+            fingerprint.update(
+                "{}:{}:{}\n".format(
+                    os.path.relpath(path, tracename), stat.st_size, stat.st_mtime_ns
+                ).encode()
+            )
+    return fingerprint.hexdigest()
+
+
+def names_key(event_names):
+    """Returns a short hash of the selected tracepoints, see cache_path"""
+    return hashlib.sha1(repr(tuple(event_names)).encode()).hexdigest()[:8]
+
+
+def cache_path(tracename, fingerprint, event_names):
+    """Returns the path of the cache file of a trace"""
+    tracename = os.path.normpath(tracename)
+    return os.path.join(
+        os.path.dirname(tracename),
+        CACHE_DIRNAME,
+        "{}-{}-{}.npy".format(os.path.basename(tracename), names_key(event_names), fingerprint),
+    )
+
+
+def _cache_files(tracename, key=r"[0-9a-f]{8}"):
+    """
+    Returns the paths of the cache files of a trace, optionally only
+    those of a names_key
+    """
+    tracename = os.path.normpath(tracename)
+    cache_dir = os.path.join(os.path.dirname(tracename), CACHE_DIRNAME)
+    if not os.path.isdir(cache_dir):
+        return []
+    pattern = re.compile(
+        re.escape(os.path.basename(tracename)) + "-" + key + r"-[0-9a-f]{40}\.npy")
+    return [
+        os.path.join(cache_dir, file)
+        for file in os.listdir(cache_dir)
+        if pattern.fullmatch(file)
+    ]
+
+
+def load_cached_events(tracename, event_names, loader=load_events):
+    """
+    Returns the event table of a trace, from the cache if available
+
+    The cache is best effort: if it can't be read or written (e.g.
+    read-only trace directory) the trace is decoded as usual.
+
+    Args:
+        tracename (string): path for the trace file(s)
+        event_names (tuple): names of the events of interest
+        loader (function, optional): decodes the trace when not cached,
+            called as loader(tracename, event_names). Defaults to load_events.
+    """
+    path = cache_path(tracename, trace_fingerprint(tracename, event_names), event_names)
+    if os.path.exists(path):
+        try:
+            return np.load(path, allow_pickle=False)
+        except (OSError, ValueError):
+            pass  # corrupted or partial, decode again
+
+    events = loader(tracename, event_names)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp.npy"
+        np.save(tmp_path, events, allow_pickle=False)
+        os.replace(tmp_path, path)
+        # tables of earlier versions of the trace, or of the cache
+        for stale in _cache_files(tracename, names_key(event_names)):
+            if stale != path:
+                os.remove(stale)
+    except OSError:
+        pass
+    return events
+
+
+def clear_cache(tracename):
+    """Removes all cache files of a trace"""
+    for path in _cache_files(tracename):
+        os.remove(path)
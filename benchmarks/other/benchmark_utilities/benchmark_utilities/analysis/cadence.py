@@ -0,0 +1,78 @@
+# Copyright (C) Acceleration Robotics S.L.U. - All Rights Reserved
+#
+# Written by Víctor Mayoral Vilches <victor@accelerationrobotics.com>
+# Written by Martiño Crespo <martinho@accelerationrobotics.com>
+# Written by Alejandra Martínez Fariña <alex@accelerationrobotics.com>
+# Licensed under the Apache License, Version 2.0
+
+"""
+Cadence of a pipeline: period jitter and deadline misses.
+
+Images are published at a fixed rate (e.g. publisher_upper_frequency in
+the auto launch files), so the time between consecutive events of a
+tracepoint should be one period. The error against it (jitter) and the
+share of messages not processed within a deadline often matter more to
+a control loop than the mean latency.
+"""
+
+import numpy as np
+
+
+def period_jitter(timestamps, period=None):
+    """
+    Inter-arrival jitter of a tracepoint
+
+    Args:
+        timestamps (array_like): of each event of the tracepoint, in ms, sorted
+        period (float, optional): expected period, in ms. Defaults to the
+            median inter-arrival time.
+
+    Returns:
+        dict: mean period, expected period, std, p99 and max of the absolute
+        period error (all in ms) and the number of periods longer than 1.5
+        expected ones (skipped messages). The error only covers the other
+        periods, so dropped frames count as skipped and not as jitter.
+        None with fewer than 2 events.
+    """
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    if len(timestamps) < 2:
+        return None
+    periods = np.diff(timestamps)
+    if period is None:
+        period = float(np.median(periods))
+    skipped = periods > 1.5 * period
+    error = periods[~skipped] - period
+    absolute = np.abs(error)
+    return {
+        "period": float(periods.mean()),
+        "expected_period": float(period),
+        "jitter_std": float(error.std()) if len(error) else float("nan"),
+        "jitter_p99": float(np.percentile(absolute, 99)) if len(error) else float("nan"),
+        "jitter_max": float(absolute.max()) if len(error) else float("nan"),
+        "skipped": int(np.count_nonzero(skipped)),
+    }
+
+
+def deadline_misses(latencies, deadline, lost=0):
+    """
+    Messages not processed within a deadline
+
+    Args:
+        latencies (array_like): of each message processed, in ms
+        deadline (float): in ms
+        lost (int, optional): messages never processed, which count as
+            misses. Defaults to 0.
+
+    Returns:
+        dict: deadline, late and lost messages, and the ratio of misses
+        (late or lost) over all messages
+    """
+    latencies = np.asarray(latencies, dtype=np.float64)
+    late = int(np.count_nonzero(latencies > deadline))
+    total = len(latencies) + lost
+    return {
+        "deadline": float(deadline),
+        "late": late,
+        "lost": int(lost),
+        "miss_ratio": (late + lost) / total if total else float("nan"),
+    }
@@ -0,0 +1,380 @@
+# Copyright (C) Acceleration Robotics S.L.U. - All Rights Reserved
+#
+# Written by Víctor Mayoral Vilches <victor@accelerationrobotics.com>
+# Written by Martiño Crespo <martinho@accelerationrobotics.com>
+# Written by Alejandra Martínez Fariña <alex@accelerationrobotics.com>
+# Licensed under the Apache License, Version 2.0
+
+"""
+Vectorized assembly of message sets from event tables.
+
+Events are grouped by an integer message identifier (the ROS header stamp
+by default) with a single sort, and complete message sets are gathered
+with fancy indexing, without per-event Python loops.
+"""
+
+import numpy as np
+
+
+def assemble_by_key(events, chain_ids, keys=None):
+    """
+    Groups the events of a chain into message sets by identifier
+
+    Each identifier takes the first len(chain_ids) events carrying it,
+    in trace order; later ones are duplicates (message already fully
+    propagated). Identifiers with fewer events, or whose events don't
+    cover every tracepoint of the chain, are lost.
+
+    Args:
+        events (np.ndarray): event table of the chain, sorted by timestamp
+        chain_ids (list): event_id of each tracepoint of the chain
+        keys (np.ndarray, optional): identifier of each event. Defaults to
+            the "frame_id" column.
+
+    Returns:
+        tuple: (index_sets, lost_keys, duplicates, reached) where index_sets
+            is a 2D array of indices in events (one row per message set,
+            ordered by first appearance), lost_keys the identifiers
+            discarded, duplicates the number of events discarded as repeated
+            and reached a (stages, timestamps) tuple with, per identifier,
+            the number of leading tracepoints of the chain seen and the
+            time of its first event (see drop_funnel)
+    """
+    length = len(chain_ids)
+    if keys is None:
+        keys = events["frame_id"]
+    keys = np.asarray(keys)
+    if len(events) == 0:
+        return np.empty((0, length), dtype=np.intp), keys[:0], 0, (keys[:0], keys[:0])
+
+    # sort by identifier, stable so that each group stays in trace order
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+    counts = np.diff(np.r_[starts, len(keys)])
+
+    complete = counts >= length
+    duplicates = int((counts[complete] - length).sum())
+    index_sets = order[starts[complete][:, None] + np.arange(length)]
+
+    # every tracepoint of the chain must be present in the set
+    set_ids = events["event_id"][index_sets]
+    covered = np.ones(len(index_sets), dtype=bool)
+    for chain_id in set(chain_ids):
+        covered &= (set_ids == chain_id).any(axis=1)
+
+    # stages reached by each identifier: up to the first tracepoint of the
+    # chain missing, or its number of events if none is (repeated tracepoints)
+    groups = np.repeat(np.arange(len(starts)), counts)
+    sorted_ids = events["event_id"][order]
+    present = np.stack([
+        np.bincount(groups[sorted_ids == chain_id], minlength=len(starts)) > 0
+        for chain_id in chain_ids
+    ], axis=1)
+    stages = np.where(present.all(axis=1), np.minimum(counts, length), np.argmin(present, axis=1))
+    stages[np.flatnonzero(complete)[covered]] = length
+    first_timestamps = events["timestamp"][order[starts]]
+
+    lost_keys = np.concatenate(
+        [sorted_keys[starts[~complete]], sorted_keys[starts[complete][~covered]]]
+    )
+    index_sets = index_sets[covered]
+    index_sets = index_sets[np.argsort(index_sets[:, 0], kind="stable")]
+    return index_sets, lost_keys, duplicates, (stages, first_timestamps)
+
+
+def drop_funnel(stages, timestamps, length, period=1e9):
+    """
+    Per-stage survival of the messages entering a chain
+
+    Args:
+        stages (np.ndarray): number of leading tracepoints of the chain
+            seen for each message (see assemble_by_key)
+        timestamps (np.ndarray): time of the first event of each message
+        length (int): number of tracepoints of the chain
+        period (float, optional): nanoseconds of each window of the drop
+            rate over time. Defaults to 1e9 (1 second).
+
+    Returns:
+        dict: "reached" (messages reaching each stage), "dropped"
+            (messages lost right before each stage, 0 for the first one),
+            "drop_rate" (dropped / reached by the previous stage) and
+            "drop_rate_over_time" (2D, one row per window, one column
+            per stage, dropped / messages entering the chain in the window)
+    """
+    stages = np.asarray(stages)
+    reached = np.array([(stages > stage).sum() for stage in range(length)])
+    dropped = np.r_[0, reached[:-1] - reached[1:]]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        drop_rate = np.r_[0.0, np.where(reached[:-1] > 0, dropped[1:] / reached[:-1], 0.0)]
+
+    if len(stages):
+        windows = ((timestamps - timestamps.min()) // period).astype(np.intp)
+        entering = np.bincount(windows)
+        over_time = np.zeros((len(entering), length))
+        for stage in range(1, length):
+            over_time[:, stage] = np.bincount(windows[stages == stage], minlength=len(entering))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            over_time = np.where(entering[:, None] > 0, over_time / entering[:, None], 0.0)
+    else:
+        over_time = np.zeros((0, length))
+
+    return {
+        "reached": reached,
+        "dropped": dropped,
+        "drop_rate": drop_rate,
+        "drop_rate_over_time": over_time,
+    }
+
+
+class _InFlight:
+    """State of a message set being matched"""
+
+    __slots__ = ("indices", "vpid", "frame_id", "depth", "last")
+
+    def __init__(self, index, vpid, frame_id, timestamp):
+        self.indices = [index]
+        self.vpid = vpid
+        self.frame_id = frame_id
+        self.depth = 0  # callbacks of the chain open on its thread
+        self.last = timestamp
+
+
+def match_by_thread(
+    events,
+    chain_ids,
+    opens,
+    closes,
+    callback_start_id=None,
+    callback_end_id=None,
+    match_vpid=True,
+    window=None,
+):
+    """
+    Assembles message sets tracking every in-flight set independently,
+    for pipelines run by multi-threaded executors where several frames
+    (and callbacks) interleave.
+
+    While one of its callbacks runs, a set is bound to the thread (vpid,
+    vtid) executing it, and events of that thread go to it. Between
+    callbacks it waits, first-in first-out, for the next tracepoint of
+    the chain from any thread of the same process. Events without a
+    thread (vtid -1, e.g. accelerator traces) go to the oldest set
+    expecting them. When both the set and the event carry a ROS header
+    stamp, they must match.
+
+    Args:
+        events (np.ndarray): event table of the chain, sorted by timestamp
+        chain_ids (list): event_id of each tracepoint of the chain, in order
+        opens (set): event_ids which open a callback (e.g. ros2:callback_start, *_cb_init)
+        closes (set): event_ids which close a callback (e.g. ros2:callback_end, *_cb_fini)
+        callback_start_id (int, optional): event_id of ros2:callback_start
+        callback_end_id (int, optional): event_id of ros2:callback_end
+        match_vpid (bool, optional): require all events of a set to come
+            from the same process. Defaults to True.
+        window (int, optional): nanoseconds without progress after which
+            a set is dropped. Defaults to None (never).
+
+    Returns:
+        tuple: (index_sets, lost) where index_sets is a 2D array of indices
+            in events (one row per message set, ordered by completion)
+            and lost the number of sets started but not completed
+    """
+    length = len(chain_ids)
+    event_ids = events["event_id"].tolist()
+    timestamps = events["timestamp"].tolist()
+    vpids = events["vpid"].tolist()
+    vtids = events["vtid"].tolist()
+    frame_ids = events["frame_id"].tolist()
+    chain_id_set = set(chain_ids)
+
+    complete = []
+    lost = 0
+    bound = {}  # (vpid, vtid) -> _InFlight running a callback on that thread
+    waiting = []  # _InFlight between callbacks, oldest first
+
+    def expected(msg):
+        return chain_ids[len(msg.indices)]
+
+    def accepts(msg, event_id, vpid, frame_id, timestamp):
+        return (
+            expected(msg) == event_id
+            and (not match_vpid or vpid == -1 or msg.vpid == vpid)
+            and (frame_id == -1 or msg.frame_id == -1 or msg.frame_id == frame_id)
+            and (window is None or timestamp - msg.last <= window)
+        )
+
+    for index in range(len(event_ids)):
+        event_id = event_ids[index]
+        if event_id not in chain_id_set:
+            continue
+        vpid, vtid = vpids[index], vtids[index]
+        frame_id, timestamp = frame_ids[index], timestamps[index]
+        thread = (vpid, vtid)
+
+        if window is not None:
+            stale = [msg for msg in waiting if timestamp - msg.last > window]
+            if stale:
+                lost += len(stale)
+                waiting = [msg for msg in waiting if timestamp - msg.last <= window]
+
+        msg = bound.get(thread) if vtid != -1 else None
+        if msg is not None and not accepts(msg, event_id, vpid, frame_id, timestamp):
+            if (event_id == callback_end_id
+                    and chain_ids[len(msg.indices) - 1] == callback_start_id):
+                # the callback started wasn't the one of the chain, undo it
+                msg.indices.pop()
+                del bound[thread]
+                if msg.indices:
+                    msg.depth -= 1
+                    waiting.append(msg)
+                continue
+            # altered order within a callback of the set
+            del bound[thread]
+            lost += 1
+            msg = None
+
+        if msg is None:
+            for candidate in waiting:
+                if accepts(candidate, event_id, vpid, frame_id, timestamp):
+                    msg = candidate
+                    waiting.remove(msg)
+                    break
+            else:
+                if vtid == -1:
+                    for candidate in bound.values():
+                        if accepts(candidate, event_id, vpid, frame_id, timestamp):
+                            msg = candidate
+                            break
+        if msg is None:
+            if event_id != chain_ids[0]:
+                continue  # not part of any set in flight
+            msg = _InFlight(index, vpid, frame_id, timestamp)
+        else:
+            msg.indices.append(index)
+            msg.last = timestamp
+            if msg.frame_id == -1:
+                msg.frame_id = frame_id
+
+        if len(msg.indices) == length:
+            complete.append(msg.indices)
+            for key in [key for key, value in bound.items() if value is msg]:
+                del bound[key]
+            continue
+
+        if vtid == -1:
+            if msg not in bound.values():
+                waiting.append(msg)
+            continue
+        if event_id in opens:
+            msg.depth += 1
+        elif event_id in closes:
+            msg.depth = max(msg.depth - 1, 0)
+        if msg.depth:
+            bound[thread] = msg
+        else:
+            if bound.get(thread) is msg:
+                del bound[thread]
+            waiting.append(msg)
+
+    lost += len(waiting) + len(bound)
+    if not complete:
+        return np.empty((0, length), dtype=np.intp), lost
+    return np.array(complete, dtype=np.intp), lost
+
+
+def cluster_keys(keys, tolerance):
+    """
+    Returns a group per identifier, merging identifiers (e.g. ROS header
+    stamps of different sensors) which are within tolerance of the first
+    identifier of their group
+
+    Args:
+        keys (np.ndarray): int64 identifiers
+        tolerance (int): largest difference within a group
+    """
+    unique = np.unique(keys)
+    groups = np.empty(len(unique), dtype=np.int64)
+    group = -1
+    start = None
+    for index, key in enumerate(unique.tolist()):
+        if start is None or key - start > tolerance:
+            group += 1
+            start = key
+        groups[index] = group
+    return groups[np.searchsorted(unique, keys)]
+
+
+def assemble_dag(events, node_ids, predecessors, keys=None, tolerance=0):
+    """
+    Assembles message sets of a graph-shaped chain (fan-in/fan-out)
+
+    Events are grouped by identifier (or by identifiers within tolerance
+    of each other, e.g. the stamps of RGB and depth images joined by a
+    node). Within a group, each node takes the earliest unused event of
+    its tracepoint not older than the events of its predecessors, so
+    repeated tracepoints (e.g. the left and right input callbacks) are
+    assigned to branches in order. Events without identifier are ignored.
+
+    Args:
+        events (np.ndarray): event table of the chain, sorted by timestamp
+        node_ids (list): event_id of the tracepoint of each node, in
+            topological order
+        predecessors (list): for each node, list of the indices of its
+            predecessor nodes
+        keys (np.ndarray, optional): identifier of each event. Defaults to
+            the "frame_id" column.
+        tolerance (int, optional): largest difference between identifiers
+            joined in a message set. Defaults to 0 (exact match).
+
+    Returns:
+        tuple: (index_sets, lost) where index_sets is a 2D array of indices
+            in events (one column per node, one row per message set,
+            ordered by first appearance) and lost the number of groups
+            not covering every node
+    """
+    length = len(node_ids)
+    if keys is None:
+        keys = events["frame_id"]
+    keys = np.asarray(keys)
+    stamped = np.flatnonzero(keys != -1)
+    if len(stamped) == 0:
+        return np.empty((0, length), dtype=np.intp), 0
+
+    groups = keys[stamped]
+    if tolerance:
+        groups = cluster_keys(groups, tolerance)
+    order = stamped[np.argsort(groups, kind="stable")]
+    sorted_groups = groups[np.argsort(groups, kind="stable")]
+    starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]])
+    ends = np.r_[starts[1:], len(order)]
+
+    event_ids = events["event_id"]
+    timestamps = events["timestamp"]
+    index_sets = []
+    lost = 0
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        members = order[start:end].tolist()  # in trace order
+        member_ids = event_ids[members].tolist()
+        member_timestamps = timestamps[members].tolist()
+        used = set()
+        assigned = []
+        for node, node_id in enumerate(node_ids):
+            ready = max((member_timestamps[assigned[p]] for p in predecessors[node]), default=None)
+            for position, member_id in enumerate(member_ids):
+                if (member_id == node_id and position not in used
+                        and (ready is None or member_timestamps[position] >= ready)):
+                    used.add(position)
+                    assigned.append(position)
+                    break
+            else:
+                break
+        if len(assigned) == length:
+            index_sets.append([members[position] for position in assigned])
+        else:
+            lost += 1
+
+    if not index_sets:
+        return np.empty((0, length), dtype=np.intp), lost
+    index_sets = np.array(index_sets, dtype=np.intp)
+    return index_sets[np.argsort(index_sets.min(axis=1), kind="stable")], lost
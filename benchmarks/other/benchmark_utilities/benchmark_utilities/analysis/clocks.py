@@ -0,0 +1,248 @@
+# Copyright (C) Acceleration Robotics S.L.U. - All Rights Reserved
+#
+# Written by Víctor Mayoral Vilches <victor@accelerationrobotics.com>
+# Written by Martiño Crespo <martinho@accelerationrobotics.com>
+# Written by Alejandra Martínez Fariña <alex@accelerationrobotics.com>
+# Licensed under the Apache License, Version 2.0
+
+"""
+Clock-domain alignment between accelerator (VTF) and CPU (CTF) traces.
+
+Accelerator events (e.g. ros2:vitis_profiler:kernel_enqueue) are recorded
+with the device clock. Each burst of them happens within the CPU
+tracepoints around it in the chain (e.g. image_proc_rectify_init and
+image_proc_rectify_fini). That is all the events tell: where in the CPU
+interval the burst sits is unknown, so pairing bursts with those
+intervals only bounds the clock difference. The offset and linear drift
+fitted are the smallest correction satisfying every bound, none if the
+clocks already agree (e.g. trace_fpga_vtf_ctf_fix traces).
+"""
+
+import numpy as np
+
+LEADING_PAIRS = 8  # bursts paired in order for the first estimate
+MAX_DRIFT = 1e-3  # ns per ns (1000 ppm), range searched for the drift
+
+
+class ClockAlignment:
+    """
+    Maps device timestamps into the CPU clock:
+
+        cpu = device + offset + drift * (device - origin)
+
+    Args:
+        offset (float): nanoseconds to add to device timestamps at origin
+        drift (float): nanoseconds of difference gained per nanosecond
+        origin (int): device timestamp the fit is centered on
+        samples (int): paired bursts the fit was computed from
+    """
+
+    def __init__(self, offset=0.0, drift=0.0, origin=0, samples=0):
+        self.offset = offset
+        self.drift = drift
+        self.origin = origin
+        self.samples = samples
+
+    def __str__(self):
+        return "offset {:.3f} us, drift {:.3f} ppm ({} samples)".format(
+            self.offset / 1e3, self.drift * 1e6, self.samples
+        )
+
+    def apply(self, events):
+        """Returns a copy of an event table with its timestamps in the CPU clock"""
+        events = events.copy()
+        timestamps = events["timestamp"]
+        correction = self.offset + self.drift * (timestamps - self.origin)
+        events["timestamp"] = timestamps + np.rint(correction).astype(np.int64)
+        return events
+
+
+def device_runs(chain_ids, device_ids):
+    """
+    Returns the runs of consecutive device tracepoints in a chain, as
+    (start, length) tuples, only for runs surrounded by CPU tracepoints
+    """
+    runs = []
+    start = None
+    for position, event_id in enumerate(list(chain_ids) + [None]):
+        if event_id in device_ids:
+            if start is None:
+                start = position
+        elif start is not None:
+            if start > 0 and event_id is not None:
+                runs.append((start, position - start))
+            start = None
+    return runs
+
+
+def _pair(before, after, middles):
+    """
+    Pairs each burst middle with the CPU interval [before, after] whose
+    middle is the closest, so bursts still off by less than half a
+    period (e.g. drift not fitted yet) are paired with their interval
+
+    Returns:
+        tuple: (indices of the paired middles, indices of their before
+        and after)
+    """
+    # CPU intervals: each before with the first after, if no other before is in between
+    last = np.searchsorted(after, before, side="left")
+    valid = last < len(after)
+    valid[:-1] &= after[np.minimum(last[:-1], len(after) - 1)] <= before[1:]
+    first = np.flatnonzero(valid)
+    last = last[valid]
+    if not len(first):
+        return np.empty(0, dtype=np.int64), first, last
+    centers = (before[first] + after[last]) / 2
+    nearest = np.zeros(len(middles), dtype=np.int64)
+    if len(centers) > 1:
+        nearest = np.clip(np.searchsorted(centers, middles), 1, len(centers) - 1)
+        previous = nearest - 1
+        closer = np.abs(middles - centers[previous]) < np.abs(middles - centers[nearest])
+        nearest = np.where(closer, previous, nearest)
+    # one burst per interval, the closest
+    order = np.argsort(np.abs(middles - centers[nearest]), kind="stable")
+    _, unique = np.unique(nearest[order], return_index=True)
+    paired = np.sort(order[unique])
+    return paired, first[nearest[paired]], last[nearest[paired]]
+
+
+def _offsets(drift, starts, lower, ends, upper):
+    """
+    Range of offsets satisfying every bound for a given drift:
+
+        offset + drift * starts >= lower  (burst starts after "before")
+        offset + drift * ends <= upper  (burst ends before "after")
+    """
+    return np.max(lower - drift * starts), np.min(upper - drift * ends)
+
+
+def fit_bounds(starts, lower, ends, upper):
+    """
+    Smallest offset and drift satisfying the bounds of the paired bursts
+    (see _offsets): no drift if a constant offset satisfies them, and
+    the offset closest to 0 within the feasible range. If the bounds
+    contradict each other (e.g. mispaired bursts), the drift and offset
+    violating them the least.
+
+    Args:
+        starts (np.ndarray): first device timestamp of each burst
+        lower (np.ndarray): CPU "before" minus starts
+        ends (np.ndarray): last device timestamp of each burst
+        upper (np.ndarray): CPU "after" minus ends
+
+    Returns:
+        tuple: (offset, drift)
+    """
+    def width(drift):
+        low, high = _offsets(drift, starts, lower, ends, upper)
+        return high - low
+
+    drift = 0.0
+    if width(0.0) < 0:
+        # the width is concave in the drift, golden-section search of its maximum
+        low, high = -MAX_DRIFT, MAX_DRIFT
+        ratio = (np.sqrt(5) - 1) / 2
+        for _ in range(100):
+            a = high - ratio * (high - low)
+            b = low + ratio * (high - low)
+            if width(a) < width(b):
+                low = a
+            else:
+                high = b
+        best = (low + high) / 2
+        drift = best
+        if width(best) >= 0:
+            # feasible drifts form an interval, take its end closest to 0
+            near, far = 0.0, best
+            for _ in range(100):
+                middle = (near + far) / 2
+                if width(middle) >= 0:
+                    far = middle
+                else:
+                    near = middle
+            drift = far
+    low, high = _offsets(drift, starts, lower, ends, upper)
+    offset = min(max(0.0, low), high) if low <= high else (low + high) / 2
+    return float(offset), float(drift)
+
+
+def estimate_alignment(cpu_events, device_events, chain_ids, iterations=3):
+    """
+    Fits the clock of device_events to the one of cpu_events
+
+    Device events are split in bursts following the chain (e.g. two
+    kernel_enqueue per accelerated node and frame). Each burst must lie
+    within the CPU interval enclosing it, which bounds the offset and
+    drift (see fit_bounds). The first estimate pairs the leading bursts
+    in order and later iterations pair each burst with the CPU interval
+    enclosing it once corrected.
+
+    Args:
+        cpu_events (np.ndarray): CPU event table of the chain, sorted by timestamp
+        device_events (np.ndarray): device event table of the chain, sorted by timestamp
+        chain_ids (list): event_id of each tracepoint of the chain, in order
+        iterations (int, optional): pairing and fitting rounds. Defaults to 3.
+
+    Returns:
+        ClockAlignment: None if no burst could be paired
+    """
+    device_ids = set(np.unique(device_events["event_id"]).tolist()) \
+        - set(np.unique(cpu_events["event_id"]).tolist())
+    runs = device_runs(chain_ids, device_ids)
+    if not runs:
+        return None
+
+    device_timestamps = device_events["timestamp"][
+        np.isin(device_events["event_id"], list(device_ids))
+    ]
+    per_frame = sum(length for _, length in runs)
+    frames = len(device_timestamps) // per_frame
+    if frames == 0:
+        return None
+    # relative to origin, absolute ns don't fit in the mantissa of a float64
+    origin = int(device_timestamps[0])
+    bursts = (device_timestamps[:frames * per_frame] - origin).astype(np.float64)
+    bursts = bursts.reshape(frames, per_frame)
+    cpu_timestamps = (cpu_events["timestamp"] - origin).astype(np.float64)
+
+    runs_bounds = []  # (burst starts, burst ends, CPU interval before, after) per run
+    column = 0
+    for start, length in runs:
+        starts, ends = bursts[:, column], bursts[:, column + length - 1]
+        column += length
+        before = cpu_timestamps[cpu_events["event_id"] == chain_ids[start - 1]]
+        after = cpu_timestamps[cpu_events["event_id"] == chain_ids[start + length]]
+        runs_bounds.append((starts, ends, before, after))
+
+    def fit(pairs):
+        starts, lower, ends, upper = (np.concatenate(values) for values in zip(*pairs))
+        if not len(starts):
+            return None
+        offset, drift = fit_bounds(starts, lower, ends, upper)
+        return ClockAlignment(offset, drift, origin, len(starts))
+
+    # first estimate: i-th burst within the i-th CPU interval, only for the
+    # first ones (both traces start together), later drops would shift pairs
+    pairs = []
+    for starts, ends, before, after in runs_bounds:
+        count = min(len(starts), len(before), len(after), LEADING_PAIRS)
+        pairs.append((starts[:count], before[:count] - starts[:count],
+                      ends[:count], after[:count] - ends[:count]))
+    alignment = fit(pairs)
+    if alignment is None:
+        return None
+
+    for _ in range(iterations):
+        pairs = []
+        for starts, ends, before, after in runs_bounds:
+            middles = (starts + ends) / 2
+            corrected = middles + alignment.offset + alignment.drift * middles
+            paired, first, last = _pair(before, after, corrected)
+            pairs.append((starts[paired], before[first] - starts[paired],
+                          ends[paired], after[last] - ends[paired]))
+        refit = fit(pairs)
+        if refit is None:
+            break
+        alignment = refit
+    return alignment
@@ -0,0 +1,101 @@
+# Copyright (C) Acceleration Robotics S.L.U. - All Rights Reserved
+#
+# Written by Víctor Mayoral Vilches <victor@accelerationrobotics.com>
+# Written by Martiño Crespo <martinho@accelerationrobotics.com>
+# Written by Alejandra Martínez Fariña <alex@accelerationrobotics.com>
+# Licensed under the Apache License, Version 2.0
+
+"""
+Bytes moved by each stage of the pipeline and copies between them.
+
+The robotperf tracepoints record the size ("*_msg_size") and address
+("*_msg") of the messages a callback receives (at *_cb_init) and
+publishes (at *_cb_fini). Per stage, that gives the bytes in and out of
+each message set and their rate over the run. Between stages, the same
+frame should reach the subscriber at the address it was published from
+when intra-process communication is zero-copy: a different address
+(or size) there means the message was copied (or serialized) on the way.
+"""
+
+import numpy as np
+
+
+def hops(spans):
+    """
+    Transport hops of a chain: from the end of a callback to the start
+    of the next one
+
+    Args:
+        spans (list): (node, opening index, closing index), sorted, see
+            attribution.callback_spans
+
+    Returns:
+        list: (publishing node, subscribing node, closing index, opening index)
+    """
+    return [
+        (previous[0], following[0], previous[2], following[1])
+        for previous, following in zip(spans[:-1], spans[1:])
+        if following[1] > previous[2]
+    ]
+
+
+def _rate(bytes_per_set, timestamps):
+    """MB/s of the bytes of each set over the span of their timestamps (ns)"""
+    duration = (timestamps.max() - timestamps.min()) / 1e9 if len(timestamps) else 0
+    return bytes_per_set.sum() / duration / 1e6 if duration > 0 else float("nan")
+
+
+def stage_bytes(sizes, timestamps, opening, closing):
+    """
+    Bytes in (received) and out (published) of a stage
+
+    Args:
+        sizes (np.ndarray): (sets, tracepoints) msg_size, in bytes
+        timestamps (np.ndarray): (sets, tracepoints), in ns
+        opening (int): index of the tracepoint the callback starts at
+        closing (int): index of the tracepoint the callback ends at
+
+    Returns:
+        dict: mean bytes "in" and "out" per set, and their rate
+        "in_rate" and "out_rate" (MB/s) over the run
+    """
+    return {
+        "in": float(sizes[:, opening].mean()),
+        "out": float(sizes[:, closing].mean()),
+        "in_rate": _rate(sizes[:, opening], timestamps[:, opening]),
+        "out_rate": _rate(sizes[:, closing], timestamps[:, closing]),
+    }
+
+
+def hop_copies(addresses, sizes, timestamps, published, received):
+    """
+    Copies of the messages crossing a hop
+
+    Args:
+        addresses (np.ndarray): (sets, tracepoints) msg_addr, 0 if unknown
+        sizes (np.ndarray): (sets, tracepoints) msg_size, in bytes
+        timestamps (np.ndarray): (sets, tracepoints), in ns
+        published (int): index of the tracepoint publishing the message
+        received (int): index of the tracepoint receiving it
+
+    Returns:
+        dict: "known" sets (address recorded on both sides), fraction of
+        them "copied" (address changed) and "resized" (size changed),
+        mean "copied_bytes" per set and their rate "copy_rate" (MB/s),
+        None if no address was recorded
+    """
+    known = (addresses[:, published] != 0) & (addresses[:, received] != 0)
+    if not known.any():
+        return None
+    copied = known & (
+        (addresses[:, published] != addresses[:, received])
+        | (sizes[:, published] != sizes[:, received])
+    )
+    copied_bytes = np.where(copied, sizes[:, received], 0)
+    return {
+        "known": int(known.sum()),
+        "copied": float(copied[known].mean()),
+        "resized": float((sizes[known, published] != sizes[known, received]).mean()),
+        "copied_bytes": float(copied_bytes[known].mean()),
+        "copy_rate": _rate(copied_bytes[known], timestamps[known, received]),
+    }
@@ -0,0 +1,79 @@
+# Copyright (C) Acceleration Robotics S.L.U. - All Rights Reserved
+#
+# Written by Víctor Mayoral Vilches <victor@accelerationrobotics.com>
+# Written by Martiño Crespo <martinho@accelerationrobotics.com>
+# Written by Alejandra Martínez Fariña <alex@accelerationrobotics.com>
+# Licensed under the Apache License, Version 2.0
+
+"""
+Latency distributions: tail percentiles and log-bucketed histograms.
+
+Mean and max hide how the tail of the latency behaves, so the per-chain
+totals are also summarized with percentiles and with an HDR-style
+histogram whose buckets grow geometrically, keeping the same relative
+resolution from microseconds to seconds.
+"""
+
+import numpy as np
+
+PERCENTILES = (50, 90, 99, 99.9)
+SUB_BUCKETS = 16  # buckets per doubling, ~4.4 % relative width
+
+
+def percentile_name(q):
+    """Returns the name of a percentile, e.g. p50 or p99.9"""
+    return "p{:g}".format(q)
+
+
+def percentiles(values, qs=PERCENTILES):
+    """
+    Percentiles of a set of values
+
+    Args:
+        values (array_like): samples, e.g. the latency of each message set
+        qs (tuple, optional): percentiles to compute. Defaults to PERCENTILES.
+
+    Returns:
+        dict: percentile name -> value, NaN if there are no values
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if not len(values):
+        return {percentile_name(q): float("nan") for q in qs}
+    return {
+        percentile_name(q): float(value)
+        for q, value in zip(qs, np.percentile(values, qs))
+    }
+
+
+def log_histogram(values, sub_buckets=SUB_BUCKETS, lowest=None):
+    """
+    HDR-style histogram with geometric buckets
+
+    Bucket i covers [lowest * 2**(i / sub_buckets), lowest * 2**((i + 1) / sub_buckets)),
+    values at or below lowest fall in the first one. Only the buckets with
+    samples are returned.
+
+    Args:
+        values (array_like): positive samples
+        sub_buckets (int, optional): buckets per doubling. Defaults to SUB_BUCKETS.
+        lowest (float, optional): lower bound of the first bucket. Defaults to
+            the smallest positive value.
+
+    Returns:
+        dict: "lower", "upper" and "count" lists, one entry per bucket
+    """
+    values = np.asarray(values, dtype=np.float64)
+    positive = values[values > 0]
+    if not len(positive):
+        return {"lower": [], "upper": [], "count": []}
+    if lowest is None:
+        lowest = float(positive.min())
+    scaled = np.log2(np.maximum(positive, lowest) / lowest) * sub_buckets
+    buckets = np.floor(scaled).astype(np.int64)
+    counts = np.bincount(buckets)
+    used = np.flatnonzero(counts)
+    return {
+        "lower": (lowest * np.exp2(used / sub_buckets)).tolist(),
+        "upper": (lowest * np.exp2((used + 1) / sub_buckets)).tolist(),
+        "count": counts[used].tolist(),
+    }
@@ -0,0 +1,82 @@
+# Copyright (C) Acceleration Robotics S.L.U. - All Rights Reserved
+#
+# Written by Víctor Mayoral Vilches <victor@accelerationrobotics.com>
+# Written by Martiño Crespo <martinho@accelerationrobotics.com>
+# Written by Alejandra Martínez Fariña <alex@accelerationrobotics.com>
+# Licensed under the Apache License, Version 2.0
+
+"""
+Energy from power samples.
+
+robotcore_power publishes power samples (W) at its own rate. They are
+integrated over time with the trapezoidal rule, interpolating the power
+at the edges of the interval of interest (e.g. the steady state of the
+pipeline), which gives the energy consumed while a given number of
+frames was processed.
+"""
+
+import numpy as np
+
+
+def energy(timestamps, watts, start=None, end=None):
+    """
+    Energy consumed within [start, end], trapezoidal integration of power
+    samples. Power is held constant before the first and after the last
+    sample.
+
+    Args:
+        timestamps (array_like): of each sample, in ns, sorted
+        watts (array_like): power of each sample, in W
+        start (int, optional): ns. Defaults to the first sample.
+        end (int, optional): ns. Defaults to the last sample.
+
+    Returns:
+        float: joules, NaN without samples
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    watts = np.asarray(watts, dtype=np.float64)
+    if not len(timestamps):
+        return float("nan")
+    if start is None:
+        start = int(timestamps[0])
+    if end is None:
+        end = int(timestamps[-1])
+    if end <= start:
+        return 0.0
+    inside = (timestamps > start) & (timestamps < end)
+    # relative to start, absolute ns lose precision as float64
+    times = np.concatenate(([0], timestamps[inside] - start, [end - start])).astype(np.float64)
+    power = np.concatenate((
+        [np.interp(start, timestamps, watts)],
+        watts[inside],
+        [np.interp(end, timestamps, watts)],
+    ))
+    return float(np.sum((power[1:] + power[:-1]) / 2 * np.diff(times)) / 1e9)
+
+
+def efficiency(timestamps, watts, frames, start, end):
+    """
+    Energy efficiency of a pipeline over [start, end]
+
+    Args:
+        timestamps (array_like): of each power sample, in ns, sorted
+        watts (array_like): power of each sample, in W
+        frames (int): processed within [start, end]
+        start (int): ns
+        end (int): ns
+
+    Returns:
+        dict: energy (J), average power (W), energy per frame (J),
+        throughput (fps) and performance per watt (fps/W)
+    """
+    joules = energy(timestamps, watts, start, end)
+    seconds = (end - start) / 1e9
+    average_watts = joules / seconds if seconds > 0 else float("nan")
+    fps = frames / seconds if seconds > 0 else float("nan")
+    return {
+        "energy": joules,
+        "average_power": average_watts,
+        "energy_per_frame": joules / frames if frames else float("nan"),
+        "fps": fps,
+        "fps_per_watt": fps / average_watts if average_watts else float("nan"),
+    }
@@ -0,0 +1,336 @@
+# Copyright (C) Acceleration Robotics S.L.U. - All Rights Reserved
+#
+# Written by Víctor Mayoral Vilches <victor@accelerationrobotics.com>
+# Written by Martiño Crespo <martinho@accelerationrobotics.com>
+# Written by Alejandra Martínez Fariña <alex@accelerationrobotics.com>
+# Licensed under the Apache License, Version 2.0
+
+"""
+Columnar event table for the benchmark analysis.
+
+Traces are decoded once into a NumPy structured array with one row per
+tracepoint hit. Message sets and metrics then operate on plain integer
+columns instead of retaining live bt2 message objects.
+"""
+
+import bt2
+import os
+import numpy as np
+
+# one row per (selected) trace event
+EVENT_DTYPE = np.dtype(
+    [
+        ("event_id", np.int32),  # index of the event name in the event names tuple
+        ("timestamp", np.int64),  # default_clock_snapshot.ns_from_origin
+        ("vpid", np.int64),  # -1 if the context field isn't recorded
+        ("vtid", np.int64),  # -1 if the context field isn't recorded
+        ("frame_id", np.int64),  # ROS header stamp as sec * 1e9 + nsec, -1 if absent
+        ("msg_size", np.int64),  # sum of the "msg_size" payload fields, in bytes
+        ("msg_count", np.int32),  # number of "msg_size" payload fields
+        ("power", np.float64),  # "msg_power" payload field, NaN if absent
+        ("msg_addr", np.uint64),  # first "*_msg" (pointer) payload field, 0 if absent
+    ]
+)
+
+NO_FRAME_ID = -1
+CHUNK_SIZE = 65536  # rows converted into an array at once while decoding
+
+
+def empty_events(shape=0):
+    """Returns an empty event table (or message set array) of the given shape"""
+    return np.empty(shape, dtype=EVENT_DTYPE)
+
+
+class PayloadAccessor:
+    """
+    Extracts the columns of the event table from the events of a class
+
+    The payload field names holding the ROS header stamp ("header_sec",
+    "header_nsec"), message sizes ("msg_size"), the address of the first
+    message ("*_msg") and power ("msg_power"), and
+    whether vpid/vtid are in the context, are resolved once from the first
+    event of the class. Later events only pay for direct field lookups.
+    """
+
+    def __init__(self, event):
+        context = event.common_context_field
+        self.vpid = context is not None and "vpid" in context
+        self.vtid = context is not None and "vtid" in context
+
+        self.sec = self.nsec = self.power = self.address = None
+        self.sizes = []
+        for field_name in event.payload_field:
+            if "header_nsec" in field_name:
+                self.nsec = field_name
+            elif "header_sec" in field_name:
+                self.sec = field_name
+            elif "msg_size" in field_name:
+                self.sizes.append(field_name)
+            elif "msg_power" in field_name:
+                self.power = field_name
+            elif field_name.endswith("_msg") and self.address is None:
+                self.address = field_name
+        self.stamp = self.sec is not None and self.nsec is not None
+
+    def row(self, event, event_id, timestamp):
+        """
+        Returns a tuple matching EVENT_DTYPE for a bt2 event of the class
+
+        Args:
+            event (bt2._EventConst): trace event
+            event_id (int): index of the event name in the event names tuple
+            timestamp (int): ns from origin of the event
+        """
+        vpid = vtid = -1
+        if self.vpid or self.vtid:
+            context = event.common_context_field
+            if self.vpid:
+                vpid = int(context["vpid"])
+            if self.vtid:
+                vtid = int(context["vtid"])
+
+        payload = event.payload_field
+        if self.stamp:
+            frame_id = int(payload[self.sec]) * 1000000000 + int(payload[self.nsec])
+        else:
+            frame_id = NO_FRAME_ID
+        msg_size = 0
+        for field_name in self.sizes:
+            msg_size += int(payload[field_name])
+        watts = np.nan if self.power is None else float(payload[self.power])
+        address = 0 if self.address is None else int(payload[self.address])
+
+        return (
+            event_id, timestamp, vpid, vtid, frame_id, msg_size, len(self.sizes), watts, address
+        )
+
+
+def event_row(event, event_id, timestamp):
+    """
+    Returns a tuple matching EVENT_DTYPE for a bt2 event
+
+    Args:
+        event (bt2._EventConst): trace event
+        event_id (int): index of the event name in the event names tuple
+        timestamp (int): ns from origin of the event
+    """
+    return PayloadAccessor(event).row(event, event_id, timestamp)
+
+
+class EventClassCache:
+    """
+    Per event class state, resolved the first time each class is seen
+
+    The event_id (name lookup) and the PayloadAccessor of a class are
+    cached by the address of the class, so later events are resolved
+    through an integer lookup.
+    """
+
+    dtype = EVENT_DTYPE  # of the rows
+
+    def __init__(self, event_names):
+        self._ids_by_name = {name: index for index, name in enumerate(event_names)}
+        self._ids_by_class = {}
+        self._accessors = {}
+
+    def event_id(self, event):
+        """Returns the event_id of an event, None if it's not of interest"""
+        event_class = event.cls
+        try:
+            return self._ids_by_class[event_class.addr]
+        except KeyError:
+            event_id = self._ids_by_name.get(event_class.name)
+            self._ids_by_class[event_class.addr] = event_id
+            return event_id
+
+    def row(self, event, timestamp):
+        """Returns the event table row of an event of interest"""
+        addr = event.cls.addr
+        accessor = self._accessors.get(addr)
+        if accessor is None:
+            accessor = self._accessors[addr] = PayloadAccessor(event)
+        return accessor.row(event, self._ids_by_class[addr], timestamp)
+
+
+class _EventTableBuilder:
+    """Accumulates event messages into event table chunks"""
+
+    def __init__(self, event_classes, chunk_size=CHUNK_SIZE):
+        self.event_classes = event_classes
+        self.chunk_size = chunk_size
+        self.rows = []
+        self.chunks = []
+
+    def add(self, msg):
+        self.rows.append(
+            self.event_classes.row(msg.event, msg.default_clock_snapshot.ns_from_origin)
+        )
+        if len(self.rows) == self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if self.rows:
+            self.chunks.append(np.array(self.rows, dtype=self.event_classes.dtype))
+            self.rows = []
+
+    def take(self):
+        """Returns the chunks completed so far and forgets them"""
+        chunks, self.chunks = self.chunks, []
+        return chunks
+
+    def table(self):
+        self.flush()
+        if not self.chunks:
+            return np.empty(0, dtype=self.event_classes.dtype)
+        return np.concatenate(self.chunks)
+
+
+class _EventFilterIterator(bt2._UserMessageIterator):
+    def __init__(self, config, self_output_port):
+        input_port, self._event_classes = self_output_port.user_data
+        self._upstream = self._create_message_iterator(input_port)
+
+    def __next__(self):
+        while True:
+            msg = next(self._upstream)
+            # let stream/packet messages through, drop events not of interest
+            if (
+                type(msg) is not bt2._EventMessageConst
+                or self._event_classes.event_id(msg.event) is not None
+            ):
+                return msg
+
+
+class _EventFilter(bt2._UserFilterComponent, message_iterator_class=_EventFilterIterator):
+    """
+    Filter component which only forwards the events of interest
+
+    obj: EventClassCache of the events to keep
+    """
+
+    def __init__(self, config, params, obj):
+        input_port = self._add_input_port("in")
+        self._add_output_port("out", (input_port, obj))
+
+
+class _EventTableSink(bt2._UserSinkComponent):
+    """
+    Sink component which turns event messages into event table rows
+
+    obj: _EventTableBuilder where rows are accumulated
+    """
+
+    def __init__(self, config, params, obj):
+        self._input_port = self._add_input_port("in")
+        self._builder = obj
+
+    def _user_graph_is_configured(self):
+        self._msg_it = self._create_message_iterator(self._input_port)
+
+    def _user_consume(self):
+        msg = next(self._msg_it)
+        if type(msg) is bt2._EventMessageConst:
+            self._builder.add(msg)
+
+
+def find_ctf_traces(tracename):
+    """
+    Returns the CTF trace directories (those with a metadata file)
+    under a path, e.g. one per UID/bitness in an LTTng session
+    """
+    traces = []
+    for root, dirs, files in os.walk(tracename):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        if "metadata" in files:
+            traces.append(root)
+    return traces
+
+
+def event_graph(traces, builder):
+    """
+    Builds the babeltrace graph decoding traces into builder:
+
+        ctf.fs (one per trace) -> utils.muxer -> _EventFilter -> _EventTableSink
+
+    Args:
+        traces (list): CTF trace directories
+        builder (_EventTableBuilder): where rows are accumulated
+    """
+    graph = bt2.Graph()
+    ctf_fs = bt2.find_plugin("ctf").source_component_classes["fs"]
+    muxer = graph.add_component(
+        bt2.find_plugin("utils").filter_component_classes["muxer"], "muxer"
+    )
+    for index, trace in enumerate(traces):
+        source = graph.add_component(ctf_fs, "source-{}".format(index), params={"inputs": [trace]})
+        for output_port in source.output_ports.values():
+            # the muxer adds a new input port each time one gets connected
+            input_port = next(port for port in muxer.input_ports.values() if not port.is_connected)
+            graph.connect_ports(output_port, input_port)
+    event_filter = graph.add_component(_EventFilter, "event-filter", obj=builder.event_classes)
+    graph.connect_ports(muxer.output_ports["out"], event_filter.input_ports["in"])
+    sink = graph.add_component(_EventTableSink, "event-table", obj=builder)
+    graph.connect_ports(event_filter.output_ports["out"], sink.input_ports["in"])
+    return graph
+
+
+def load_events(tracename, event_names, event_classes=EventClassCache):
+    """
+    Decodes a trace into an event table
+
+    Only events whose name is in event_names are kept, the rest are
+    dropped by a filter component inside the babeltrace graph and never
+    become rows. Rows are produced in trace order (i.e. sorted by
+    timestamp).
+
+    Args:
+        tracename (string): path for the trace file(s)
+        event_names (tuple): names of the events of interest, the
+            position of each name is used as its event_id
+        event_classes (type, optional): turns the events into rows, e.g.
+            kernel.KernelEventClasses. Defaults to EventClassCache.
+
+    Returns:
+        np.ndarray: event table with the dtype of event_classes
+    """
+    traces = find_ctf_traces(tracename)
+    if not traces:
+        return np.empty(0, dtype=event_classes.dtype)
+
+    builder = _EventTableBuilder(event_classes(event_names))
+    event_graph(traces, builder).run()
+    return builder.table()
+
+
+def iter_events(tracename, event_names, chunk_size=CHUNK_SIZE):
+    """
+    Decodes a trace incrementally, yielding event tables of up to
+    chunk_size rows in trace order. Unlike load_events(), memory doesn't
+    grow with the length of the trace.
+
+    Args:
+        tracename (string): path for the trace file(s)
+        event_names (tuple): names of the events of interest
+        chunk_size (int, optional): rows per yielded table
+    """
+    traces = find_ctf_traces(tracename)
+    if not traces:
+        return
+
+    builder = _EventTableBuilder(EventClassCache(event_names), chunk_size)
+    graph = event_graph(traces, builder)
+    while True:
+        try:
+            graph.run_once()
+        except bt2.TryAgain:
+            continue
+        except bt2.Stop:
+            break
+        yield from builder.take()
+    builder.flush()
+    yield from builder.take()
+
+
+def sort_events(events):
+    """Returns the event table sorted by timestamp (stable)"""
+    return events[np.argsort(events["timestamp"], kind="stable")]
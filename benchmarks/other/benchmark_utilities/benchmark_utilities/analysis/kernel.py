@@ -0,0 +1,355 @@
+# Copyright (C) Acceleration Robotics S.L.U. - All Rights Reserved
+#
+# Written by Víctor Mayoral Vilches <victor@accelerationrobotics.com>
+# Written by Martiño Crespo <martinho@accelerationrobotics.com>
+# Written by Alejandra Martínez Fariña <alex@accelerationrobotics.com>
+# Licensed under the Apache License, Version 2.0
+
+"""
+Kernel scheduling analysis of the slow message sets.
+
+With kernel tracing enabled (see benchmark_utilities.tracing), the
+sched_switch, sched_wakeup, sched_migrate_task and irq events of the
+trace are decoded into a table from which the scheduling timeline of
+each thread is rebuilt. For each callback of a message set, on the
+thread that ran it, it tells how long it was off-CPU (and how much of
+it runnable but not running), which tasks preempted it, how much
+interrupt handling ran in its place and how often it migrated between
+CPUs. Over a whole run, it tells how busy each core was
+and how much of it went to given threads.
+"""
+
+import numpy as np
+
+from benchmark_utilities.analysis.events import EventClassCache
+from benchmark_utilities.analysis.parallel import load_events_parallel
+
+(
+    SCHED_SWITCH, SCHED_WAKEUP, SCHED_MIGRATE, IRQ_ENTRY, IRQ_EXIT, SOFTIRQ_ENTRY, SOFTIRQ_EXIT
+) = range(7)
+
+KERNEL_EVENTS = {
+    "sched_switch": SCHED_SWITCH,
+    "sched_wakeup": SCHED_WAKEUP,
+    "sched_waking": SCHED_WAKEUP,
+    "sched_migrate_task": SCHED_MIGRATE,
+    "irq_handler_entry": IRQ_ENTRY,
+    "irq_handler_exit": IRQ_EXIT,
+    "irq_softirq_entry": SOFTIRQ_ENTRY,
+    "irq_softirq_exit": SOFTIRQ_EXIT,
+}
+KERNEL_EVENT_NAMES = tuple(KERNEL_EVENTS)
+
+TASK_RUNNING = 0  # prev_state of a preempted task
+
+KERNEL_DTYPE = np.dtype([
+    ("timestamp", np.int64),
+    ("kind", np.int8),
+    ("cpu", np.int32),
+    ("tid", np.int64),  # prev_tid (switch), woken or migrated tid
+    ("next_tid", np.int64),  # switch only
+    ("state", np.int64),  # prev_state (switch)
+    ("comm", "U16"),  # next_comm (switch)
+])
+
+
+class KernelEventClasses(EventClassCache):
+    """
+    Turns kernel events into KERNEL_DTYPE rows, see events.load_events.
+    The event_id of each class is its kind.
+    """
+
+    dtype = KERNEL_DTYPE
+
+    def __init__(self, event_names):
+        super().__init__(event_names)
+        self._ids_by_name = {name: KERNEL_EVENTS[name] for name in event_names}
+
+    def row(self, event, timestamp):
+        """Returns the KERNEL_DTYPE row of an event of interest"""
+        kind = self._ids_by_class[event.cls.addr]
+        payload = event.payload_field
+        cpu = int(event.packet.context_field["cpu_id"])
+        if kind == SCHED_SWITCH:
+            return (
+                timestamp, kind, cpu,
+                int(payload["prev_tid"]), int(payload["next_tid"]),
+                int(payload["prev_state"]), str(payload["next_comm"]),
+            )
+        if kind in (SCHED_WAKEUP, SCHED_MIGRATE):
+            return (timestamp, kind, cpu, int(payload["tid"]), -1, -1, str(payload["comm"]))
+        return (timestamp, kind, cpu, -1, -1, -1, "")
+
+
+def load_kernel_events(tracename, workers=None):
+    """
+    Decodes the scheduling and interrupt events of a trace, one stream
+    (i.e. CPU) per worker, see parallel.load_events_parallel. Analyses
+    should rather go through TraceSession.kernel_events, which is cached.
+
+    Args:
+        tracename (string): path for the trace file(s)
+        workers (int, optional): size of the pool. Defaults to the number of CPUs.
+
+    Returns:
+        np.ndarray: table of KERNEL_DTYPE, sorted by timestamp, empty if
+        the trace has no kernel events
+    """
+    return load_events_parallel(tracename, KERNEL_EVENT_NAMES, workers, KernelEventClasses)
+
+
+def _overlap(starts, ends, first, last):
+    """Time of the intervals [starts, ends) within [first, last)"""
+    return np.clip(np.minimum(ends, last) - np.maximum(starts, first), 0, None)
+
+
+class ThreadTimeline:
+    """
+    On-CPU intervals of a thread, rebuilt from sched_switch
+
+    Each interval keeps the CPU it ran on and how it ended: the state of
+    the thread when switched out and the task switched in, so the gap
+    after it is either a preemption (runnable) or a block.
+    """
+
+    def __init__(self, events, tid):
+        switches = events[events["kind"] == SCHED_SWITCH]
+        ins = switches[switches["next_tid"] == tid]
+        outs = switches[switches["tid"] == tid]
+        # pair each switch in with the next switch out
+        last = np.searchsorted(outs["timestamp"], ins["timestamp"], side="left")
+        paired = last < len(outs)
+        self.starts = ins["timestamp"][paired]
+        self.cpus = ins["cpu"][paired]
+        out = outs[last[paired]]
+        self.ends = out["timestamp"]
+        self.preempted = out["state"] == TASK_RUNNING
+        self.preemptors = out["comm"]
+        wakeups = events[(events["kind"] == SCHED_WAKEUP) & (events["tid"] == tid)]
+        self.wakeups = wakeups["timestamp"]
+        migrations = events[(events["kind"] == SCHED_MIGRATE) & (events["tid"] == tid)]
+        self.migrations = migrations["timestamp"]
+
+    def query(self, first, last, irqs):
+        """
+        Scheduling of the thread within [first, last)
+
+        Args:
+            first (int): ns
+            last (int): ns
+            irqs (dict): cpu -> (starts, ends) of interrupt handling
+
+        Returns:
+            dict: on_cpu, off_cpu, runnable (preempted or woken up but not
+            yet running) and irq time (ns), migrations, and time off-CPU
+            by preempting task
+        """
+        on_cpu = _overlap(self.starts, self.ends, first, last)
+        # gaps between consecutive intervals
+        gap_starts = self.ends[:-1]
+        gap_ends = self.starts[1:]
+        preempted = self.preempted[:-1]
+        off = _overlap(gap_starts, gap_ends, first, last)
+        # runnable: the whole gap if preempted, from the wake-up if blocked
+        if len(self.wakeups):
+            woken = np.searchsorted(self.wakeups, gap_starts, side="left")
+            wakeups = np.append(self.wakeups, np.iinfo(np.int64).max)[woken]
+        else:
+            wakeups = gap_ends
+        runnable_starts = np.where(preempted, gap_starts, np.minimum(wakeups, gap_ends))
+        runnable = _overlap(runnable_starts, gap_ends, first, last)
+
+        preemptors = {}
+        preempting = preempted & (off > 0)
+        for comm, time in zip(self.preemptors[:-1][preempting], off[preempting]):
+            preemptors[str(comm)] = preemptors.get(str(comm), 0) + int(time)
+
+        irq = 0
+        for index in np.flatnonzero(on_cpu):
+            starts, ends = irqs.get(int(self.cpus[index]), (np.empty(0), np.empty(0)))
+            irq += int(_overlap(
+                starts, ends,
+                max(first, self.starts[index]), min(last, self.ends[index]),
+            ).sum())
+
+        # without any switch the thread wasn't traced, not off-CPU
+        on_cpu = int(on_cpu.sum())
+        return {
+            "on_cpu": on_cpu,
+            "off_cpu": int(last - first) - on_cpu if len(self.starts) else 0,
+            "runnable": int(runnable.sum()),
+            "irq": irq,
+            "migrations": int(np.count_nonzero(
+                (self.migrations >= first) & (self.migrations < last))),
+            "preemptors": preemptors,
+        }
+
+
+    def per_core(self, first, last):
+        """
+        On-CPU time of the thread within [first, last) per core
+
+        Returns:
+            dict: cpu -> ns
+        """
+        on_cpu = _overlap(self.starts, self.ends, first, last)
+        return {
+            int(cpu): int(on_cpu[self.cpus == cpu].sum())
+            for cpu in np.unique(self.cpus[on_cpu > 0])
+        }
+
+
+def _paired(timestamps, kinds, entry, exit):
+    """Intervals from each entry to the next exit"""
+    entries = timestamps[kinds == entry]
+    exits = timestamps[kinds == exit]
+    last = np.searchsorted(exits, entries, side="left")
+    paired = last < len(exits)
+    return entries[paired], exits[last[paired]]
+
+
+def irq_intervals(events):
+    """
+    Interrupt handling per CPU: hard and soft irq handlers, each entry
+    paired with the next exit on the same CPU, overlapping intervals
+    merged
+
+    Returns:
+        dict: cpu -> (starts, ends), sorted
+    """
+    intervals = {}
+    irq = np.isin(events["kind"], (IRQ_ENTRY, IRQ_EXIT, SOFTIRQ_ENTRY, SOFTIRQ_EXIT))
+    for cpu in np.unique(events["cpu"][irq]):
+        on_cpu = events[irq & (events["cpu"] == cpu)]
+        hard = _paired(on_cpu["timestamp"], on_cpu["kind"], IRQ_ENTRY, IRQ_EXIT)
+        soft = _paired(on_cpu["timestamp"], on_cpu["kind"], SOFTIRQ_ENTRY, SOFTIRQ_EXIT)
+        starts = np.concatenate((hard[0], soft[0]))
+        ends = np.concatenate((hard[1], soft[1]))
+        order = np.argsort(starts, kind="stable")
+        starts, ends = starts[order], ends[order]
+        if len(starts):
+            reach = np.maximum.accumulate(ends)
+            groups = np.flatnonzero(np.concatenate(([True], starts[1:] > reach[:-1])))
+            starts, ends = starts[groups], np.maximum.reduceat(ends, groups)
+        intervals[int(cpu)] = (starts, ends)
+    return intervals
+
+
+def tail_scheduling(events, callbacks):
+    """
+    Scheduling of the callbacks of each message set, each queried on the
+    thread that ran it and only while it ran (so waiting for upstream
+    stages between callbacks isn't counted), and the aggregate across
+    the sets
+
+    Args:
+        events (np.ndarray): kernel events, see load_kernel_events
+        callbacks (list): for each message set, (start, end, tid) of its
+            callbacks, in ns
+
+    Returns:
+        tuple: (list of per-set dicts with the "wall", "on_cpu",
+        "runnable", "blocked" and "irq" time (ns) of its callbacks, their
+        "migrations" and the time off-CPU per preempting task, aggregate
+        dict with the mean of each quantity per set, the "share" of the
+        callbacks wall time on-CPU, runnable, blocked and in IRQs, and
+        the mean time per set of each preempting task)
+    """
+    timelines = {}
+    irqs = irq_intervals(events)
+    keys = ("wall", "on_cpu", "runnable", "blocked", "irq", "migrations")
+    per_set = []
+    for set_callbacks in callbacks:
+        summary = dict.fromkeys(keys, 0)
+        summary["preemptors"] = {}
+        for start, end, tid in set_callbacks:
+            if tid not in timelines:
+                timelines[tid] = ThreadTimeline(events, tid)
+            if not len(timelines[tid].starts):
+                continue  # thread not traced
+            result = timelines[tid].query(start, end, irqs)
+            summary["wall"] += int(end - start)
+            summary["on_cpu"] += result["on_cpu"]
+            summary["runnable"] += result["runnable"]
+            summary["blocked"] += result["off_cpu"] - result["runnable"]
+            summary["irq"] += result["irq"]
+            summary["migrations"] += result["migrations"]
+            for comm, time in result["preemptors"].items():
+                summary["preemptors"][comm] = summary["preemptors"].get(comm, 0) + time
+        per_set.append(summary)
+
+    aggregate = {"sets": len(per_set), "share": {}, "preemptors": {}}
+    for key in keys:
+        aggregate[key] = (
+            float(np.mean([summary[key] for summary in per_set])) if per_set else float("nan"))
+    for key in ("on_cpu", "runnable", "blocked", "irq"):
+        aggregate["share"][key] = (
+            aggregate[key] / aggregate["wall"] if aggregate["wall"] else float("nan"))
+    for summary in per_set:
+        for comm, time in summary["preemptors"].items():
+            aggregate["preemptors"][comm] = (
+                aggregate["preemptors"].get(comm, 0) + time / len(per_set))
+    return per_set, aggregate
+
+
+def callback_times(events, starts, ends, tids):
+    """
+    On-CPU, runnable and blocked time of each callback, on the thread
+    that ran it
+
+    Args:
+        events (np.ndarray): kernel events, see load_kernel_events
+        starts (array_like): ns, of each callback
+        ends (array_like): ns, of each callback
+        tids (array_like): of each callback
+
+    Returns:
+        dict: "wall", "on_cpu", "runnable" and "blocked" arrays, in ns.
+        Callbacks of threads without any sched_switch are left out.
+    """
+    timelines = {}
+    irqs = irq_intervals(events)
+    times = {"wall": [], "on_cpu": [], "runnable": [], "blocked": []}
+    for start, end, tid in zip(starts, ends, tids):
+        if tid not in timelines:
+            timelines[tid] = ThreadTimeline(events, tid)
+        if not len(timelines[tid].starts):
+            continue
+        result = timelines[tid].query(start, end, irqs)
+        times["wall"].append(int(end - start))
+        times["on_cpu"].append(result["on_cpu"])
+        times["runnable"].append(result["runnable"])
+        times["blocked"].append(result["off_cpu"] - result["runnable"])
+    return {key: np.array(values, dtype=np.int64) for key, values in times.items()}
+
+
+def core_utilisation(events, threads, first, last):
+    """
+    Utilisation of each core within [first, last): busy (running anything
+    but the idle task) and running each group of threads
+
+    Args:
+        events (np.ndarray): kernel events, see load_kernel_events
+        threads (dict): name -> thread ids
+        first (int): ns
+        last (int): ns
+
+    Returns:
+        dict: cpu -> {"busy": fraction, name: fraction, ...}
+    """
+    duration = float(last - first)
+    switches = events[events["kind"] == SCHED_SWITCH]
+    utilisation = {}
+    for cpu in np.unique(switches["cpu"]):
+        on_cpu = switches[switches["cpu"] == cpu]
+        # each switch runs its next task until the following one
+        running = on_cpu["next_tid"][:-1] != 0
+        busy = _overlap(
+            on_cpu["timestamp"][:-1][running], on_cpu["timestamp"][1:][running], first, last)
+        utilisation[int(cpu)] = {"busy": busy.sum() / duration if duration > 0 else float("nan")}
+    for name, tids in threads.items():
+        for tid in tids:
+            for cpu, time in ThreadTimeline(events, tid).per_core(first, last).items():
+                if cpu in utilisation and duration > 0:
+                    utilisation[cpu][name] = utilisation[cpu].get(name, 0.0) + time / duration
+    return utilisation
@@ -0,0 +1,132 @@
+# Copyright (C) Acceleration Robotics S.L.U. - All Rights Reserved
+#
+# Written by Víctor Mayoral Vilches <victor@accelerationrobotics.com>
+# Written by Martiño Crespo <martinho@accelerationrobotics.com>
+# Written by Alejandra Martínez Fariña <alex@accelerationrobotics.com>
+# Licensed under the Apache License, Version 2.0
+
+"""
+Parallel decoding of CTF traces.
+
+LTTng writes one stream file per CPU and channel. Each stream is decoded
+by a worker of a process pool into an event table which is already
+ordered by timestamp, and the tables are then combined with a heap-based
+k-way merge instead of sorting everything again.
+"""
+
+import heapq
+import os
+import tempfile
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmark_utilities.analysis.events import (
+    EventClassCache,
+    empty_events,
+    find_ctf_traces,
+    load_events,
+)
+
+
+def find_streams(trace):
+    """Returns the stream files of a CTF trace directory"""
+    return [
+        file
+        for file in sorted(os.listdir(trace))
+        if file != "metadata"
+        and not file.startswith(".")
+        and os.path.isfile(os.path.join(trace, file))
+    ]
+
+
+def load_stream_events(trace, stream, event_names, event_classes=EventClassCache):
+    """
+    Decodes a single stream of a CTF trace into an event table
+
+    babeltrace needs the metadata next to the stream, so both are linked
+    into a temporary directory which is then decoded as a trace on its own.
+
+    Args:
+        trace (string): CTF trace directory
+        stream (string): name of the stream file within trace
+        event_names (tuple): names of the events of interest
+        event_classes (type, optional): see events.load_events
+    """
+    with tempfile.TemporaryDirectory(prefix="stream-") as tmp:
+        for file in ("metadata", stream):
+            os.symlink(os.path.abspath(os.path.join(trace, file)), os.path.join(tmp, file))
+        return load_events(tmp, event_names, event_classes)
+
+
+def merge_events(tables):
+    """
+    k-way merge of event tables, each sorted by timestamp
+
+    A heap keeps the next row of each table. Whenever a table is popped,
+    all its rows up to the head of the next table are copied at once.
+
+    Args:
+        tables (list): event tables sorted by timestamp
+
+    Returns:
+        np.ndarray: event table sorted by timestamp
+    """
+    nonempty = [table for table in tables if len(table)]
+    if not nonempty:
+        return tables[0][:0] if tables else empty_events()
+    tables = nonempty
+    if len(tables) == 1:
+        return tables[0]
+
+    merged = np.empty(sum(len(table) for table in tables), dtype=tables[0].dtype)
+    heap = [(table["timestamp"][0], index, 0) for index, table in enumerate(tables)]
+    heapq.heapify(heap)
+    out = 0
+    while heap:
+        _, index, start = heapq.heappop(heap)
+        table = tables[index]
+        if heap:
+            timestamps = table["timestamp"]
+            end = start + int(np.searchsorted(timestamps[start:], heap[0][0], side="right"))
+        else:
+            end = len(table)
+        merged[out:out + end - start] = table[start:end]
+        out += end - start
+        if end < len(table):
+            heapq.heappush(heap, (table["timestamp"][end], index, end))
+    return merged
+
+
+def load_events_parallel(tracename, event_names, workers=None, event_classes=EventClassCache):
+    """
+    Decodes a trace into an event table using a process pool, one task
+    per stream file. Equivalent to load_events().
+
+    Args:
+        tracename (string): path for the trace file(s)
+        event_names (tuple): names of the events of interest
+        workers (int, optional): size of the pool. Defaults to the number of CPUs.
+        event_classes (type, optional): see events.load_events
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    streams = [
+        (trace, stream)
+        for trace in find_ctf_traces(tracename)
+        for stream in find_streams(trace)
+    ]
+    if workers <= 1 or len(streams) <= 1:
+        return load_events(tracename, event_names, event_classes)
+
+    event_names = tuple(event_names)
+    with ProcessPoolExecutor(max_workers=min(workers, len(streams))) as executor:
+        tables = list(
+            executor.map(
+                load_stream_events,
+                [trace for trace, _ in streams],
+                [stream for _, stream in streams],
+                [event_names] * len(streams),
+                [event_classes] * len(streams),
+            )
+        )
+    return merge_events(tables)
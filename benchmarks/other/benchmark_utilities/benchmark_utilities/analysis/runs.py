@@ -0,0 +1,110 @@
+# Copyright (C) Acceleration Robotics S.L.U. - All Rights Reserved
+#
+# Written by Víctor Mayoral Vilches <victor@accelerationrobotics.com>
+# Written by Martiño Crespo <martinho@accelerationrobotics.com>
+# Written by Alejandra Martínez Fariña <alex@accelerationrobotics.com>
+# Licensed under the Apache License, Version 2.0
+
+"""
+Aggregation of several runs (traces) of the same benchmark.
+
+Each trace is analyzed by a worker of a process pool, giving one value
+per statistic and run. Runs are then summarized with their mean and a
+bootstrap confidence interval, so that the uncertainty between runs is
+reported together with the result.
+"""
+
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+CONFIDENCE = 0.95
+RESAMPLES = 10000
+
+
+def bootstrap_ci(values, statistic=np.mean, confidence=CONFIDENCE, resamples=RESAMPLES, seed=0):
+    """
+    Percentile bootstrap confidence interval of a statistic
+
+    All resamples are drawn at once, statistic must accept an axis
+    argument (e.g. np.mean, np.median).
+
+    Args:
+        values (array_like): one value per run
+        statistic (callable, optional): Defaults to np.mean.
+        confidence (float, optional): Defaults to CONFIDENCE.
+        resamples (int, optional): Defaults to RESAMPLES.
+        seed (int, optional): for reproducible intervals. Defaults to 0.
+
+    Returns:
+        tuple: (low, high), both the statistic itself with fewer than 2 values
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) < 2:
+        value = float(statistic(values, axis=0)) if len(values) else float("nan")
+        return value, value
+    rng = np.random.default_rng(seed)
+    samples = values[rng.integers(0, len(values), (resamples, len(values)))]
+    estimates = statistic(samples, axis=1)
+    tail = (1 - confidence) / 2 * 100
+    low, high = np.percentile(estimates, [tail, 100 - tail])
+    return float(low), float(high)
+
+
+def aggregate_runs(runs, confidence=CONFIDENCE):
+    """
+    Summarizes the statistics of several runs
+
+    Args:
+        runs (list): one dict per run, statistic name -> value
+        confidence (float, optional): of the intervals. Defaults to CONFIDENCE.
+
+    Returns:
+        dict: statistic name -> {"mean", "ci_low", "ci_high", "runs"}, for
+        the statistics present in every run
+    """
+    names = [name for name in runs[0] if all(name in run for run in runs)] if runs else []
+    aggregated = {}
+    for name in names:
+        values = np.array([run[name] for run in runs], dtype=np.float64)
+        low, high = bootstrap_ci(values, confidence=confidence)
+        aggregated[name] = {
+            "mean": float(values.mean()),
+            "ci_low": low,
+            "ci_high": high,
+            "runs": values.tolist(),
+        }
+    return aggregated
+
+
+def run_statistics(analyzer, tracepath, metrics):
+    """Statistics of a single run, see BenchmarkAnalyzer.run_statistics"""
+    # runs are already spread across processes, decode each trace in one
+    analyzer.workers = 1
+    return analyzer.run_statistics(tracepath, metrics)
+
+
+def statistics_of_runs(analyzer, tracepaths, metrics, workers=None):
+    """
+    Analyzes each trace in a worker process
+
+    Args:
+        analyzer (BenchmarkAnalyzer): with its chains already loaded
+        tracepaths (list): path of the trace of each run
+        metrics (list): metrics to compute, see BenchmarkAnalyzer.run_statistics
+        workers (int, optional): size of the pool. Defaults to the number of CPUs.
+
+    Returns:
+        list: one dict per run, metric -> statistic name -> value
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=max(1, min(workers, len(tracepaths)))) as executor:
+        return list(
+            executor.map(
+                run_statistics,
+                [analyzer] * len(tracepaths),
+                tracepaths,
+                [metrics] * len(tracepaths),
+            )
+        )
@@ -0,0 +1,90 @@
+# Copyright (C) Acceleration Robotics S.L.U. - All Rights Reserved
+#
+# Written by Víctor Mayoral Vilches <victor@accelerationrobotics.com>
+# Written by Martiño Crespo <martinho@accelerationrobotics.com>
+# Written by Alejandra Martínez Fariña <alex@accelerationrobotics.com>
+# Licensed under the Apache License, Version 2.0
+
+"""
+Trace sessions: decode a trace once, serve every chain from it.
+"""
+
+import functools
+import os
+import numpy as np
+
+from benchmark_utilities.analysis.cache import load_cached_events
+from benchmark_utilities.analysis.kernel import KERNEL_EVENT_NAMES, KernelEventClasses
+from benchmark_utilities.analysis.parallel import load_events_parallel
+
+
+class TraceSession:
+    """
+    A decoded trace shared by all the metrics of an analysis
+
+    The trace is decoded (or loaded from the cache) the first time its
+    events are requested, keeping the tracepoints of all chains (target
+    and power) in a single pass. Each chain then gets its rows through
+    select(), which is a cheap mask over the already decoded table.
+
+    Stream files are decoded in parallel by up to workers processes
+    (all CPUs if None, serially if 1).
+    """
+
+    def __init__(self, tracename, event_names, use_cache=True, workers=None):
+        self.tracename = os.path.normpath(tracename)
+        self.event_names = tuple(event_names)
+        self.use_cache = use_cache
+        self.workers = workers
+        self._events = None
+        self._kernel_events = None
+        self._selections = {}
+
+    @property
+    def events(self):
+        """Event table of the whole session, decoded on first access"""
+        if self._events is None:
+            loader = functools.partial(load_events_parallel, workers=self.workers)
+            if self.use_cache:
+                self._events = load_cached_events(self.tracename, self.event_names, loader)
+            else:
+                self._events = loader(self.tracename, self.event_names)
+        return self._events
+
+    @property
+    def kernel_events(self):
+        """
+        Kernel scheduling and interrupt events of the trace (see
+        kernel.py), decoded on first access like events, empty without
+        kernel tracing
+        """
+        if self._kernel_events is None:
+            loader = functools.partial(
+                load_events_parallel, workers=self.workers, event_classes=KernelEventClasses)
+            if self.use_cache:
+                self._kernel_events = load_cached_events(
+                    self.tracename, KERNEL_EVENT_NAMES, loader)
+            else:
+                self._kernel_events = loader(self.tracename, KERNEL_EVENT_NAMES)
+        return self._kernel_events
+
+    def covers(self, tracename, event_names):
+        """Whether this session can serve the given trace and tracepoints"""
+        return (
+            os.path.normpath(tracename) == self.tracename
+            and set(event_names) <= set(self.event_names)
+        )
+
+    def select(self, names):
+        """
+        Returns the rows of the session whose tracepoint is in names
+
+        Args:
+            names (list): tracepoint names, e.g. a target or power chain
+        """
+        key = frozenset(names)
+        if key not in self._selections:
+            event_ids = [self.event_names.index(name) for name in key]
+            events = self.events
+            self._selections[key] = events[np.isin(events["event_id"], event_ids)]
+        return self._selections[key]
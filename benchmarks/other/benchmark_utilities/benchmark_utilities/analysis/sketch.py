@@ -0,0 +1,221 @@
+# Copyright (C) Acceleration Robotics S.L.U. - All Rights Reserved
+#
+# Written by Víctor Mayoral Vilches <victor@accelerationrobotics.com>
+# Written by Martiño Crespo <martinho@accelerationrobotics.com>
+# Written by Alejandra Martínez Fariña <alex@accelerationrobotics.com>
+# Licensed under the Apache License, Version 2.0
+
+"""
+Constant-memory statistics for long (soak) runs.
+
+Instead of keeping the latency of every message set, values are folded
+into a DDSketch (quantiles within a relative error) and into Welford
+accumulators (count, mean, variance, min and max). Both are mergeable,
+so sketches of trace chunks or of different runs can be combined into
+the one of the whole.
+"""
+
+import math
+import numpy as np
+
+from benchmark_utilities.analysis.distribution import PERCENTILES, percentile_name
+
+
+class Welford:
+    """
+    Running count, mean, variance, min and max (Welford/Chan updates)
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # sum of squared differences to the mean
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, values):
+        """Adds a batch of values"""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if not len(values):
+            return
+        batch = Welford()
+        batch.count = len(values)
+        batch.mean = float(values.mean())
+        batch.m2 = float(((values - batch.mean) ** 2).sum())
+        batch.min = float(values.min())
+        batch.max = float(values.max())
+        self.merge(batch)
+
+    def merge(self, other):
+        """Folds the values of another accumulator into this one"""
+        if not other.count:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def variance(self):
+        """Population variance"""
+        return self.m2 / self.count if self.count else float("nan")
+
+    @property
+    def rms(self):
+        """Root-Mean-Square of the values"""
+        return math.sqrt(self.mean ** 2 + self.variance) if self.count else float("nan")
+
+
+class DDSketch:
+    """
+    Quantile sketch with relative-error guarantees (Masson et al., 2019)
+
+    Positive values are counted in buckets of geometrically growing
+    width gamma = (1 + alpha) / (1 - alpha), so any quantile is returned
+    within alpha of its exact value as long as no bucket was collapsed.
+    When more than max_buckets are needed the lowest ones are collapsed
+    together, which only affects the accuracy of the lowest quantiles.
+
+    Args:
+        relative_accuracy (float, optional): alpha. Defaults to 0.01.
+        max_buckets (int, optional): memory bound. Defaults to 2048.
+        min_value (float, optional): values below it are counted as zero. Defaults to 1e-9.
+    """
+
+    def __init__(self, relative_accuracy=0.01, max_buckets=2048, min_value=1e-9):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.max_buckets = max_buckets
+        self.min_value = min_value
+        self.zero_count = 0
+        self.offset = 0  # key of counts[0]
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.collapsed = False
+
+    @property
+    def count(self):
+        return self.zero_count + int(self.counts.sum())
+
+    def _keys(self, values):
+        return np.ceil(np.log(values) / self.log_gamma).astype(np.int64)
+
+    def _value(self, key):
+        """Representative value of a bucket, within alpha of all its values"""
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def _add_counts(self, offset, counts):
+        """Adds bucket counts starting at key offset"""
+        if not len(counts):
+            return
+        if not len(self.counts):
+            self.offset, self.counts = offset, counts.copy()
+        else:
+            low = min(self.offset, offset)
+            high = max(self.offset + len(self.counts), offset + len(counts))
+            merged = np.zeros(high - low, dtype=np.int64)
+            merged[self.offset - low:self.offset - low + len(self.counts)] += self.counts
+            merged[offset - low:offset - low + len(counts)] += counts
+            self.offset, self.counts = low, merged
+        excess = len(self.counts) - self.max_buckets
+        if excess > 0:
+            self.counts[excess] += self.counts[:excess].sum()
+            self.counts = self.counts[excess:]
+            self.offset += excess
+            self.collapsed = True
+        # trailing and leading empty buckets
+        used = np.flatnonzero(self.counts)
+        if len(used):
+            self.counts = self.counts[used[0]:used[-1] + 1]
+            self.offset += int(used[0])
+        else:
+            self.counts = np.zeros(0, dtype=np.int64)
+
+    def add(self, values):
+        """Adds a batch of (non-negative) values"""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if not len(values):
+            return
+        positive = values[values > self.min_value]
+        self.zero_count += len(values) - len(positive)
+        if not len(positive):
+            return
+        keys = self._keys(positive)
+        offset = int(keys.min())
+        self._add_counts(offset, np.bincount(keys - offset))
+
+    def merge(self, other):
+        """Folds another sketch, of the same relative accuracy, into this one"""
+        if other.gamma != self.gamma:
+            raise ValueError("Only sketches of the same relative accuracy can be merged")
+        self.zero_count += other.zero_count
+        self.collapsed |= other.collapsed
+        self._add_counts(other.offset, other.counts)
+
+    def quantile(self, q):
+        """
+        Returns the q-quantile (0 <= q <= 1), NaN for an empty sketch
+        """
+        count = self.count
+        if not count:
+            return float("nan")
+        rank = q * (count - 1)
+        if rank < self.zero_count:
+            return 0.0
+        cumulative = np.cumsum(self.counts) + self.zero_count
+        index = int(np.searchsorted(cumulative, rank, side="right"))
+        return float(self._value(self.offset + min(index, len(self.counts) - 1)))
+
+
+class StreamingStatistics:
+    """
+    Welford moments plus a DDSketch of the same values, e.g. the
+    end-to-end latency (ms) of every message set of a trace
+
+    Args:
+        relative_accuracy (float, optional): of the quantiles. Defaults to 0.01.
+        max_buckets (int, optional): memory bound of the sketch. Defaults to 2048.
+    """
+
+    def __init__(self, relative_accuracy=0.01, max_buckets=2048):
+        self.moments = Welford()
+        self.sketch = DDSketch(relative_accuracy, max_buckets)
+
+    @property
+    def count(self):
+        return self.moments.count
+
+    def add(self, values):
+        """Adds a batch of values"""
+        self.moments.add(values)
+        self.sketch.add(values)
+
+    def merge(self, other):
+        """Folds the values of other (a chunk or another run) into these"""
+        self.moments.merge(other.moments)
+        self.sketch.merge(other.sketch)
+        return self
+
+    def percentiles(self, qs=PERCENTILES):
+        """Returns percentile name -> value, see distribution.percentiles"""
+        return {percentile_name(q): self.sketch.quantile(q / 100) for q in qs}
+
+    def summary(self, qs=PERCENTILES):
+        """
+        Returns a dict with the mean, rms, max, min, count, percentiles
+        and the relative error bound of the percentiles
+        """
+        return {
+            "mean": self.moments.mean,
+            "rms": self.moments.rms,
+            "max": self.moments.max,
+            "min": self.moments.min,
+            "count": self.moments.count,
+            "percentiles": self.percentiles(qs),
+            # the lowest quantiles may be off if buckets were collapsed
+            "percentiles_relative_error": self.sketch.relative_accuracy,
+            "percentiles_collapsed": self.sketch.collapsed,
+        }
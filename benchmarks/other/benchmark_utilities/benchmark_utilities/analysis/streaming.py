@@ -0,0 +1,120 @@
+# Copyright (C) Acceleration Robotics S.L.U. - All Rights Reserved
+#
+# Written by Víctor Mayoral Vilches <victor@accelerationrobotics.com>
+# Written by Martiño Crespo <martinho@accelerationrobotics.com>
+# Written by Alejandra Martínez Fariña <alex@accelerationrobotics.com>
+# Licensed under the Apache License, Version 2.0
+
+"""
+Bounded-memory chain assembly for long traces.
+
+Message sets are grouped by identifier (the ROS header stamp by default)
+as events arrive, and each one is emitted as soon as its last tracepoint
+is seen. Partial sets older than a time window are evicted and counted
+as lost, so memory only depends on the window and not on the length of
+the trace.
+"""
+
+from collections import OrderedDict
+import numpy as np
+
+from benchmark_utilities.analysis.events import EVENT_DTYPE
+
+
+class StreamingChainAssembler:
+    """
+    Assembles message sets from event tables fed in trace order
+
+    Args:
+        chain_ids (list): event_id of each tracepoint of the chain, in order
+        window (int): nanoseconds a partial message set is kept waiting
+            for the rest of its tracepoints
+        key (string, optional): column identifying a message. Defaults to "frame_id".
+        statistics (StreamingStatistics, optional): fed with the latency (ms)
+            of each completed set, see sketch.py. Defaults to None.
+        span (tuple, optional): positions (first, last) in the chain the
+            latency fed to statistics is measured between. Defaults to the
+            whole chain.
+    """
+
+    def __init__(self, chain_ids, window, key="frame_id", statistics=None, span=None):
+        self.chain_ids = list(chain_ids)
+        self.chain_id_set = set(self.chain_ids)
+        self.window = window
+        self.key = key
+        self.lost_msgs = 0  # partial sets evicted or incomplete at the end
+        self.discarded = 0  # events of ids already fully propagated
+        self._partial = OrderedDict()  # id -> (first timestamp, rows), oldest first
+        self._done = OrderedDict()  # id -> timestamp, recently completed ids
+        self.statistics = statistics
+        self.span = span if span is not None else (0, len(self.chain_ids) - 1)
+        self._latencies = []  # not yet fed to statistics
+
+    def _evict(self, now):
+        """Drops the state older than the window"""
+        while self._partial:
+            id, (first, _) = next(iter(self._partial.items()))
+            if now - first <= self.window:
+                break
+            del self._partial[id]
+            self.lost_msgs += 1
+        while self._done:
+            id, last = next(iter(self._done.items()))
+            if now - last <= self.window:
+                break
+            del self._done[id]
+
+    def push(self, events):
+        """
+        Feeds an event table, yields the message sets completed by it
+        (each an array of len(chain) rows)
+
+        Args:
+            events (np.ndarray): event table, sorted by timestamp and
+                following the events of previous calls
+        """
+        keys = events[self.key].tolist()
+        timestamps = events["timestamp"].tolist()
+        event_ids = events["event_id"].tolist()
+        for index in range(len(events)):
+            if event_ids[index] not in self.chain_id_set:
+                continue
+            id = keys[index]
+            now = timestamps[index]
+            self._evict(now)
+            if id in self._done:
+                self.discarded += 1
+                continue
+            if id not in self._partial:
+                self._partial[id] = (now, [])
+            rows = self._partial[id][1]
+            rows.append(events[index])
+            if len(rows) < len(self.chain_ids):
+                continue
+
+            del self._partial[id]
+            self._done[id] = now
+            if self.chain_id_set <= set(int(row["event_id"]) for row in rows):
+                msg_set = np.array(rows, dtype=EVENT_DTYPE)
+                if self.statistics is not None:
+                    first, last = self.span
+                    self._latencies.append(
+                        (msg_set["timestamp"][last] - msg_set["timestamp"][first]) / 1e6
+                    )
+                yield msg_set
+            else:
+                self.lost_msgs += 1  # does not have all tracepoints
+        self._flush()
+
+    def _flush(self):
+        """Feeds the pending latencies to statistics, in one batch"""
+        if self._latencies:
+            self.statistics.add(self._latencies)
+            self._latencies = []
+
+    def finish(self):
+        """Counts the message sets still partial at the end of the trace as lost"""
+        self._flush()
+        self.lost_msgs += len(self._partial)
+        self._partial.clear()
+        self._done.clear()
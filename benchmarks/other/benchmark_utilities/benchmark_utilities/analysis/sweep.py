@@ -0,0 +1,68 @@
+# Copyright (C) Acceleration Robotics S.L.U. - All Rights Reserved
+#
+# Written by Víctor Mayoral Vilches <victor@accelerationrobotics.com>
+# Written by Martiño Crespo <martinho@accelerationrobotics.com>
+# Written by Alejandra Martínez Fariña <alex@accelerationrobotics.com>
+# Licensed under the Apache License, Version 2.0
+
+"""
+Latency against offered load.
+
+Runs of the same benchmark at increasing input rates (e.g. stepping
+publisher_upper_frequency in the auto launch files) show where the
+pipeline saturates: throughput stops following the offered rate and
+latency grows sharply. The knee of the latency curve and the highest
+rate sustained within a latency bound summarize the capacity of the
+hardware.
+"""
+
+import numpy as np
+
+
+def knee(rates, values):
+    """
+    Knee of an increasing, convex curve (e.g. p99 latency against rate):
+    the point furthest below the chord joining its ends, both axes
+    normalized (Kneedle)
+
+    Args:
+        rates (array_like): sorted
+        values (array_like): at each rate
+
+    Returns:
+        float: rate at the knee, None with fewer than 3 points or a flat curve
+    """
+    rates = np.asarray(rates, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    if len(rates) < 3 or np.ptp(rates) == 0 or np.ptp(values) == 0:
+        return None
+    x = (rates - rates[0]) / np.ptp(rates)
+    y = (values - values.min()) / np.ptp(values)
+    chord = y[0] + (y[-1] - y[0]) * x
+    distance = chord - y
+    index = int(np.argmax(distance))
+    if distance[index] <= 0:
+        return None
+    return float(rates[index])
+
+
+def max_sustainable_rate(rates, throughputs, latencies, bound=None, tolerance=0.05):
+    """
+    Highest offered rate the pipeline keeps up with: throughput within
+    tolerance of the offered rate and, if given, latency within bound
+
+    Args:
+        rates (array_like): offered rates (Hz)
+        throughputs (array_like): achieved at each rate (fps)
+        latencies (array_like): at each rate (e.g. p99, ms)
+        bound (float, optional): ms. Defaults to None.
+        tolerance (float, optional): of the throughput. Defaults to 0.05.
+
+    Returns:
+        float: None if no rate is sustained
+    """
+    rates = np.asarray(rates, dtype=np.float64)
+    sustained = np.asarray(throughputs, dtype=np.float64) >= (1 - tolerance) * rates
+    if bound is not None:
+        sustained &= np.asarray(latencies, dtype=np.float64) <= bound
+    return float(rates[sustained].max()) if sustained.any() else None
@@ -0,0 +1,79 @@
+# Copyright (C) Acceleration Robotics S.L.U. - All Rights Reserved
+#
+# Written by Víctor Mayoral Vilches <victor@accelerationrobotics.com>
+# Written by Martiño Crespo <martinho@accelerationrobotics.com>
+# Written by Alejandra Martínez Fariña <alex@accelerationrobotics.com>
+# Licensed under the Apache License, Version 2.0
+
+"""
+Throughput over time and steady-state detection.
+
+The rate between consecutive messages is dominated by bursts at startup
+(caches, buffering in the rosbag player) and by the drain at the end of
+the run. Counting frames and bytes over sliding windows gives a timeline
+of the throughput, from which the warm-up and cool-down are trimmed with
+the Marginal Standard Error Rule (MSER) so that only the steady state is
+reported.
+"""
+
+import numpy as np
+
+
+def windowed_rate(timestamps, values, window, step=None):
+    """
+    Sum of values per second over sliding windows
+
+    Args:
+        timestamps (array_like): of each message, in ns, sorted
+        values (array_like): of each message (e.g. 1 per frame, or bytes)
+        window (float): seconds of each window
+        step (float, optional): seconds between windows. Defaults to window.
+
+    Returns:
+        tuple: (start of each window in s relative to the first message,
+        rate of each window per second)
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    if len(timestamps) < 2:
+        return np.empty(0), np.empty(0)
+    if step is None:
+        step = window
+    window_ns = int(window * 1e9)
+    starts = np.arange(timestamps[0], timestamps[-1] - window_ns + 1, int(step * 1e9))
+    cumulative = np.concatenate(([0.0], np.cumsum(np.asarray(values, dtype=np.float64))))
+    first = np.searchsorted(timestamps, starts, side="left")
+    last = np.searchsorted(timestamps, starts + window_ns, side="left")
+    return (starts - timestamps[0]) / 1e9, (cumulative[last] - cumulative[first]) / window
+
+
+def mser(values, max_fraction=0.5):
+    """
+    Truncation point of the warm-up of a series (MSER): the number of
+    leading values whose removal minimizes the standard error of the
+    mean of the rest, searched within the first max_fraction of it
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    if n < 4:
+        return 0
+    # sums over values[d:] for every d, without looping
+    sums = np.cumsum(values[::-1])[::-1]
+    squares = np.cumsum((values ** 2)[::-1])[::-1]
+    remaining = n - np.arange(n)
+    variance = squares / remaining - (sums / remaining) ** 2
+    candidates = max(1, int(n * max_fraction))
+    return int(np.argmin(variance[:candidates] / remaining[:candidates]))
+
+
+def steady_state(rates, max_fraction=0.5):
+    """
+    Steady-state region of a throughput timeline, excluding the warm-up
+    and the cool-down found by mser()
+
+    Returns:
+        tuple: (first, last) window of the region, last excluded
+    """
+    rates = np.asarray(rates, dtype=np.float64)
+    first = mser(rates, max_fraction)
+    last = len(rates) - mser(rates[first:][::-1], max_fraction)
+    return first, last
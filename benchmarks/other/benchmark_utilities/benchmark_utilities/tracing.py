@@ -0,0 +1,38 @@
+# Copyright (C) Acceleration Robotics S.L.U. - All Rights Reserved
+#
+# Written by Víctor Mayoral Vilches <victor@accelerationrobotics.com>
+# Written by Martiño Crespo <martinho@accelerationrobotics.com>
+# Written by Alejandra Martínez Fariña <alex@accelerationrobotics.com>
+# Licensed under the Apache License, Version 2.0
+
+"""
+Tracing profiles shared by the trace_*.launch.py files.
+
+Kernel tracing is opt-in: it needs lttng-modules and adds overhead, so
+the scheduling events used by analysis/kernel.py are only enabled when
+the TRACE_KERNEL environment variable is set (e.g. TRACE_KERNEL=1).
+"""
+
+import os
+
+# scheduling and interrupt events, see analysis/kernel.py
+KERNEL_EVENTS_SCHED = [
+    "sched_switch",
+    "sched_wakeup",
+    "sched_waking",
+    "sched_migrate_task",
+    "irq_handler_entry",
+    "irq_handler_exit",
+    "irq_softirq_entry",
+    "irq_softirq_exit",
+]
+
+
+def kernel_tracing():
+    """Whether kernel tracing was requested through TRACE_KERNEL"""
+    return os.environ.get("TRACE_KERNEL", "").lower() in ("1", "true", "yes", "on")
+
+
+def kernel_events():
+    """Kernel events to trace, none unless kernel_tracing()"""
+    return list(KERNEL_EVENTS_SCHED) if kernel_tracing() else []
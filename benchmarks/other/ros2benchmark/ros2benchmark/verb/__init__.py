@@ -150,6 +150,7 @@ class Benchmark:
         self.short = yaml_data["short"]
         self.graph = yaml_data["graph"]
         self.reproduction = yaml_data["reproduction"]
+        self.analysis = yaml_data.get("analysis")  # chains analyzed, optional
         self.results = []   # Ensure this line exists
         self.path = yaml_file.replace("/benchmark.yaml", "")
 
@@ -165,7 +166,7 @@ class Benchmark:
             note = result_data.get("note", "default_note")
             datasource = result_data.get("datasource", "default_datasource")
 
-            self.results.append({
+            result_dict = {
                 "metric": metric,
                 "metric_unit": metric_unit,
                 "type": result_type,  # "type" is a reserved keyword in Python, so we use "result_type"
@@ -175,7 +176,12 @@ class Benchmark:
                 "value": value,
                 "note": note,
                 "datasource": datasource
-            })
+            }
+            # latency distribution and uncertainty, optional (see BenchmarkAnalyzer.results)
+            for key in ("percentiles", "percentiles_relative_error", "histogram", "confidence_intervals", "runs"):
+                if key in result_data:
+                    result_dict[key] = result_data[key]
+            self.results.append(result_dict)
 
 
     def __str__(self):
@@ -188,8 +194,10 @@ class Benchmark:
             "reproduction": self.reproduction,
             "results": [{"result": result} for result in self.results]
         }
+        if self.analysis is not None:
+            yaml_data["analysis"] = self.analysis
 
-        key_order = ["id", "name", "description", "short", "graph", "reproduction", "results"]
+        key_order = ["id", "name", "description", "short", "graph", "reproduction", "results", "analysis"]
         return yaml.dump(yaml_data, sort_keys=key_order)
 
     def markdown(self):
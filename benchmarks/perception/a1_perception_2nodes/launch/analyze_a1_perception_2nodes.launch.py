@@ -38,7 +38,8 @@ def main(argv):
     # Parse the command-line arguments
     parser = argparse.ArgumentParser()
     parser.add_argument('--hardware_device_type', type=str, help='Hardware Device Type (e.g. cpu or fpga)', default ='cpu')
-    parser.add_argument('--trace_path', type=str, help='Path to trace files (e.g. /tmp/analysis/trace)', default = '/tmp/analysis/trace')
+    parser.add_argument('--trace_path', type=str, help='Path to trace files (e.g. /tmp/analysis/trace), comma-separated to aggregate several runs', default = '/tmp/analysis/trace')
+    parser.add_argument('--rates', type=str, help='Input rate (Hz) of each trace in trace_path, comma-separated, for a latency vs load sweep', default='')
     parser.add_argument('--metrics', type=str, help='List of metrics to be analyzed (e.g. latency and/or throughput)', default = ['latency'])
     parser.add_argument('--integrated', type=str, help='Integrated or separated version of the Resize and Rectify nodes (only for fpga now)', default='false') 
     args = parser.parse_args(argv)
@@ -54,502 +55,27 @@ def main(argv):
     # Instantiate the class
     ba = BenchmarkAnalyzer('a1_perception_2nodes', hardware_device_type)
 
-    if hardware_device_type == 'cpu':
-        # add parameters for analyzing the traces
-        ## using message header id
-        target_chain = [
-            "robotperf_benchmarks:robotperf_image_input_cb_init",  # 0
-            "robotperf_benchmarks:robotperf_image_input_cb_fini",  # 1
-            "robotperf_benchmarks:robotperf_image_output_cb_init",  # 10
-            "robotperf_benchmarks:robotperf_image_output_cb_fini",  # 11
-        ]
-
-        ba.add_target(
-            {
-                "name": "robotperf_benchmarks:robotperf_image_input_cb_init",
-                "name_disambiguous": "robotperf_benchmarks:robotperf_image_input_cb_init",
-                "colors_fg": "blue",
-                "colors_fg_bokeh": "silver",
-                "layer": "userland",
-                "label_layer": 4,
-                "marker": "plus",
-            }
-        )
-        ba.add_target(
-            {
-                "name": "robotperf_benchmarks:robotperf_image_input_cb_fini",
-                "name_disambiguous": "robotperf_benchmarks:robotperf_image_input_cb_fini",
-                "colors_fg": "blue",
-                "colors_fg_bokeh": "darkgray",
-                "layer": "benchmark",
-                "label_layer": 5,
-                "marker": "plus",
-            }
-        )
-        ba.add_target(
-            {
-                "name": "robotperf_benchmarks:robotperf_image_output_cb_init",
-                "name_disambiguous": "robotperf_benchmarks:robotperf_image_output_cb_init",
-                "colors_fg": "blue",
-                "colors_fg_bokeh": "chocolate",
-                "layer": "benchmark",
-                "label_layer": 5,
-                "marker": "plus",
-            }
-        )
-        ba.add_target(
-            {
-                "name": "robotperf_benchmarks:robotperf_image_output_cb_fini",
-                "name_disambiguous": "robotperf_benchmarks:robotperf_image_output_cb_fini",
-                "colors_fg": "blue",
-                "colors_fg_bokeh": "coral",
-                "layer": "userland",
-                "label_layer": 4,
-                "marker": "plus",
-            }
-        )
-
-    elif hardware_device_type == "fpga":
-        if integrated == 'false':
-            target_chain = [
-                "ros2:callback_start",  # 0
-                "robotperf_benchmarks:robotperf_image_input_cb_init",  # 1
-                "robotperf_benchmarks:robotperf_image_input_cb_fini",  # 2
-                "ros2:callback_end",  # 3
-                "ros2:callback_start",  # 4
-                "ros2_image_pipeline:image_proc_rectify_cb_init",  # 5
-                "ros2_image_pipeline:image_proc_rectify_init",  # 6
-                "ros2:vitis_profiler:kernel_enqueue",  # 7
-                "ros2:vitis_profiler:kernel_enqueue",  # 8
-                "ros2_image_pipeline:image_proc_rectify_fini",  # 9
-                # "ros2:rclcpp_publish",
-                # "ros2:rcl_publish",
-                # "ros2:rmw_publish",
-                "ros2_image_pipeline:image_proc_rectify_cb_fini",  # 10
-                "ros2:callback_end",  # 11
-                "ros2:callback_start",  # 12
-                "ros2_image_pipeline:image_proc_resize_cb_init",  # 13
-                "ros2_image_pipeline:image_proc_resize_init",  # 14
-                "ros2:vitis_profiler:kernel_enqueue",  # 15
-                "ros2:vitis_profiler:kernel_enqueue",  # 16
-                "ros2_image_pipeline:image_proc_resize_fini",  # 17
-                # "ros2:rclcpp_publish",
-                # "ros2:rcl_publish",
-                # "ros2:rmw_publish",
-                "ros2_image_pipeline:image_proc_resize_cb_fini",  # 18
-                "ros2:callback_end",  # 19
-                "ros2:callback_start",  # 20
-                "robotperf_benchmarks:robotperf_image_output_cb_init",  # 21
-                "robotperf_benchmarks:robotperf_image_output_cb_fini",  # 22
-                "ros2:callback_end",  # 23
-            ]
-
-            # add parameters for analyzing the traces
-            ba.add_target(
-                {
-                    "name": "ros2:callback_start",
-                    "name_disambiguous": "ros2:callback_start",
-                    "colors_fg": "blue",
-                    "colors_fg_bokeh": "lightgray",
-                    "layer": "rclcpp",
-                    "label_layer": 3,
-                    "marker": "diamond",
-                }
-            )
-            ba.add_target(
-                {
-                    "name": "robotperf_benchmarks:robotperf_image_input_cb_init",
-                    "name_disambiguous":
-                        "robotperf_benchmarks:robotperf_image_input_cb_init",
-                    "colors_fg": "blue",
-                    "colors_fg_bokeh": "silver",
-                    "layer": "userland",
-                    "label_layer": 4,
-                    "marker": "plus",
-                }
-            )
-            ba.add_target(
-                {
-                    "name": "robotperf_benchmarks:robotperf_image_input_cb_fini",
-                    "name_disambiguous": "robotperf_benchmarks:robotperf_image_input_cb_fini",
-                    "colors_fg": "blue",
-                    "colors_fg_bokeh": "darkgray",
-                    "layer": "benchmark",
-                    "label_layer": 5,
-                    "marker": "plus",
-                }
-            )
-            ba.add_target(
-                {
-                    "name": "ros2:callback_end",
-                    "name_disambiguous": "ros2:callback_end",
-                    "colors_fg": "blue",
-                    "colors_fg_bokeh": "gray",
-                    "layer": "rclcpp",
-                    "label_layer": 3,
-                    "marker": "diamond",
-                }
-            )
-            ba.add_target(
-                {
-                    "name": "ros2:callback_start",
-                    "name_disambiguous": "ros2:callback_start (2)",
-                    "colors_fg": "blue",
-                    "colors_fg_bokeh": "lightsalmon",
-                    "layer": "rclcpp",
-                    "label_layer": 3,
-                    "marker": "diamond",
-                }
-            )
-            ba.add_target(
-                {
-                    "name": "ros2_image_pipeline:image_proc_rectify_cb_init",
-                    "name_disambiguous": "ros2_image_pipeline:image_proc_rectify_cb_init",
-                    "colors_fg": "yellow",
-                    "colors_fg_bokeh": "salmon",
-                    "layer": "userland",
-                    "label_layer": 4,
-                    "marker": "plus",
-                }
-            )
-            ba.add_target(
-                {
-                    "name": "ros2_image_pipeline:image_proc_rectify_init",
-                    "name_disambiguous": "ros2_image_pipeline:image_proc_rectify_init",
-                    "colors_fg": "red",
-                    "colors_fg_bokeh": "darksalmon",
-                    "layer": "userland",
-                    "label_layer": 4,
-                    "marker": "plus",
-                }
-            )
-
-            ba.add_target(
-                {
-                    "name": "ros2:vitis_profiler:kernel_enqueue",
-                    "name_disambiguous": "ros2:kernel_enqueue:rectify_init",
-                    "colors_fg": "green",
-                    "colors_fg_bokeh": "indianred",
-                    "layer": "kernel",
-                    "label_layer": 1,
-                    "marker": "plus",
-                }
-            )
-
-            ba.add_target(
-                {
-                    "name": "ros2:vitis_profiler:kernel_enqueue",
-                    "name_disambiguous": "ros2:kernel_enqueue:rectify_fini",
-                    "colors_fg": "green",
-                    "colors_fg_bokeh": "crimson",
-                    "layer": "kernel",
-                    "label_layer": 1,
-                    "marker": "plus",
-                }
-            )
-
-            ba.add_target(
-                {
-                    "name": "ros2_image_pipeline:image_proc_rectify_fini",
-                    "name_disambiguous": "ros2_image_pipeline:image_proc_rectify_fini",
-                    "colors_fg": "red",
-                    "colors_fg_bokeh": "lightcoral",
-                    "layer": "userland",
-                    "label_layer": 4,
-                    "marker": "plus",
-                }
-            )
-            ba.add_target(
-                {
-                    "name": "ros2_image_pipeline:image_proc_rectify_cb_fini",
-                    "name_disambiguous": "ros2_image_pipeline:image_proc_rectify_cb_fini",
-                    "colors_fg": "yellow",
-                    "colors_fg_bokeh": "darkred",
-                    "layer": "userland",
-                    "label_layer": 4,
-                    "marker": "plus",
-                }
-            )
-            ba.add_target(
-                {
-                    "name": "ros2:callback_end",
-                    "name_disambiguous": "ros2:callback_end (2)",
-                    "colors_fg": "blue",
-                    "colors_fg_bokeh": "red",
-                    "layer": "rclcpp",
-                    "label_layer": 3,
-                    "marker": "diamond",
-                }
-            )
-            ba.add_target(
-                {
-                    "name": "ros2:callback_start",
-                    "name_disambiguous": "ros2:callback_start (3)",
-                    "colors_fg": "blue",
-                    "colors_fg_bokeh": "lavender",
-                    "layer": "rclcpp",
-                    "label_layer": 3,
-                    "marker": "diamond",
-                }
-            )
-            ba.add_target(
-                {
-                    "name": "ros2_image_pipeline:image_proc_resize_cb_init",
-                    "name_disambiguous": "ros2_image_pipeline:image_proc_resize_cb_init",
-                    "colors_fg": "yellow",
-                    "colors_fg_bokeh": "thistle",
-                    "layer": "userland",
-                    "label_layer": 4,
-                    "marker": "plus",
-                }
-            )
-            ba.add_target(
-                {
-                    "name": "ros2_image_pipeline:image_proc_resize_init",
-                    "name_disambiguous": "ros2_image_pipeline:image_proc_resize_init",
-                    "colors_fg": "red",
-                    "colors_fg_bokeh": "plum",
-                    "layer": "userland",
-                    "label_layer": 4,
-                    "marker": "plus",
-                }
-            )
-            ba.add_target(
-                {
-                    "name": "ros2:vitis_profiler:kernel_enqueue",
-                    "name_disambiguous": "ros2:kernel_enqueue:resize_init",
-                    "colors_fg": "green",
-                    "colors_fg_bokeh": "fuchsia",
-                    "layer": "kernel",
-                    "label_layer": 1,
-                    "marker": "plus",
-                }
-            )
-            ba.add_target(
-                {
-                    "name": "ros2:vitis_profiler:kernel_enqueue",
-                    "name_disambiguous": "ros2:kernel_enqueue:resize_finit",
-                    "colors_fg": "green",
-                    "colors_fg_bokeh": "darkmagenta",
-                    "layer": "kernel",
-                    "label_layer": 1,
-                    "marker": "plus"
-                }
-            )
-            ba.add_target(
-                {
-                    "name": "ros2_image_pipeline:image_proc_resize_fini",
-                    "name_disambiguous": "ros2_image_pipeline:image_proc_resize_fini",
-                    "colors_fg": "red",
-                    "colors_fg_bokeh": "fuchsia",
-                    "layer": "userland",
-                    "label_layer": 4,
-                    "marker": "plus",
-                }
-            )
-            ba.add_target(
-                {
-                    "name": "ros2_image_pipeline:image_proc_resize_cb_fini",
-                    "name_disambiguous": "ros2_image_pipeline:image_proc_resize_cb_fini",
-                    "colors_fg": "yellow",
-                    "colors_fg_bokeh": "indigo",
-                    "layer": "userland",
-                    "label_layer": 4,
-                    "marker": "plus",
-                }
-            )
-            ba.add_target(
-                {
-                    "name": "ros2:callback_end",
-                    "name_disambiguous": "ros2:callback_end (3)",
-                    "colors_fg": "blue",
-                    "colors_fg_bokeh": "mediumslateblue",
-                    "layer": "rclcpp",
-                    "label_layer": 3,
-                    "marker": "diamond",
-                }
-            )
-            ba.add_target(
-                {
-                    "name": "ros2:callback_start",
-                    "name_disambiguous": "ros2:callback_start (4)",
-                    "colors_fg": "blue",
-                    "colors_fg_bokeh": "chartreuse",
-                    "layer": "rclcpp",
-                    "label_layer": 3,
-                    "marker": "diamond",
-                }
-            )
-            ba.add_target(
-                {
-                    "name": "robotperf_benchmarks:robotperf_image_output_cb_init",
-                    "name_disambiguous": "robotperf_benchmarks:robotperf_image_output_cb_init",
-                    "colors_fg": "blue",
-                    "colors_fg_bokeh": "chocolate",
-                    "layer": "benchmark",
-                    "label_layer": 5,
-                    "marker": "plus",
-                }
-            )
-            ba.add_target(
-                {
-                    "name": "robotperf_benchmarks:robotperf_image_output_cb_fini",
-                    "name_disambiguous": "robotperf_benchmarks:robotperf_image_output_cb_fini",
-                    "colors_fg": "blue",
-                    "colors_fg_bokeh": "coral",
-                    "layer": "userland",
-                    "label_layer": 4,
-                    "marker": "plus",
-                }
-            )
-            ba.add_target(
-                {
-                    "name": "ros2:callback_end",
-                    "name_disambiguous": "ros2:callback_end (4)",
-                    "colors_fg": "blue",
-                    "colors_fg_bokeh": "cornflowerblue",
-                    "layer": "rclcpp",
-                    "label_layer": 3,
-                    "marker": "diamond",
-                }
-            )
-
-        else: #integrated
-            # add parameters for analyzing the traces
-            ## using message header id
-            target_chain = [
-                "robotperf_benchmarks:robotperf_image_input_cb_init",  # 0
-                "robotperf_benchmarks:robotperf_image_input_cb_fini",  # 1
-                "ros2_image_pipeline:image_proc_rectify_cb_init",  # 2
-                "ros2_image_pipeline:image_proc_rectify_init",  # 3
-                "ros2_image_pipeline:image_proc_rectify_fini",  # 4
-                "ros2_image_pipeline:image_proc_rectify_cb_fini",  # 5
-                "robotperf_benchmarks:robotperf_image_output_cb_init",  # 6
-                "robotperf_benchmarks:robotperf_image_output_cb_fini",  # 7
-            ]
-
-            ba.add_target(
-                {
-                    "name": "robotperf_benchmarks:robotperf_image_input_cb_init",
-                    "name_disambiguous": "robotperf_benchmarks:robotperf_image_input_cb_init",
-                    "colors_fg": "blue",
-                    "colors_fg_bokeh": "silver",
-                    "layer": "userland",
-                    "label_layer": 4,
-                    "marker": "plus",
-                }
-            )
-            ba.add_target(
-                {
-                    "name": "robotperf_benchmarks:robotperf_image_input_cb_fini",
-                    "name_disambiguous": "robotperf_benchmarks:robotperf_image_input_cb_fini",
-                    "colors_fg": "blue",
-                    "colors_fg_bokeh": "darkgray",
-                    "layer": "benchmark",
-                    "label_layer": 5,
-                    "marker": "plus",
-                }
-            )
-            ba.add_target(
-                {
-                    "name": "ros2_image_pipeline:image_proc_rectify_cb_init",
-                    "name_disambiguous": "ros2_image_pipeline:image_proc_rectify_cb_init",
-                    "colors_fg": "yellow",
-                    "colors_fg_bokeh": "salmon",
-                    "layer": "userland",
-                    "label_layer": 4,
-                    "marker": "plus",
-                }
-            )
-            ba.add_target(
-                {
-                    "name": "ros2_image_pipeline:image_proc_rectify_init",
-                    "name_disambiguous": "ros2_image_pipeline:image_proc_rectify_init",
-                    "colors_fg": "red",
-                    "colors_fg_bokeh": "darksalmon",
-                    "layer": "userland",
-                    "label_layer": 4,
-                    "marker": "plus",
-                }
-            )
-            ba.add_target(
-                {
-                    "name": "ros2_image_pipeline:image_proc_rectify_fini",
-                    "name_disambiguous": "ros2_image_pipeline:image_proc_rectify_fini",
-                    "colors_fg": "red",
-                    "colors_fg_bokeh": "lightcoral",
-                    "layer": "userland",
-                    "label_layer": 4,
-                    "marker": "plus",
-                }
-            )
-            ba.add_target(
-                {
-                    "name": "ros2_image_pipeline:image_proc_rectify_cb_fini",
-                    "name_disambiguous": "ros2_image_pipeline:image_proc_rectify_cb_fini",
-                    "colors_fg": "yellow",
-                    "colors_fg_bokeh": "darkred",
-                    "layer": "userland",
-                    "label_layer": 4,
-                    "marker": "plus",
-                }
-            )
-            ba.add_target(
-                {
-                    "name": "robotperf_benchmarks:robotperf_image_output_cb_init",
-                    "name_disambiguous": "robotperf_benchmarks:robotperf_image_output_cb_init",
-                    "colors_fg": "blue",
-                    "colors_fg_bokeh": "chocolate",
-                    "layer": "benchmark",
-                    "label_layer": 5,
-                    "marker": "plus",
-                }
-            )
-            ba.add_target(
-                {
-                    "name": "robotperf_benchmarks:robotperf_image_output_cb_fini",
-                    "name_disambiguous": "robotperf_benchmarks:robotperf_image_output_cb_fini",
-                    "colors_fg": "blue",
-                    "colors_fg_bokeh": "coral",
-                    "layer": "userland",
-                    "label_layer": 4,
-                    "marker": "plus",
-                }
-            )
-
-    else:
-        print('The hardware device type ' + hardware_device_type + ' is not yet implemented\n')
-        
-    num_metrics = 0 # initialize the metric count
-    add_power = False # initialize the boolean
-    for metric in metrics:
-        if metric == 'power':
-            add_power = True
-            ba.add_power(
-            {
-                "name": "robotcore_power:robotcore_power_output_cb_fini",
-                "name_disambiguous": "robotcore_power:robotcore_power_output_cb_fini",
-                "colors_fg": "blue",
-                "colors_fg_bokeh": "silver",
-                "layer": "userland",
-                "label_layer": 4,
-                "marker": "plus",
-            }
-            )
-        else:
-            num_metrics += 1 # it will be larger than 0 if other metrics besides power are desired
-    
-    for metric in metrics:
-        if metric == 'latency':
-            ba.analyze_latency(trace_path, add_power)
-        elif metric == 'throughput':
-            ba.analyze_throughput(trace_path, add_power)
-        elif metric == 'power': 
-            if num_metrics == 0: # launch independently iff no other metric is requested
-                total_consumption = ba.analyze_power(trace_path)
-                print("The average consumption is {} W".format(total_consumption))
-        else:
-            print('The metric ' + metric + ' is not yet implemented\n')
+    variant = hardware_device_type
+    if hardware_device_type == 'fpga' and integrated != 'false':
+        variant = 'fpga_integrated'
+
+    # target and power chains are declared in benchmark.yaml
+    benchmark_yaml = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'benchmark.yaml')
+    if not ba.load_analysis(benchmark_yaml, variant, power='power' in metrics):
+        return
+
+    # several runs of the benchmark, at different input rates (sweep) or
+    # reported with their confidence intervals
+    trace_paths = trace_path.split(',')
+    if args.rates:
+        ba.analyze_sweep([float(rate) for rate in args.rates.split(',')], trace_paths)
+        return
+    if len(trace_paths) > 1:
+        ba.analyze_runs(metrics, trace_paths)
+        return
+
+    # all metrics are served from a single decoding pass of the trace
+    ba.analyze(metrics, trace_path)
     
 
 def generate_launch_description():
@@ -563,7 +89,7 @@ def generate_launch_description():
     trace_path_arg = DeclareLaunchArgument(
         'trace_path',
         default_value='/tmp/analysis/trace',
-        description='Path to trace files (e.g. /tmp/analysis/trace)'
+        description='Path to trace files (e.g. /tmp/analysis/trace), comma-separated to aggregate several runs'
     )
 
     metrics_arg = DeclareLaunchArgument(
@@ -571,6 +97,12 @@ def generate_launch_description():
         default_value=['latency'],
         description='List of metrics to be analyzed (e.g. latency and/or throughput)'
     )
+
+    rates_arg = DeclareLaunchArgument(
+        'rates',
+        default_value='',
+        description='Input rate (Hz) of each trace in trace_path, comma-separated, for a latency vs load sweep'
+    )
     
     integrated_arg = DeclareLaunchArgument(
         'integrated',
@@ -588,7 +120,8 @@ def generate_launch_description():
             '--hardware_device_type', LaunchConfiguration('hardware_device_type'),
             '--trace_path', LaunchConfiguration('trace_path'),
             '--metrics', LaunchConfiguration('metrics'),
-            '--integrated', LaunchConfiguration('integrated')],
+            '--integrated', LaunchConfiguration('integrated'),
+            ['--rates=', LaunchConfiguration('rates')]],
         output='screen'
     )
 
@@ -596,6 +129,7 @@ def generate_launch_description():
     ld.add_action(hardware_device_type_arg)
     ld.add_action(trace_path_arg)
     ld.add_action(metrics_arg)
+    ld.add_action(rates_arg)
     ld.add_action(integrated_arg)
     
     # Add the ExecuteProcess action to the launch description
@@ -31,6 +31,7 @@ from tracetools_launch.action import Trace
 from tracetools_trace.tools.names import DEFAULT_EVENTS_ROS
 from tracetools_trace.tools.names import DEFAULT_EVENTS_KERNEL
 from tracetools_trace.tools.names import DEFAULT_CONTEXT
+from benchmark_utilities.tracing import kernel_events
 
  
 def generate_launch_description():
@@ -47,7 +48,7 @@ def generate_launch_description():
                 'kernel': [],
                 'userspace': ['vpid', 'vtid', 'procname'],
         },
-        # events_kernel=DEFAULT_EVENTS_KERNEL,
+        events_kernel=kernel_events(),  # opt-in, TRACE_KERNEL=1
     )
  
     perception_container = ComposableNodeContainer(
@@ -37,7 +37,8 @@ def main(argv):
     # Parse the command-line arguments
     parser = argparse.ArgumentParser()
     parser.add_argument('--hardware_device_type', type=str, help='Hardware Device Type (e.g. cpu or fpga)', default ='cpu')
-    parser.add_argument('--trace_path', type=str, help='Path to trace files (e.g. /tmp/analysis/trace)', default = '/tmp/analysis/trace')
+    parser.add_argument('--trace_path', type=str, help='Path to trace files (e.g. /tmp/analysis/trace), comma-separated to aggregate several runs', default = '/tmp/analysis/trace')
+    parser.add_argument('--rates', type=str, help='Input rate (Hz) of each trace in trace_path, comma-separated, for a latency vs load sweep', default='')
     parser.add_argument('--metrics', type=str, help='List of metrics to be analyzed (e.g. latency and/or throughput)', default = ['latency'])
     args = parser.parse_args(argv)
 
@@ -51,122 +52,23 @@ def main(argv):
     # Instantiate the class
     ba = BenchmarkAnalyzer('a3_stereo_image_proc', hardware_device_type)
 
-    if hardware_device_type == 'cpu':
-        target_chain = [
-        # "ros2:callback_start",
-        'robotperf_benchmarks:robotperf_image_input_cb_init',
-        'robotperf_benchmarks:robotperf_image_input_cb_fini',
-        # 'ros2:callback_end',
-        # 'ros2:callback_start',
-        'robotperf_benchmarks:robotperf_image_input_cb_init',
-        'robotperf_benchmarks:robotperf_image_input_cb_fini',
-        # 'ros2:callback_end',
-        # "ros2:callback_start",
-        'robotperf_benchmarks:robotperf_image_output_cb_init',
-        'robotperf_benchmarks:robotperf_image_output_cb_fini',
-        # "ros2:callback_end",
-        ]
+    # target and power chains are declared in benchmark.yaml
+    benchmark_yaml = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'benchmark.yaml')
+    if not ba.load_analysis(benchmark_yaml, hardware_device_type, power='power' in metrics):
+        return
 
-        # add parameters for analyzing the traces
-        ba.add_target(
-            {
-                "name": "robotperf_benchmarks:robotperf_image_input_cb_init",
-                "name_disambiguous": "robotperf_benchmarks:robotperf_image_input_cb_init",
-                "colors_fg": "blue",
-                "colors_fg_bokeh": "silver",
-                "layer": "userland",
-                "label_layer": 4,
-                "marker": "plus",
-            }
-        )
-        ba.add_target(
-            {
-                "name": "robotperf_benchmarks:robotperf_image_input_cb_fini",
-                "name_disambiguous": "robotperf_benchmarks:robotperf_image_input_cb_fini",
-                "colors_fg": "blue",
-                "colors_fg_bokeh": "darkgray",
-                "layer": "benchmark",
-                "label_layer": 5,
-                "marker": "plus",
-            }
-        )
-        ba.add_target(
-            {
-                "name": "robotperf_benchmarks:robotperf_image_input_cb_init",
-                "name_disambiguous": "robotperf_benchmarks:robotperf_image_input_cb_init (2)",
-                "colors_fg": "yellow",
-                "colors_fg_bokeh": "salmon",
-                "layer": "userland",
-                "label_layer": 4,
-                "marker": "plus",
-            }
-        )
-        ba.add_target(
-            {
-                "name": "robotperf_benchmarks:robotperf_image_input_cb_fini",
-                "name_disambiguous": "robotperf_benchmarks:robotperf_image_input_cb_fini (2)",
-                "colors_fg": "yellow",
-                "colors_fg_bokeh": "darksalmon",
-                "layer": "benchmark",
-                "label_layer": 5,
-                "marker": "plus",
-            }
-        )
-        ba.add_target(
-            {
-                "name": "robotperf_benchmarks:robotperf_image_output_cb_init",
-                "name_disambiguous": "robotperf_benchmarks:robotperf_image_output_cb_init",
-                "colors_fg": "red",
-                "colors_fg_bokeh": "red",
-                "layer": "benchmark",
-                "label_layer": 5,
-                "marker": "plus",
-            }
-        )
-        ba.add_target(
-            {
-                "name": "robotperf_benchmarks:robotperf_image_output_cb_fini",
-                "name_disambiguous": "robotperf_benchmarks:robotperf_image_output_cb_fini",
-                "colors_fg": "red",
-                "colors_fg_bokeh": "lavender",
-                "layer": "userland",
-                "label_layer": 4,
-                "marker": "plus",
-            }
-        )
-    else:
-        print('The hardware device type ' + hardware_device_type + ' is not yet implemented\n')
+    # several runs of the benchmark, at different input rates (sweep) or
+    # reported with their confidence intervals
+    trace_paths = trace_path.split(',')
+    if args.rates:
+        ba.analyze_sweep([float(rate) for rate in args.rates.split(',')], trace_paths)
+        return
+    if len(trace_paths) > 1:
+        ba.analyze_runs(metrics, trace_paths)
+        return
 
-    num_metrics = 0 # initialize the metric count
-    add_power = False # initialize the boolean
-    for metric in metrics:
-        if metric == 'power':
-            add_power = True
-            ba.add_power(
-            {
-                "name": "robotcore_power:robotcore_power_output_cb_fini",
-                "name_disambiguous": "robotcore_power:robotcore_power_output_cb_fini",
-                "colors_fg": "blue",
-                "colors_fg_bokeh": "silver",
-                "layer": "userland",
-                "label_layer": 4,
-                "marker": "plus",
-            }
-            )
-        else:
-            num_metrics += 1 # it will be larger than 0 if other metrics besides power are desired
-    
-    for metric in metrics:
-        if metric == 'latency':
-            ba.analyze_latency(trace_path, add_power)
-        elif metric == 'throughput':
-            ba.analyze_throughput(trace_path, add_power)
-        elif metric == 'power': 
-            if num_metrics == 0: # launch independently iff no other metric is requested
-                total_consumption = ba.analyze_power(trace_path)
-                print("The average consumption is {} W".format(total_consumption))
-        else:
-            print('The metric ' + metric + ' is not yet implemented\n')
+    # all metrics are served from a single decoding pass of the trace
+    ba.analyze(metrics, trace_path)
     
   
   
@@ -181,7 +83,7 @@ def generate_launch_description():
     trace_path_arg = DeclareLaunchArgument(
         'trace_path',
         default_value='/tmp/analysis/trace',
-        description='Path to trace files (e.g. /tmp/analysis/trace)'
+        description='Path to trace files (e.g. /tmp/analysis/trace), comma-separated to aggregate several runs'
     )
 
     metrics_arg = DeclareLaunchArgument(
@@ -189,6 +91,12 @@ def generate_launch_description():
         default_value=['latency'],
         description='List of metrics to be analyzed (e.g. latency and/or throughput)'
     )
+
+    rates_arg = DeclareLaunchArgument(
+        'rates',
+        default_value='',
+        description='Input rate (Hz) of each trace in trace_path, comma-separated, for a latency vs load sweep'
+    )
     
     # Create the launch description
     ld = LaunchDescription()
@@ -199,7 +107,8 @@ def generate_launch_description():
             'python3', "src/benchmarks/benchmarks/perception/a3_stereo_image_proc/launch/analyze_a3_stereo_image_proc.launch.py",
             '--hardware_device_type', LaunchConfiguration('hardware_device_type'),
             '--trace_path', LaunchConfiguration('trace_path'),
-            '--metrics', LaunchConfiguration('metrics')],
+            '--metrics', LaunchConfiguration('metrics'),
+            ['--rates=', LaunchConfiguration('rates')]],
         output='screen'
     )
 
@@ -207,6 +116,7 @@ def generate_launch_description():
     ld.add_action(hardware_device_type_arg)
     ld.add_action(trace_path_arg)
     ld.add_action(metrics_arg)
+    ld.add_action(rates_arg)
     
     # Add the ExecuteProcess action to the launch description
     ld.add_action(analyzer)
@@ -32,6 +32,7 @@ from tracetools_launch.action import Trace
 from tracetools_trace.tools.names import DEFAULT_EVENTS_ROS
 from tracetools_trace.tools.names import DEFAULT_EVENTS_KERNEL
 from tracetools_trace.tools.names import DEFAULT_CONTEXT
+from benchmark_utilities.tracing import kernel_events
  
 def generate_launch_description():
      # Trace
@@ -47,6 +48,7 @@ def generate_launch_description():
                 'kernel': [],
                 'userspace': ['vpid', 'vtid', 'procname'],
         },
+        events_kernel=kernel_events(),  # opt-in, TRACE_KERNEL=1
     )
  
     perception_container = ComposableNodeContainer(